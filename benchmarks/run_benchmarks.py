@@ -0,0 +1,440 @@
+"""游戏引擎与界面热点的基准测试（可在无显示器环境中运行）
+
+用法:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json   # 与保存的基线对比，退化时返回非零退出码
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# 使用离屏窗口和模拟GL后端，保证在没有显示器的机器上也能创建Kivy控件
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 所有基准测试：名称 -> (函数, 单位, 是否越大越好, 是否需要界面)
+BENCHMARKS = {}
+
+
+def benchmark(name, unit, higher_is_better=True, ui=False):
+    """注册一个基准测试函数，函数返回测得的数值"""
+    def register(func):
+        BENCHMARKS[name] = (func, unit, higher_is_better, ui)
+        return func
+    return register
+
+
+def best_of(func, repeat):
+    """运行 repeat 次，返回最短用时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def sample_boards(count, moves, seed=0):
+    """用随机走子生成 count 个对局中途的棋盘"""
+    from game2048.board import GameBoard
+    # 走子方向和新方块共用一个随机数流，每次运行得到相同的棋盘
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        game = GameBoard(rng=rng)
+        for _ in range(moves):
+            game.move(rng.randrange(4))
+            if game.game_over:
+                break
+        if not game.game_over:
+            boards.append(copy.deepcopy(game.board))
+    return boards
+
+
+def full_boards(count, seed=0):
+    """生成没有空格、也没有相邻相同方块的棋盘（游戏结束检查的最坏情况）"""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        a, b = 2 ** rng.randint(1, 6), 2 ** rng.randint(7, 12)
+        boards.append([[a if (i + j) % 2 else b for j in range(4)] for i in range(4)])
+    return boards
+
+
+def _engine(name):
+    """按名称取游戏类：'board' 为 GameBoard，'bitboard' 为 BitBoard（两者接口相同）"""
+    if name == 'bitboard':
+        from game2048.bitboard import BitBoard
+        return BitBoard
+    from game2048.board import GameBoard
+    return GameBoard
+
+
+def _games_for(boards, engine='board'):
+    """为每个棋盘准备一个独立的游戏对象（准备工作不计入用时）"""
+    cls = _engine(engine)
+    games = []
+    for k, board in enumerate(boards):
+        game = cls(seed=k)
+        game.board = copy.deepcopy(board)
+        games.append(game)
+    return games
+
+
+def _move_benchmark(direction, engine='board'):
+    def run(args):
+        boards = sample_boards(args.samples, 30)
+        elapsed = min(_timed_moves(_games_for(boards, engine), direction) for _ in range(args.repeat))
+        return len(boards) / elapsed
+    return run
+
+
+def _timed_moves(games, direction):
+    start = time.perf_counter()
+    for game in games:
+        game.move(direction)
+    return time.perf_counter() - start
+
+
+# bitboard_* 与同名的 GameBoard 测试使用相同的棋盘，两者的比值就是位棋盘引擎的加速比
+for _direction, _name in enumerate(('up', 'right', 'down', 'left')):
+    benchmark('move_%s' % _name, 'moves/s')(_move_benchmark(_direction))
+    benchmark('bitboard_move_%s' % _name, 'moves/s')(_move_benchmark(_direction, 'bitboard'))
+
+
+def half_full_boards(count, size, seed=0):
+    """生成 count 个约一半格子有方块的大棋盘"""
+    rng = random.Random(seed)
+    return [[[2 ** rng.randint(1, 7) if rng.random() < 0.5 else 0 for _ in range(size)]
+             for _ in range(size)] for _ in range(count)]
+
+
+def _large_move_benchmark(size):
+    def run(args):
+        from game2048.board import GameBoard
+        boards = half_full_boards(max(20, args.samples // (size * size) * 16), size)
+        best = float('inf')
+        for _ in range(args.repeat):
+            games = []
+            for k, board in enumerate(boards):
+                game = GameBoard(size, seed=k)
+                game.board = copy.deepcopy(board)
+                games.append(game)
+            # 四个方向轮流，每个棋盘只移动一次
+            start = time.perf_counter()
+            for k, game in enumerate(games):
+                game.move(k % 4)
+            best = min(best, time.perf_counter() - start)
+        return len(boards) / best
+    return run
+
+
+for _size in (16, 64):
+    benchmark('move_%dx%d' % (_size, _size), 'moves/s')(_large_move_benchmark(_size))
+
+
+@benchmark('add_random_tile', 'us', higher_is_better=False)
+def bench_add_random_tile(args):
+    """在对局中途的棋盘上添加新方块的平均用时"""
+    boards = sample_boards(args.samples, 30)
+    best = float('inf')
+    for _ in range(args.repeat):
+        games = _games_for(boards)
+        start = time.perf_counter()
+        for game in games:
+            game.add_random_tile()
+        best = min(best, time.perf_counter() - start)
+    return best / len(boards) * 1e6
+
+
+@benchmark('is_game_over_full', 'us', higher_is_better=False)
+def bench_is_game_over(args):
+    """在满棋盘上检查游戏是否结束的平均用时"""
+    games = _games_for(full_boards(args.samples))
+
+    def run():
+        for game in games:
+            game._is_game_over()
+    return best_of(run, args.repeat) / len(games) * 1e6
+
+
+@benchmark('legal_moves', 'us', higher_is_better=False)
+def bench_legal_moves(args):
+    """在对局中途的棋盘和满棋盘上求有效方向的平均用时"""
+    games = _games_for(sample_boards(args.samples // 2, 30) + full_boards(args.samples // 2))
+
+    def run():
+        for game in games:
+            game.legal_moves()
+    return best_of(run, args.repeat) / len(games) * 1e6
+
+
+def _random_game_benchmark(engine='board'):
+    def run(args):
+        """随机走子完整对局的吞吐量（包括无效移动）"""
+        cls = _engine(engine)
+
+        def play():
+            rng = random.Random(1)
+            moves = 0
+            while moves < args.samples * 10:
+                game = cls(rng=rng)
+                while not game.game_over:
+                    game.move(rng.randrange(4))
+                    moves += 1
+            return moves
+
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            moves = play()
+            best = min(best, (time.perf_counter() - start) / moves)
+        return 1 / best
+    return run
+
+
+benchmark('random_game', 'moves/s')(_random_game_benchmark('board'))
+benchmark('bitboard_random_game', 'moves/s')(_random_game_benchmark('bitboard'))
+
+
+@benchmark('monte_carlo_rollouts', 'rollouts/s')
+def bench_monte_carlo_rollouts(args):
+    """蒙特卡洛策略在当前进程中每秒完成的随机走子局数（不含进程池开销）"""
+    from game2048.rollout import MonteCarloPolicy
+    boards = sample_boards(4, 30)
+
+    best = 0.0
+    for _ in range(args.repeat):
+        policy = MonteCarloPolicy(rollouts=20, workers=1, seed=1)
+        for board in boards:
+            policy.best_move(board)
+        best = max(best, policy.rollouts_per_second)
+    return best
+
+
+@benchmark('vector_env_steps', 'steps/s')
+def bench_vector_env_steps(args):
+    """同步后端的向量化环境每秒推进的对局步数（1024局，独热观测）"""
+    import numpy as np
+    from game2048.env import VectorEnv
+
+    env = VectorEnv(1024, observation='onehot')
+    env.reset(seed=1)
+    actions = np.random.default_rng(1).integers(0, 4, (20, 1024))
+
+    def run():
+        for row in actions:
+            env.step(row)
+    return actions.size / best_of(run, args.repeat)
+
+
+def _update_board_benchmark(size):
+    def run(args):
+        """Game2048.update_board 每次调用的平均用时（大棋盘从约一半格子有方块的局面开始）"""
+        from game2048.ui import Game2048
+        widget = Game2048(board_size=size)
+        game = widget.game_board
+        game.reset(seed=2)
+        if size > 4:
+            game.board = half_full_boards(1, size)[0]
+        widget.update_board()
+        rng = random.Random(2)
+        start_board = copy.deepcopy(game.board)
+        frames = []
+        while len(frames) < args.samples:
+            diff = game.move(rng.randrange(4))
+            if diff.moved:
+                frames.append((copy.deepcopy(game.board), diff))
+            if game.game_over:
+                # 新开一局，这一帧需要整盘刷新
+                game.reset()
+                frames.append((copy.deepcopy(game.board), None))
+
+        best = float('inf')
+        for _ in range(args.repeat):
+            game.board = copy.deepcopy(start_board)
+            widget.update_board()
+            # 依次重放每一步的棋盘和变化记录，使每次调用都对应一次真实的移动
+            start = time.perf_counter()
+            for board, diff in frames:
+                # 直接替换棋盘列表，不计入 board 属性重新统计空格的用时
+                game._board = board
+                widget.update_board(diff.new_tile_pos if diff else None, diff)
+                game.won = False
+                game.game_over = False
+            best = min(best, time.perf_counter() - start)
+        return best / len(frames) * 1e3
+    return run
+
+
+benchmark('update_board', 'ms', higher_is_better=False, ui=True)(_update_board_benchmark(4))
+for _size in (16, 64):
+    benchmark('update_board_%dx%d' % (_size, _size), 'ms',
+              higher_is_better=False, ui=True)(_update_board_benchmark(_size))
+
+
+@benchmark('tile_update', 'us', higher_is_better=False, ui=True)
+def bench_tile_update(args):
+    """Tile.update_tile 每次调用的平均用时"""
+    from game2048.ui import Tile
+    tile = Tile(value=2)
+    values = [2 ** (i % 12 + 1) for i in range(args.samples)]
+
+    def run():
+        for value in values:
+            tile.value = value
+            tile.update_tile(animate=False)
+    return best_of(run, args.repeat) / len(values) * 1e6
+
+
+def _random_frames(count, size, seed=0):
+    """生成 count 帧随机棋盘，相邻两帧几乎每个格子都不同（整盘刷新的最坏情况）"""
+    rng = random.Random(seed)
+    return [[[2 ** rng.randint(1, 11) for _ in range(size)] for _ in range(size)]
+            for _ in range(count)]
+
+
+def _frame_benchmark(renderer, size):
+    def run(args):
+        from kivy.uix.gridlayout import GridLayout
+        from game2048.ui import Tile, BoardWidget
+        frames = _random_frames(max(10, args.samples // (size * size)), size)
+        if renderer == 'board':
+            widget = BoardWidget(board_size=size, size=(800, 800))
+
+            def draw(board):
+                widget.set_board(board)
+        else:
+            widget = GridLayout(cols=size, size=(800, 800))
+            tiles = []
+            for _ in range(size * size):
+                tile = Tile(value=0)
+                widget.add_widget(tile)
+                tiles.append(tile)
+
+            def draw(board):
+                for k, tile in enumerate(tiles):
+                    tile.value = board[k // size][k % size]
+
+        def frames_run():
+            for board in frames:
+                draw(board)
+        return best_of(frames_run, args.repeat) / len(frames) * 1e3
+    return run
+
+
+for _renderer, _sizes in (('tiles', (4, 8, 16)), ('board', (4, 8, 16, 64))):
+    for _size in _sizes:
+        benchmark('frame_%s_%dx%d' % (_renderer, _size, _size), 'ms',
+                  higher_is_better=False, ui=True)(_frame_benchmark(_renderer, _size))
+
+
+# 在新进程中启动应用，第一帧画出后退出并输出首帧用时（秒）
+_COLD_START_SCRIPT = """
+import sys
+sys.path.insert(0, %r)
+from game2048.ui import Game2048App
+from kivy.clock import Clock
+
+app = Game2048App()
+
+def check(dt):
+    if app.game.time_to_first_frame is not None:
+        print(app.game.time_to_first_frame)
+        app.stop()
+        return False
+
+Clock.schedule_interval(check, 0)
+app.run()
+"""
+
+
+@benchmark('time_to_first_frame', 'ms', higher_is_better=False, ui=True)
+def bench_time_to_first_frame(args):
+    """冷启动到第一帧画面提交的用时（新进程，含加载Kivy）"""
+    best = float('inf')
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', _COLD_START_SCRIPT % ROOT],
+                                capture_output=True, text=True, check=True).stdout
+        best = min(best, float(output.split()[-1]))
+    return best * 1e3
+
+
+def run_benchmarks(args):
+    results = {}
+    for name, (func, unit, higher_is_better, ui) in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        if ui and args.skip_ui:
+            continue
+        value = func(args)
+        results[name] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+        print("%-24s %14.2f %s" % (name, value, unit))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """与基线对比，返回退化的测试名称列表"""
+    regressions = []
+    print("\n%-24s %14s %14s %9s" % ("测试", "基线", "本次", "变化"))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]['value']
+        new = result['value']
+        change = (new - old) / old if old else 0.0
+        # 统一成“越大越好”的方向判断是否退化
+        worse = -change if result['higher_is_better'] else change
+        flag = ''
+        if worse > tolerance:
+            regressions.append(name)
+            flag = '  <- 退化'
+        print("%-24s %14.2f %14.2f %+8.1f%%%s" % (name, old, new, change * 100, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="2048基准测试")
+    parser.add_argument('--output', help="把结果写入JSON文件")
+    parser.add_argument('--baseline', help="与之对比的基线JSON文件")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="允许的退化比例（默认0.1即10%%）")
+    parser.add_argument('--samples', type=int, default=2000, help="每项测试的样本数")
+    parser.add_argument('--repeat', type=int, default=5, help="重复次数（取最好成绩）")
+    parser.add_argument('--skip-ui', action='store_true', help="跳过需要Kivy界面的测试")
+    parser.add_argument('--only', nargs='*', help="只运行指定名称的测试")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                },
+                'results': results,
+            }, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
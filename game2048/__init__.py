@@ -0,0 +1,25 @@
+"""2048游戏引擎包（除 game2048.ui 外不依赖Kivy，可在无界面环境中使用）
+
+子模块按需导入：BitBoard 的查找表和求解器的启发式表构建较慢，
+只用 GameBoard 时不会触发它们。
+"""
+
+# 名称 -> 所在子模块，第一次访问时才导入
+_EXPORTS = {
+    'GameBoard': 'board',
+    'MoveDiff': 'board',
+    'BitBoard': 'bitboard',
+    'ExpectimaxSolver': 'solver',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    from importlib import import_module
+    value = getattr(import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
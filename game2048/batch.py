@@ -0,0 +1,226 @@
+import random
+
+import numpy as np
+
+# 批量游戏板：用一个 (N, size, size) 的NumPy数组同时推进N局游戏
+# 规则与 GameBoard 完全一致：先去零，再从移动方向一侧两两合并，再去零；
+# 新方块在所有空格中均匀选择（行优先顺序），90%概率为2，10%概率为4
+#
+# 默认每个棋盘各用一个 random.Random，按 GameBoard.add_random_tile 的顺序取随机数，
+# 第i个棋盘与 GameBoard(size, seed=第i个种子) 的对局完全相同（新方块逐个棋盘生成）。
+# fast_rng=True 时改用一个NumPy随机数生成器一次为所有棋盘抽取新方块，更快，同一种子也可以复现，
+# 但抽取方式与 GameBoard 不同：这种模式下同一种子的对局与 GameBoard 不相同。
+
+
+def _to_left(boards, direction):
+    """把棋盘变换到“向左移动”的坐标系（返回视图）"""
+    if direction == 0:  # 上：转置后向左
+        return boards.transpose(0, 2, 1)
+    if direction == 1:  # 右：左右翻转后向左
+        return boards[:, :, ::-1]
+    if direction == 2:  # 下：转置并翻转后向左
+        return boards.transpose(0, 2, 1)[:, :, ::-1]
+    return boards
+
+
+def _compact_left(columns):
+    """把每行的非零方块按原顺序挤到左侧
+    columns: 形状为 (size, M) 的数组，columns[j] 是所有行的第j列
+    每一轮把紧跟在空格后面的方块左移一格，size-1 轮后全部靠左
+    """
+    size = len(columns)
+    for _ in range(size - 1):
+        for j in range(size - 1):
+            empty = columns[j] == 0
+            columns[j] = np.where(empty, columns[j + 1], columns[j])
+            columns[j + 1] = np.where(empty, 0, columns[j + 1])
+
+
+def merge_left(lines):
+    """对形状为 (M, size) 的多行同时执行 GameBoard 向左移动的规则
+    返回: (新的行, 每行得分)
+    """
+    # 按列存放，使每一列在内存中连续
+    columns = np.ascontiguousarray(lines.T)
+    _compact_left(columns)
+    gains = np.zeros(columns.shape[1], dtype=np.int64)
+    # 逐列从左到右合并，与原实现的顺序相同；每列的运算对所有行同时进行
+    for j in range(len(columns) - 1):
+        left = columns[j]
+        right = columns[j + 1]
+        merge = (left != 0) & (left == right)
+        left[merge] *= 2
+        right[merge] = 0
+        gains += np.where(merge, left, 0)
+    _compact_left(columns)
+    return columns.T, gains
+
+
+def merge_left_tracked(lines):
+    """与 merge_left 规则相同，另外给出每个方块的去向（供大棋盘的 GameBoard 生成 MoveDiff）
+    lines: 形状为 (M, size) 的数组
+    返回: (新的行, 总得分, 行号, 原位置, 新位置, 是否并入左侧方块)，后四项对每个非零方块各有一项
+
+    只处理非零方块，不按列逐格扫描，用时与方块数成正比：
+    压缩后方块的序号就是它在行内的排名；同一行中连续相同的数值构成一段，
+    段内第奇数个方块（从0数起）并入前一个，新位置等于排名减去它之前（含自身）被并入的方块数
+    """
+    size = lines.shape[1]
+    flat = lines.ravel()
+    index = np.flatnonzero(flat)
+    values = flat[index]
+    line, source = np.divmod(index, size)
+    count = len(index)
+    t = np.arange(count)
+
+    line_start = np.ones(count, dtype=bool)
+    line_start[1:] = line[1:] != line[:-1]
+    run_start = line_start.copy()
+    run_start[1:] |= values[1:] != values[:-1]
+    run_first = np.maximum.accumulate(np.where(run_start, t, 0))
+    absorbed = ~run_start & ((t - run_first) % 2 == 1)
+
+    first = np.maximum.accumulate(np.where(line_start, t, 0))
+    absorbed_count = np.cumsum(absorbed)
+    target = (t - first) - (absorbed_count - absorbed_count[first])
+
+    merged = np.zeros(count, dtype=bool)
+    merged[:-1] = absorbed[1:]
+    new_values = np.where(merged, values * 2, values)
+    kept = ~absorbed
+    new = np.zeros_like(lines)
+    new[line[kept], target[kept]] = new_values[kept]
+    gain = int(new_values[merged].sum())
+    return new, gain, line, source, target, absorbed
+
+
+class BatchGameBoard:
+    def __init__(self, n, size=4, seed=None, fast_rng=False):
+        """
+        n: 棋盘数
+        size: 棋盘边长
+        seed: 随机种子；默认模式下可以是整数（第i个棋盘用 seed+i）或长度为n的种子序列，
+            第i个棋盘与 GameBoard(size, seed=第i个种子) 的对局相同
+        fast_rng: 为True时所有棋盘共用一个NumPy随机数生成器（seed 为它的种子），
+            新方块一次抽取，更快，但对局与同一种子的 GameBoard 不同
+        """
+        self.n = n
+        self.size = size
+        self.rng = np.random.default_rng(seed if fast_rng else None)
+        self.rngs = None
+        if not fast_rng:
+            if seed is None or isinstance(seed, (int, np.integer)):
+                seeds = [None if seed is None else seed + i for i in range(n)]
+            else:
+                seeds = list(seed)
+                if len(seeds) != n:
+                    raise ValueError("种子数与棋盘数不同: %d != %d" % (len(seeds), n))
+            self.rngs = [random.Random(s) for s in seeds]
+        self.boards = np.zeros((n, size, size), dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.won = np.zeros(n, dtype=bool)
+        self.reset()
+
+    def reset(self, mask=None):
+        """重置全部（或 mask 选中的）游戏板"""
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        self.boards[mask] = 0
+        self.score[mask] = 0
+        self.game_over[mask] = False
+        self.won[mask] = False
+        self.add_random_tile(mask)
+        self.add_random_tile(mask)
+
+    def add_random_tile(self, mask=None):
+        """在 mask 选中的每个棋盘的随机空位置添加一个新方块
+        返回: 形状为 (N, 2) 的新方块位置，未添加的棋盘为 (-1, -1)
+        """
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        cells = self.size * self.size
+        flat = self.boards.reshape(self.n, cells)
+        empty = flat == 0
+        counts = empty.sum(axis=1)
+        mask = mask & (counts > 0)
+
+        rows = np.nonzero(mask)[0]
+        if self.rngs is None:
+            # 在空格中均匀选第k个（行优先顺序），再按90%/10%决定数值
+            k = (self.rng.random(self.n) * counts).astype(np.int64)
+            index = np.argmax(np.cumsum(empty, axis=1) > k[:, None], axis=1)
+            values = np.where(self.rng.random(self.n) < 0.9, 2, 4)
+        else:
+            # 与 GameBoard.add_random_tile 相同：先 randrange(空格数) 选格子，再 random() 决定数值
+            index = np.zeros(self.n, dtype=np.int64)
+            values = np.zeros(self.n, dtype=np.int64)
+            for b in rows:
+                rng = self.rngs[b]
+                index[b] = np.flatnonzero(empty[b])[rng.randrange(int(counts[b]))]
+                values[b] = 2 if rng.random() < 0.9 else 4
+
+        flat[rows, index[rows]] = values[rows]
+
+        positions = np.full((self.n, 2), -1, dtype=np.int64)
+        positions[rows, 0] = index[rows] // self.size
+        positions[rows, 1] = index[rows] % self.size
+        return positions
+
+    def move(self, directions):
+        """对每个棋盘按各自的方向移动
+        directions: 长度为N的数组，0=上, 1=右, 2=下, 3=左（其他值表示不移动）
+        返回: (移动是否有效, 本步得分, 新方块位置)
+        """
+        directions = np.asarray(directions)
+        gains = np.zeros(self.n, dtype=np.int64)
+        moved = np.zeros(self.n, dtype=bool)
+
+        for direction in range(4):
+            selected = np.nonzero(directions == direction)[0]
+            if len(selected) == 0:
+                continue
+            group = self.boards[selected]
+            lines = _to_left(group, direction)
+            new, line_gains = merge_left(lines.reshape(-1, self.size))
+
+            # 写回变换后的视图，group 随之更新到原坐标系
+            lines[...] = new.reshape(lines.shape)
+            moved[selected] = (group != self.boards[selected]).any(axis=(1, 2))
+            gains[selected] = line_gains.reshape(len(selected), self.size).sum(axis=1)
+            self.boards[selected] = group
+
+        self.score += gains
+        new_tile_pos = self.add_random_tile(moved)
+
+        # 检查是否达到2048
+        self.won |= moved & (self.boards == 2048).any(axis=(1, 2))
+
+        # 检查游戏是否结束
+        self.game_over[moved] = self._is_game_over()[moved]
+
+        return moved, gains, new_tile_pos
+
+    def legal_moves(self, out=None):
+        """每个棋盘的有效方向掩码，形状为 (N, 4)，列顺序为 0=上, 1=右, 2=下, 3=左
+        在“向左移动”的坐标系中，某一行能移动当且仅当存在空格右侧紧挨着方块，或两个相邻的相同方块
+        out: 可选的 (N, 4) 布尔数组，结果直接写入其中
+        """
+        if out is None:
+            out = np.empty((self.n, 4), dtype=bool)
+        for direction in range(4):
+            lines = _to_left(self.boards, direction)
+            left = lines[:, :, :-1]
+            right = lines[:, :, 1:]
+            slide = (left == 0) & (right != 0)
+            merge = (left != 0) & (left == right)
+            (slide | merge).any(axis=(1, 2), out=out[:, direction])
+        return out
+
+    def _is_game_over(self):
+        """检查每个棋盘是否结束：没有空格且没有相邻的相同方块"""
+        boards = self.boards
+        has_empty = (boards == 0).any(axis=(1, 2))
+        horizontal = (boards[:, :, :-1] == boards[:, :, 1:]).any(axis=(1, 2))
+        vertical = (boards[:, :-1, :] == boards[:, 1:, :]).any(axis=(1, 2))
+        return ~(has_empty | horizontal | vertical)
@@ -0,0 +1,319 @@
+import random
+
+# 位棋盘引擎：把4x4棋盘压缩进一个64位整数
+# 每个格子占4位，存放方块的指数（0=空，1=2，2=4，...，15=32768）
+# 格子(i, j)位于第 4 * (4 * i + j) 位，即第i行占据第16*i位起的16位
+# 两个32768合并得到的65536无法表示：execute_move（搜索使用）把结果截断为32768，
+# BitBoard.move 则抛出 ValueError，不会悄悄改变对局
+
+BOARD_SIZE = 4
+ROW_MASK = 0xFFFF
+CELL_MASK = 0xF
+MAX_EXPONENT = 15
+WIN_EXPONENT = 11  # 2048 = 2 ** 11
+
+
+def _reverse_row(row):
+    """反转一行中4个格子的顺序"""
+    return ((row >> 12) & 0xF) | ((row >> 4) & 0xF0) | ((row << 4) & 0xF00) | ((row << 12) & 0xF000)
+
+
+def _build_tables():
+    """构建所有65536种行状态的查找表（启动时只构建一次）"""
+    row_left = [0] * 65536
+    score_left = [0] * 65536
+    row_overflow = [False] * 65536
+    for row in range(65536):
+        line = [(row >> (4 * j)) & CELL_MASK for j in range(BOARD_SIZE)]
+
+        # 与 GameBoard 的移动规则相同：先去零，再从左到右两两合并
+        tiles = [e for e in line if e != 0]
+        merged = []
+        gain = 0
+        j = 0
+        while j < len(tiles):
+            if j + 1 < len(tiles) and tiles[j] == tiles[j + 1]:
+                exponent = min(tiles[j] + 1, MAX_EXPONENT)
+                merged.append(exponent)
+                gain += 1 << exponent
+                j += 2
+            else:
+                merged.append(tiles[j])
+                j += 1
+
+        result = 0
+        for j, e in enumerate(merged):
+            result |= e << (4 * j)
+        row_left[row] = result
+        score_left[row] = gain
+        # 去零后相邻的两个32768：无论向哪一侧移动都会合并出65536
+        row_overflow[row] = any(a == b == MAX_EXPONENT for a, b in zip(tiles, tiles[1:]))
+
+    # 向右移动等价于：反转行 -> 向左移动 -> 再反转
+    row_right = [0] * 65536
+    score_right = [0] * 65536
+    for row in range(65536):
+        rev = _reverse_row(row)
+        row_right[row] = _reverse_row(row_left[rev])
+        score_right[row] = score_left[rev]
+
+    # 列查找表：把一行的结果展开成一列（第j个格子放到第j行），
+    # 这样上下移动只需转置一次即可直接拼出结果
+    col_up = [_row_to_col(r) for r in row_left]
+    col_down = [_row_to_col(r) for r in row_right]
+
+    # 空格表：每行的空格编号元组，按行所在位置各建一张（元组在表间共享，只有16种）
+    row_empty = [[] for _ in range(BOARD_SIZE)]
+    patterns = [[tuple(BOARD_SIZE * i + j for j in range(BOARD_SIZE) if not (p >> j) & 1)
+                 for p in range(16)] for i in range(BOARD_SIZE)]
+    row_win = [False] * 65536
+    for row in range(65536):
+        line = [(row >> (4 * j)) & CELL_MASK for j in range(BOARD_SIZE)]
+        pattern = sum(1 << j for j in range(BOARD_SIZE) if line[j])
+        for i in range(BOARD_SIZE):
+            row_empty[i].append(patterns[i][pattern])
+        row_win[row] = WIN_EXPONENT in line
+
+    return (row_left, row_right, col_up, col_down, score_left, score_right, row_empty, row_win,
+            row_overflow)
+
+
+def _row_to_col(row):
+    """把16位的行展开为第0列（每个格子间隔16位）"""
+    return ((row & 0xF) | ((row & 0xF0) << 12)
+            | ((row & 0xF00) << 24) | ((row & 0xF000) << 36))
+
+
+(ROW_LEFT, ROW_RIGHT, COL_UP, COL_DOWN, SCORE_LEFT, SCORE_RIGHT,
+ ROW_EMPTY, ROW_WIN, ROW_OVERFLOW) = _build_tables()
+EMPTY0, EMPTY1, EMPTY2, EMPTY3 = ROW_EMPTY
+
+
+def transpose(state):
+    """转置棋盘（行列互换），用于把上下移动转换为左右移动"""
+    a1 = state & 0xF0F00F0FF0F00F0F
+    a2 = state & 0x0000F0F00000F0F0
+    a3 = state & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def flip_horizontal(state):
+    """左右翻转棋盘（每行内的格子倒序）"""
+    return (((state & 0x000F000F000F000F) << 12) | ((state & 0x00F000F000F000F0) << 4)
+            | ((state & 0x0F000F000F000F00) >> 4) | ((state & 0xF000F000F000F000) >> 12))
+
+
+def flip_vertical(state):
+    """上下翻转棋盘（行倒序）"""
+    return (((state & 0xFFFF) << 48) | ((state & 0xFFFF0000) << 16)
+            | ((state >> 16) & 0xFFFF0000) | (state >> 48))
+
+
+def symmetries(state):
+    """棋盘的8个对称变换（4个旋转及其镜像），第一个是原棋盘"""
+    h = flip_horizontal(state)
+    t = transpose(state)
+    ht = flip_horizontal(t)
+    return (state, h, flip_vertical(state), flip_vertical(h),
+            t, ht, flip_vertical(t), flip_vertical(ht))
+
+
+def execute_move(state, direction):
+    """在压缩状态上执行一次移动（不添加新方块）
+    direction: 0=上, 1=右, 2=下, 3=左
+    返回: (新状态, 本次得分)
+    两个32768合并时结果截断为32768（得分仍按32768计）；需要检查时用 overflows
+    """
+    if direction == 3:
+        rows, scores = ROW_LEFT, SCORE_LEFT
+    elif direction == 1:
+        rows, scores = ROW_RIGHT, SCORE_RIGHT
+    else:
+        # 上下移动：转置后每一行就是原来的一列，查列表直接还原到列的位置
+        t = transpose(state)
+        c0 = t & ROW_MASK
+        c1 = (t >> 16) & ROW_MASK
+        c2 = (t >> 32) & ROW_MASK
+        c3 = (t >> 48) & ROW_MASK
+        if direction == 0:
+            cols, scores = COL_UP, SCORE_LEFT
+        else:
+            cols, scores = COL_DOWN, SCORE_RIGHT
+        return ((cols[c0] | (cols[c1] << 4) | (cols[c2] << 8) | (cols[c3] << 12)),
+                scores[c0] + scores[c1] + scores[c2] + scores[c3])
+
+    r0 = state & ROW_MASK
+    r1 = (state >> 16) & ROW_MASK
+    r2 = (state >> 32) & ROW_MASK
+    r3 = (state >> 48) & ROW_MASK
+    return ((rows[r0] | (rows[r1] << 16) | (rows[r2] << 32) | (rows[r3] << 48)),
+            scores[r0] + scores[r1] + scores[r2] + scores[r3])
+
+
+def overflows(state, direction):
+    """这次移动是否会把两个32768合并成每格4位无法表示的65536"""
+    lines = transpose(state) if direction in (0, 2) else state
+    return (ROW_OVERFLOW[lines & ROW_MASK] or ROW_OVERFLOW[(lines >> 16) & ROW_MASK]
+            or ROW_OVERFLOW[(lines >> 32) & ROW_MASK] or ROW_OVERFLOW[(lines >> 48) & ROW_MASK])
+
+
+def empty_mask(state):
+    """返回空格子掩码：空格子对应半字节的最低位为1"""
+    x = state | (state >> 1)
+    x |= x >> 2
+    return ~x & 0x1111111111111111
+
+
+def empty_cells(state):
+    """按行优先顺序返回所有空格子的编号（4 * i + j）"""
+    return (EMPTY0[state & ROW_MASK] + EMPTY1[(state >> 16) & ROW_MASK]
+            + EMPTY2[(state >> 32) & ROW_MASK] + EMPTY3[(state >> 48) & ROW_MASK])
+
+
+def has_empty(state):
+    """判断棋盘上是否还有空格子"""
+    return empty_mask(state) != 0
+
+
+def legal_moves(state):
+    """返回所有有效的移动方向：查行表判断每一行能否左右移动，转置后判断上下"""
+    left = right = up = down = False
+    t = transpose(state)
+    for shift in (0, 16, 32, 48):
+        row = (state >> shift) & ROW_MASK
+        left = left or ROW_LEFT[row] != row
+        right = right or ROW_RIGHT[row] != row
+        col = (t >> shift) & ROW_MASK
+        up = up or ROW_LEFT[col] != col
+        down = down or ROW_RIGHT[col] != col
+    return [direction for direction, legal in enumerate((up, right, down, left)) if legal]
+
+
+def is_game_over(state):
+    """没有空格且四个方向都无法移动时游戏结束"""
+    if has_empty(state):
+        return False
+    for row_state in (state, transpose(state)):
+        for shift in (0, 16, 32, 48):
+            row = (row_state >> shift) & ROW_MASK
+            if ROW_LEFT[row] != row:
+                return False
+    return True
+
+
+def is_won(state):
+    """判断棋盘上是否有2048方块"""
+    return (ROW_WIN[state & ROW_MASK] or ROW_WIN[(state >> 16) & ROW_MASK]
+            or ROW_WIN[(state >> 32) & ROW_MASK] or ROW_WIN[(state >> 48) & ROW_MASK])
+
+
+def pack_board(board):
+    """把二维列表棋盘压缩为64位整数"""
+    state = 0
+    for i in range(BOARD_SIZE):
+        for j in range(BOARD_SIZE):
+            value = board[i][j]
+            if value:
+                exponent = value.bit_length() - 1
+                if exponent > MAX_EXPONENT:
+                    raise ValueError("位棋盘最多支持32768方块: %d" % value)
+                state |= exponent << (4 * (BOARD_SIZE * i + j))
+    return state
+
+
+def unpack_board(state):
+    """把64位整数解压为二维列表棋盘"""
+    board = []
+    for i in range(BOARD_SIZE):
+        row = []
+        for j in range(BOARD_SIZE):
+            exponent = (state >> (4 * (BOARD_SIZE * i + j))) & CELL_MASK
+            row.append(1 << exponent if exponent else 0)
+        board.append(row)
+    return board
+
+
+# 位棋盘游戏类，接口与 GameBoard 保持一致
+# 只支持4x4棋盘，方块最大为32768：会合并出65536的移动抛出 ValueError（GameBoard 没有这个限制）
+class BitBoard:
+    def __init__(self, size=4, seed=None, rng=None):
+        if size != BOARD_SIZE:
+            raise ValueError("位棋盘只支持4x4棋盘")
+        self.size = size
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.reset()
+
+    def reset(self, seed=None):
+        """重置游戏板，指定 seed 时同时重新设置随机种子"""
+        if seed is not None:
+            self.rng.seed(seed)
+        self.score = 0
+        self.state = 0
+        self.add_random_tile()
+        self.add_random_tile()
+        self.game_over = False
+        self.won = False
+
+    @property
+    def board(self):
+        """以二维列表形式返回棋盘（与 GameBoard.board 相同）"""
+        return unpack_board(self.state)
+
+    @board.setter
+    def board(self, board):
+        self.state = pack_board(board)
+
+    def add_random_tile(self):
+        """在随机空位置添加一个新方块（90%概率为2，10%概率为4）
+        随机数的使用顺序与 GameBoard.add_random_tile 相同，
+        因此相同的随机种子会得到完全相同的对局
+        """
+        cells = empty_cells(self.state)
+        if cells:
+            k = self.rng.choice(cells)
+            self.state |= (1 if self.rng.random() < 0.9 else 2) << (4 * k)
+            return divmod(k, BOARD_SIZE)
+        return None
+
+    def legal_moves(self):
+        """返回所有有效的移动方向"""
+        return legal_moves(self.state)
+
+    def move(self, direction):
+        """移动方块
+        direction: 0=上, 1=右, 2=下, 3=左
+        返回: (移动是否有效, 新方块位置)
+        会合并两个32768时抛出 ValueError，棋盘保持不变
+        """
+        if direction not in (0, 1, 2, 3):
+            return False, None
+
+        state = self.state
+        new_state, gain = execute_move(state, direction)
+        if new_state == state:
+            return False, None
+        # 只有合并出32768及以上时得分才会这么高，平时不必检查
+        if gain >= 1 << MAX_EXPONENT and overflows(state, direction):
+            raise ValueError("位棋盘最多支持32768方块，不能合并两个32768")
+
+        # 添加新方块（与 add_random_tile 相同，内联以减少函数调用开销）
+        cells = (EMPTY0[new_state & ROW_MASK] + EMPTY1[(new_state >> 16) & ROW_MASK]
+                 + EMPTY2[(new_state >> 32) & ROW_MASK] + EMPTY3[(new_state >> 48) & ROW_MASK])
+        rng = self.rng
+        k = rng.choice(cells)
+        new_state |= (1 if rng.random() < 0.9 else 2) << (4 * k)
+        self.state = new_state
+        self.score += gain
+
+        # 检查是否达到2048
+        if not self.won and is_won(new_state):
+            self.won = True
+
+        # 检查游戏是否结束（只有填满最后一个空格时才可能结束）
+        self.game_over = len(cells) == 1 and is_game_over(new_state)
+
+        return True, divmod(k, BOARD_SIZE)
@@ -0,0 +1,422 @@
+import random
+
+from .history import History
+
+# 一次移动的变化记录，界面和录像可以直接使用，无需重新扫描整个棋盘
+class MoveDiff:
+    def __init__(self):
+        self.moved = False
+        self.score_gain = 0
+        self.slides = []     # 只滑动未合并的方块: [((原行, 原列), (新行, 新列)), ...]
+        self.merges = []     # 合并: [((方块1原位置), (方块2原位置), (合并后位置), 新数值), ...]
+        self.new_tile = None  # 新方块: (行, 列, 数值)
+
+    @property
+    def new_tile_pos(self):
+        """新方块位置 (行, 列)，没有新方块时为None"""
+        return self.new_tile[:2] if self.new_tile else None
+
+    def __iter__(self):
+        """兼容旧的返回值：moved, new_tile_pos = board.move(direction)"""
+        return iter((self.moved, self.new_tile_pos))
+
+    def changed_cells(self):
+        """数值发生变化的所有格子 {(行, 列), ...}：滑动的起止位置、合并的三个位置和新方块"""
+        cells = set()
+        for source, target in self.slides:
+            cells.add(source)
+            cells.add(target)
+        for source_a, source_b, target, _ in self.merges:
+            cells.add(source_a)
+            cells.add(source_b)
+            cells.add(target)
+        if self.new_tile:
+            cells.add(self.new_tile_pos)
+        return cells
+
+    def __repr__(self):
+        return 'MoveDiff(moved=%r, score_gain=%r, slides=%r, merges=%r, new_tile=%r)' % (
+            self.moved, self.score_gain, self.slides, self.merges, self.new_tile)
+
+
+# 大棋盘一次移动的变化记录：内容与 MoveDiff 相同，但保存为NumPy数组，
+# slides / merges 第一次访问时才转换为列表，不需要逐个方块的信息时（无界面对局）没有额外开销
+class ArrayMoveDiff(MoveDiff):
+    def __init__(self, size, score_gain, source, target, slid, merged, merged_values):
+        """
+        size: 棋盘边长
+        source, target: 每个方块移动前后的坐标 (行数组, 列数组)
+        slid: 只滑动未合并的方块
+        merged: 合并后保留的方块（下一个方块并入它）
+        merged_values: 每次合并的新数值
+        """
+        self.moved = True
+        self.score_gain = score_gain
+        self.new_tile = None
+        self._size = size
+        self._source = source
+        self._target = target
+        self._slid = slid
+        self._merged = merged
+        self._merged_values = merged_values
+        self._slides = None
+        self._merges = None
+
+    @property
+    def slides(self):
+        if self._slides is None:
+            (src_i, src_j), (dst_i, dst_j) = self._source, self._target
+            slid = self._slid
+            self._slides = list(zip(zip(src_i[slid].tolist(), src_j[slid].tolist()),
+                                    zip(dst_i[slid].tolist(), dst_j[slid].tolist())))
+        return self._slides
+
+    @property
+    def merges(self):
+        if self._merges is None:
+            import numpy as np
+            (src_i, src_j), (dst_i, dst_j) = self._source, self._target
+            a = np.flatnonzero(self._merged)
+            b = a + 1
+            self._merges = list(zip(zip(src_i[a].tolist(), src_j[a].tolist()),
+                                    zip(src_i[b].tolist(), src_j[b].tolist()),
+                                    zip(dst_i[a].tolist(), dst_j[a].tolist()),
+                                    self._merged_values.tolist()))
+        return self._merges
+
+    def changed_cells(self):
+        import numpy as np
+        (src_i, src_j), (dst_i, dst_j) = self._source, self._target
+        changed = self._slid | self._merged
+        changed[1:] |= self._merged[:-1]
+        size = self._size
+        flat = np.unique(np.concatenate((src_i[changed] * size + src_j[changed],
+                                         dst_i[changed] * size + dst_j[changed])))
+        cells = set(zip(*(part.tolist() for part in np.divmod(flat, size))))
+        if self.new_tile:
+            cells.add(self.new_tile_pos)
+        return cells
+
+
+# 游戏板类，处理游戏逻辑
+class GameBoard:
+    # 边长不小于该值时用NumPy一次移动所有行（列），否则逐格处理
+    VECTORIZE_MIN_SIZE = 32
+    
+    def __init__(self, size=4, seed=None, rng=None, history_bytes=0):
+        """
+        size: 棋盘边长
+        seed: 随机种子，相同种子产生相同的新方块序列
+        rng: 自定义随机数生成器（需提供 randrange 和 random 方法），优先于 seed
+        history_bytes: 撤销/重做历史的内存上限（字节），为0时不记录历史
+        """
+        self.size = size
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.history = History(size, history_bytes) if history_bytes else None
+        # 大棋盘走NumPy向量化路径，不需要逐格的坐标表
+        self._vectorized = size >= self.VECTORIZE_MIN_SIZE
+        self._lines = None if self._vectorized else self._build_lines(size)
+        self._masks = self._build_masks(size)
+        self.reset()
+    
+    @staticmethod
+    def _build_lines(size):
+        """预先计算每个方向上所有行/列的格子坐标及对应的空格掩码位，从移动方向的一侧开始排列"""
+        rows = range(size)
+        lines = (
+            [[(i, j) for i in rows] for j in rows],                   # 上
+            [[(i, j) for j in reversed(rows)] for i in rows],         # 右
+            [[(i, j) for i in reversed(rows)] for j in rows],         # 下
+            [[(i, j) for j in rows] for i in rows],                   # 左
+        )
+        return tuple([(line, [1 << (i * size + j) for i, j in line]) for line in direction]
+                     for direction in lines)
+    
+    @staticmethod
+    def _build_masks(size):
+        """预先计算空格掩码上用到的整盘掩码：(全部格子, 除去第一列, 除去最后一列)"""
+        full = (1 << (size * size)) - 1
+        first_col = sum(1 << (i * size) for i in range(size))
+        last_col = first_col << (size - 1)
+        return full, full & ~first_col, full & ~last_col
+    
+    @staticmethod
+    def merge_line(line):
+        """把一行数值向 line[0] 一侧移动合并（规则与 move 相同），不修改棋盘、不添加新方块
+        返回: (移动后的一行, 本行得分)
+        """
+        tiles = [value for value in line if value]
+        merged = []
+        gain = 0
+        k = 0
+        while k < len(tiles):
+            value = tiles[k]
+            if k + 1 < len(tiles) and tiles[k + 1] == value:
+                value *= 2
+                gain += value
+                k += 2
+            else:
+                k += 1
+            merged.append(value)
+        merged.extend([0] * (len(line) - len(merged)))
+        return merged, gain
+    
+    @property
+    def board(self):
+        """棋盘（二维列表）
+        直接修改单个格子（board[i][j] = v）不会更新空格掩码；add_random_tile 选到非空格子时会重新计算，
+        其他情况下修改后应重新赋值整个棋盘（board = board）
+        """
+        return self._board
+    
+    @board.setter
+    def board(self, board):
+        self._board = board
+        # 空格掩码：格子(i, j)为空时第 i * size + j 位为1，随移动增量更新
+        self._empty = 0
+        for i, row in enumerate(board):
+            for j, value in enumerate(row):
+                if value == 0:
+                    self._empty |= 1 << (i * self.size + j)
+    
+    def reset(self, seed=None):
+        """重置游戏板，指定 seed 时同时重新设置随机种子"""
+        if seed is not None:
+            self.rng.seed(seed)
+        self.score = 0
+        self.board = [[0 for _ in range(self.size)] for _ in range(self.size)]
+        self.add_random_tile()
+        self.add_random_tile()
+        self.game_over = False
+        self.won = False
+        if self.history is not None:
+            self.history.clear()
+            self.history.push(self._board, self.score)
+    
+    def undo(self):
+        """撤销上一次有效移动，返回是否成功"""
+        return self._restore(self.history.undo() if self.history is not None else None)
+    
+    def redo(self):
+        """重做被撤销的移动，返回是否成功"""
+        return self._restore(self.history.redo() if self.history is not None else None)
+    
+    def _restore(self, state):
+        """恢复历史中的 (棋盘, 分数)；won 保持不变，避免界面重复提示达到2048"""
+        if state is None:
+            return False
+        self.board, self.score = state
+        self.game_over = self._is_game_over()
+        return True
+    
+    def add_random_tile(self):
+        """在随机空位置添加一个新方块（90%概率为2，10%概率为4）"""
+        empty = self._empty
+        if not empty:
+            return None
+        
+        # 在所有空格中均匀选出第k个（按行优先顺序）：
+        # 先按每行的空格数跳过整行，再在所在行中遍历掩码位，大棋盘上也只需很少的步数
+        k = self.rng.randrange(empty.bit_count())
+        size = self.size
+        row_mask = (1 << size) - 1
+        i = 0
+        row = empty & row_mask
+        count = row.bit_count()
+        while k >= count:
+            k -= count
+            i += 1
+            row = (empty >> (i * size)) & row_mask
+            count = row.bit_count()
+        for _ in range(k):
+            row &= row - 1
+        j = (row & -row).bit_length() - 1
+        if self._board[i][j]:
+            # 格子被直接修改过，空格掩码已过期：按棋盘重新计算后再选
+            self.board = self._board
+            return self.add_random_tile()
+        self._empty ^= 1 << (i * size + j)
+        self._board[i][j] = 2 if self.rng.random() < 0.9 else 4
+        return i, j
+    
+    def move(self, direction, spawn=None):
+        """移动方块
+        direction: 0=上, 1=右, 2=下, 3=左
+        spawn: 指定新方块 (行, 列, 数值)，用于回放录像；为None时随机生成
+        返回: MoveDiff（可按旧接口解包为 (移动是否有效, 新方块位置)）
+        """
+        if direction not in (0, 1, 2, 3):
+            return MoveDiff()
+        
+        # 逐行（列）原地移动，处理过程中就能知道是否有方块移动，无需复制整个棋盘
+        if self._vectorized:
+            diff = self._move_vectorized(direction)
+        else:
+            diff = MoveDiff()
+            for line, bits in self._lines[direction]:
+                self._move_line(line, bits, diff)
+        
+        # 如果移动有效，添加新方块
+        if diff.moved:
+            self.score += diff.score_gain
+            if spawn is None:
+                new_tile_pos = self.add_random_tile()
+            else:
+                i, j, value = spawn
+                self._board[i][j] = value
+                self._empty &= ~(1 << (i * self.size + j))
+                new_tile_pos = (i, j)
+            if new_tile_pos:
+                i, j = new_tile_pos
+                diff.new_tile = (i, j, self._board[i][j])
+            
+            # 检查是否达到2048
+            if not self.won and any(2048 in row for row in self._board):
+                self.won = True
+            
+            # 检查游戏是否结束
+            self.game_over = self._is_game_over()
+            
+            if self.history is not None:
+                self.history.push(self._board, self.score)
+        
+        return diff
+    
+    def _move_line(self, line, bits, diff):
+        """把一行（列）的方块向 line[0] 一侧移动并合并，结果直接写回棋盘
+        规则与原来相同：先去零，再从移动方向一侧开始两两合并，合并后的方块不再参与合并
+        bits: 每个格子在空格掩码中对应的位，随方块移动同步更新
+        """
+        board = self._board
+        empty = self._empty
+        target = 0          # 下一个方块要放的位置
+        last_value = 0      # target-1 处可以参与合并的方块数值（0表示不可合并）
+        last_source = None  # target-1 处方块的原位置
+        for k in range(len(line)):
+            i, j = line[k]
+            value = board[i][j]
+            if value == 0:
+                continue
+            
+            if value == last_value:
+                # 与上一个方块合并
+                ti, tj = line[target - 1]
+                merged = value * 2
+                board[ti][tj] = merged
+                board[i][j] = 0
+                empty ^= bits[k]
+                diff.score_gain += merged
+                diff.merges.append((last_source, line[k], line[target - 1], merged))
+                diff.moved = True
+                last_value = 0
+                last_source = None
+                continue
+            
+            # 上一个方块确定不再合并，如果位置变了就记为滑动
+            if last_source is not None and last_source != line[target - 1]:
+                diff.slides.append((last_source, line[target - 1]))
+            
+            if k != target:
+                ti, tj = line[target]
+                board[ti][tj] = value
+                board[i][j] = 0
+                empty ^= bits[k] | bits[target]
+                diff.moved = True
+            last_value = value
+            last_source = line[k]
+            target += 1
+        
+        if last_source is not None and last_source != line[target - 1]:
+            diff.slides.append((last_source, line[target - 1]))
+        self._empty = empty
+    
+    def _move_vectorized(self, direction):
+        """大棋盘的移动：用NumPy同时处理所有行（列），规则与 _move_line 相同
+        返回: ArrayMoveDiff，没有方块移动时返回空的 MoveDiff
+        """
+        import numpy as np
+        from .batch import _to_left, merge_left_tracked
+        
+        size = self.size
+        board = np.array(self._board, dtype=np.int64)
+        lines = _to_left(board[None], direction)[0]
+        new, gain, line, source, target, absorbed = merge_left_tracked(lines)
+        merged = np.zeros(len(absorbed), dtype=bool)
+        merged[:-1] = absorbed[1:]
+        slid = (source != target) & ~absorbed & ~merged
+        if not (slid.any() or merged.any()):
+            return MoveDiff()
+        
+        # 写回变换后的视图，board 随之更新到原坐标系
+        lines[...] = new
+        
+        # 把 (行号, 行内位置) 换回棋盘坐标
+        if direction == 0:
+            src, dst = (source, line), (target, line)
+        elif direction == 1:
+            src, dst = (line, size - 1 - source), (line, size - 1 - target)
+        elif direction == 2:
+            src, dst = (size - 1 - source, line), (size - 1 - target, line)
+        else:
+            src, dst = (line, source), (line, target)
+        merged_values = board[dst[0][merged], dst[1][merged]]
+        
+        # 只把发生变化的行写回二维列表（保持原列表对象不变）
+        changed = slid | merged | absorbed
+        for i in np.unique(np.concatenate((src[0][changed], dst[0][changed]))).tolist():
+            self._board[i][:] = board[i].tolist()
+        empty = np.packbits(board.ravel() == 0, bitorder='little')
+        self._empty = int.from_bytes(empty.tobytes(), 'little')
+        return ArrayMoveDiff(size, gain, src, dst, slid, merged, merged_values)
+    
+    def legal_moves(self):
+        """返回所有有效的移动方向（按 0=上, 1=右, 2=下, 3=左 排序）
+        滑动只看空格掩码：某个方块在移动方向上紧挨着空格就能滑动，
+        用移位后的整盘掩码一次检查所有行（列）；只有滑动不能覆盖的方向才检查相邻的相同方块
+        """
+        size = self.size
+        full, not_first_col, not_last_col = self._masks
+        empty = self._empty
+        occupied = full & ~empty
+        up = bool(empty & (occupied >> size))
+        right = bool(empty & (occupied << 1) & not_first_col)
+        down = bool(empty & (occupied << size) & full)
+        left = bool(empty & (occupied >> 1) & not_last_col)
+        
+        # 相邻的相同方块可以合并：水平相邻对应左右，垂直相邻对应上下
+        if not (left and right) and self._has_pair(horizontal=True):
+            left = right = True
+        if not (up and down) and self._has_pair(horizontal=False):
+            up = down = True
+        return [direction for direction, legal in enumerate((up, right, down, left)) if legal]
+    
+    def canonical(self):
+        """对称规范形式：(规范键, 变换编号)，互为旋转/镜像的棋盘得到同一个规范键
+        方向用 symmetry.to_canonical_direction / from_canonical_direction 在两者之间换算
+        """
+        from .symmetry import canonical_board
+        return canonical_board(self._board)
+    
+    def _has_pair(self, horizontal):
+        """是否存在水平（或垂直）相邻的两个相同非零方块"""
+        board = self._board
+        size = self.size
+        if horizontal:
+            for row in board:
+                for j in range(size - 1):
+                    if row[j] and row[j] == row[j + 1]:
+                        return True
+        else:
+            for i in range(size - 1):
+                row = board[i]
+                below = board[i + 1]
+                for j in range(size):
+                    if row[j] and row[j] == below[j]:
+                        return True
+        return False
+    
+    def _is_game_over(self):
+        """检查游戏是否结束：没有空格且没有相邻的相同方块"""
+        if self._empty:
+            return False
+        return not self._has_pair(horizontal=True) and not self._has_pair(horizontal=False)
@@ -0,0 +1,37 @@
+"""方块的背景色和文字颜色（引擎和界面共用，不依赖Kivy）"""
+
+# 定义方块颜色映射
+TILE_COLORS = {
+    0: (205/255, 193/255, 180/255, 1),  # 空白方块
+    2: (238/255, 228/255, 218/255, 1),
+    4: (237/255, 224/255, 200/255, 1),
+    8: (242/255, 177/255, 121/255, 1),
+    16: (245/255, 149/255, 99/255, 1),
+    32: (246/255, 124/255, 95/255, 1),
+    64: (246/255, 94/255, 59/255, 1),
+    128: (237/255, 207/255, 114/255, 1),
+    256: (237/255, 204/255, 97/255, 1),
+    512: (237/255, 200/255, 80/255, 1),
+    1024: (237/255, 197/255, 63/255, 1),
+    2048: (237/255, 194/255, 46/255, 1),
+    4096: (60/255, 58/255, 50/255, 1),
+    8192: (60/255, 58/255, 50/255, 1)
+}
+
+# 定义方块文字颜色
+TEXT_COLORS = {
+    0: (0, 0, 0, 0),  # 透明
+    2: (119/255, 110/255, 101/255, 1),
+    4: (119/255, 110/255, 101/255, 1),
+    8: (249/255, 246/255, 242/255, 1),
+    16: (249/255, 246/255, 242/255, 1),
+    32: (249/255, 246/255, 242/255, 1),
+    64: (249/255, 246/255, 242/255, 1),
+    128: (249/255, 246/255, 242/255, 1),
+    256: (249/255, 246/255, 242/255, 1),
+    512: (249/255, 246/255, 242/255, 1),
+    1024: (249/255, 246/255, 242/255, 1),
+    2048: (249/255, 246/255, 242/255, 1),
+    4096: (249/255, 246/255, 242/255, 1),
+    8192: (249/255, 246/255, 242/255, 1)
+}
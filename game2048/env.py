@@ -0,0 +1,261 @@
+"""Gym 风格的向量化环境：同时推进N局游戏，观测直接写在预先分配的NumPy缓冲区中
+
+用法:
+    env = VectorEnv(256, observation='onehot')
+    obs = env.reset(seed=0)
+    while training:
+        obs, reward, done, info = env.step(actions)   # actions: 长度为N的方向数组
+        mask = info['action_mask']                     # (N, 4) 有效方向
+
+step/reset 返回的数组都是内部缓冲区的视图，下一次 step 时会被覆盖，需要保存时请自行复制。
+结束的对局在 step 中自动重新开始：done[i] 为 True 时 obs[i] 已经是新一局的初始局面，
+结束那一局的分数和最大方块在 info['final_score'] / info['final_max_tile'] 中。
+
+后端：
+    'sync'    在当前进程中用 BatchGameBoard 一次推进所有棋盘
+    'shared'  把棋盘分给多个工作进程，所有缓冲区放在共享内存中，
+              工作进程直接写入各自负责的那一段，主进程和工作进程之间只传递命令
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .batch import BatchGameBoard
+
+OBSERVATIONS = ('exponent', 'onehot')
+BACKENDS = ('sync', 'shared')
+
+
+def _layout(n, size, observation, planes, obs_dtype):
+    """所有缓冲区的 (名称, 形状, 类型)，同步后端和共享内存后端使用同样的布局
+    按元素大小从大到小排列，每个数组都按自身类型对齐
+    """
+    if observation == 'exponent':
+        obs_shape = (n, size, size)
+    else:
+        obs_shape = (n, planes, size, size)
+    return (
+        ('actions', (n,), np.dtype(np.int64)),
+        ('reward', (n,), np.dtype(np.int64)),
+        ('score', (n,), np.dtype(np.int64)),
+        ('final_score', (n,), np.dtype(np.int64)),
+        ('final_max_tile', (n,), np.dtype(np.int64)),
+        ('obs', obs_shape, np.dtype(obs_dtype)),
+        ('done', (n,), np.dtype(bool)),
+        ('action_mask', (n, 4), np.dtype(bool)),
+    )
+
+
+def _nbytes(layout):
+    return sum(int(np.prod(shape)) * dtype.itemsize for _, shape, dtype in layout)
+
+
+def _carve(buffer, layout):
+    """按布局把一块内存切分成各个数组（不复制）"""
+    arrays = {}
+    offset = 0
+    for name, shape, dtype in layout:
+        arrays[name] = np.ndarray(shape, dtype, buffer=buffer, offset=offset)
+        offset += int(np.prod(shape)) * dtype.itemsize
+    return arrays
+
+
+# 推进一段棋盘并把结果写入给定的缓冲区（数组都是外部缓冲区中对应这一段的视图）
+class _Core:
+    def __init__(self, arrays, size, observation, planes, first=0):
+        """first: 这一段第一个棋盘的编号，用于派生随机种子"""
+        self.arrays = arrays
+        self.n = len(arrays['actions'])
+        self.size = size
+        self.observation = observation
+        self.planes = planes
+        self.first = first
+        # 随机数由 reset 按 (seed, 棋盘编号) 设置，用共享的NumPy生成器一次抽取所有新方块
+        self.board = BatchGameBoard(self.n, size, fast_rng=True)
+        # 编码观测用的临时数组也预先分配好
+        self._values = np.empty((self.n, size, size), dtype=np.int64)
+        self._log2 = np.empty((self.n, size, size), dtype=np.float64)
+        self._exponents = np.empty((self.n, size, size), dtype=np.int64)
+        self._plane_ids = np.arange(planes).reshape(1, planes, 1, 1)
+
+    def reset(self, seed=None):
+        """重新开始所有对局；seed 不为None时按 (seed, 棋盘编号) 重新设置随机数"""
+        board = self.board
+        if seed is not None:
+            board.rng = np.random.default_rng([seed, self.first])
+        board.reset()
+        arrays = self.arrays
+        arrays['reward'][:] = 0
+        arrays['done'][:] = False
+        arrays['score'][:] = 0
+        arrays['final_score'][:] = 0
+        arrays['final_max_tile'][:] = 0
+        self._observe()
+
+    def step(self):
+        """按 arrays['actions'] 中的方向推进一步"""
+        arrays = self.arrays
+        board = self.board
+        _, gains, _ = board.move(arrays['actions'])
+        done = arrays['done']
+        done[:] = board.game_over
+        arrays['reward'][:] = gains
+        if done.any():
+            arrays['final_score'][done] = board.score[done]
+            arrays['final_max_tile'][done] = board.boards[done].max(axis=(1, 2))
+            board.reset(done)
+        arrays['score'][:] = board.score
+        self._observe()
+
+    def _observe(self):
+        """把棋盘编码到观测缓冲区，并更新有效方向掩码"""
+        boards = self.board.boards
+        # 方块都是2的幂，log2 是精确的；空格先换成1，得到指数0
+        np.maximum(boards, 1, out=self._values)
+        np.log2(self._values, out=self._log2)
+        obs = self.arrays['obs']
+        if self.observation == 'exponent':
+            np.copyto(obs, self._log2, casting='unsafe')
+        else:
+            np.copyto(self._exponents, self._log2, casting='unsafe')
+            np.minimum(self._exponents, self.planes - 1, out=self._exponents)
+            np.equal(self._exponents[:, None], self._plane_ids, out=obs)
+        self.board.legal_moves(out=self.arrays['action_mask'])
+
+
+def _worker(conn, name, layout, size, observation, planes, first, last):
+    """共享内存后端的工作进程：负责编号在 [first, last) 之间的棋盘"""
+    memory = None
+    try:
+        memory = shared_memory.SharedMemory(name=name)
+        arrays = {key: array[first:last] for key, array in _carve(memory.buf, layout).items()}
+        core = _Core(arrays, size, observation, planes, first)
+        while True:
+            command, argument = conn.recv()
+            if command == 'step':
+                core.step()
+            elif command == 'reset':
+                core.reset(argument)
+            else:
+                break
+            conn.send(None)
+    finally:
+        # 数组引用着共享内存，关闭之前必须先释放
+        core = arrays = None
+        if memory is not None:
+            memory.close()
+        conn.close()
+
+
+class VectorEnv:
+    def __init__(self, num_envs, size=4, observation='exponent', backend='sync', workers=None,
+                 planes=16, obs_dtype=np.uint8):
+        """
+        num_envs: 同时进行的对局数
+        size: 棋盘边长
+        observation: 'exponent' 观测为 (N, size, size) 的方块指数（0=空，1=2，2=4，...）；
+            'onehot' 观测为 (N, planes, size, size) 的独热平面，指数超过 planes-1 的方块计入最后一个平面
+        backend: 'sync' 在当前进程中推进；'shared' 用共享内存在多个工作进程中推进
+        workers: 共享内存后端的进程数，默认为CPU数（不超过 num_envs）
+        obs_dtype: 观测的数据类型，例如 np.uint8 或 np.float32
+        """
+        if observation not in OBSERVATIONS:
+            raise ValueError("未知观测类型: %s" % observation)
+        if backend not in BACKENDS:
+            raise ValueError("未知后端: %s" % backend)
+        self.num_envs = num_envs
+        self.size = size
+        self.observation = observation
+        self.backend = backend
+        self.planes = planes
+        self.layout = _layout(num_envs, size, observation, planes, obs_dtype)
+        self._memory = None
+        self._workers = []
+        self._core = None
+
+        if backend == 'sync':
+            self._buffer = bytearray(_nbytes(self.layout))
+            self.arrays = _carve(self._buffer, self.layout)
+            self._core = _Core(self.arrays, size, observation, planes)
+        else:
+            self._memory = shared_memory.SharedMemory(create=True, size=_nbytes(self.layout))
+            self.arrays = _carve(self._memory.buf, self.layout)
+            workers = min(workers or multiprocessing.cpu_count(), num_envs)
+            bounds = np.linspace(0, num_envs, workers + 1).astype(int)
+            for first, last in zip(bounds[:-1], bounds[1:]):
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_worker, args=(child, self._memory.name, self.layout, size,
+                                          observation, planes, int(first), int(last)),
+                    daemon=True)
+                process.start()
+                child.close()
+                self._workers.append((process, parent))
+
+        self.info = {
+            'action_mask': self.arrays['action_mask'],
+            'score': self.arrays['score'],
+            'final_score': self.arrays['final_score'],
+            'final_max_tile': self.arrays['final_max_tile'],
+        }
+
+    @property
+    def observation_shape(self):
+        """单个环境的观测形状"""
+        return self.arrays['obs'].shape[1:]
+
+    def _broadcast(self, command, argument=None):
+        for _, conn in self._workers:
+            conn.send((command, argument))
+        for _, conn in self._workers:
+            conn.recv()
+
+    def reset(self, seed=None):
+        """重新开始所有对局，返回观测
+        seed: 随机种子；同一种子、同样的后端和进程数得到完全相同的对局
+        """
+        if self._core is not None:
+            self._core.reset(seed)
+        else:
+            self._broadcast('reset', seed)
+        return self.arrays['obs']
+
+    def step(self, actions):
+        """所有对局各走一步
+        actions: 长度为N的方向（0=上, 1=右, 2=下, 3=左），无效方向不移动、奖励为0
+        返回: (obs, reward, done, info)，都是内部缓冲区的视图
+        """
+        self.arrays['actions'][:] = actions
+        if self._core is not None:
+            self._core.step()
+        else:
+            self._broadcast('step')
+        arrays = self.arrays
+        return arrays['obs'], arrays['reward'], arrays['done'], self.info
+
+    def action_masks(self):
+        """(N, 4) 有效方向掩码（缓冲区的视图）"""
+        return self.arrays['action_mask']
+
+    def close(self):
+        """结束工作进程并释放共享内存"""
+        for process, conn in self._workers:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join()
+            conn.close()
+        self._workers = []
+        if self._memory is not None:
+            self.arrays = self.info = None
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
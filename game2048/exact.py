@@ -0,0 +1,515 @@
+"""小棋盘（2x2、3x3）的精确解：枚举所有可达局面，用动态规划求最优期望得分
+
+用法:
+    python -m game2048.exact solve 2 --output exact2.tbl
+    python -m game2048.exact solve 3 --output exact3.tbl --max-sum 128   # 只求解方块总和不超过128的局面
+    python -m game2048.exact score exact3.tbl --policy greedy --games 1000
+
+规则与 GameBoard 相同：开局两个新方块，每次有效移动后在随机空格添加新方块（90%为2，10%为4）。
+每次移动加新方块后方块总和增加2或4，所以可达局面按方块总和分层：
+先从开局逐层向前枚举所有可达局面，再从总和最大的一层向后计算
+    V(s) = max_a [本步得分 + E(新方块) V(s')]，无法移动时 V(s) = 0
+同时沿最优策略计算到达每种方块的概率。局面都按对称规范形式（8个旋转/镜像中最小的一个）存放。
+
+结果表格式（小端序，mmap 后直接按下标读取）：
+    头部 64字节: b'G2048EXT', 边长, 局面数, 方块种数T, 开局期望得分, 方块总和上限（0为完整求解）
+    规范局面  uint64 * 局面数（升序，用二分查找）
+    期望得分  float64 * 局面数
+    最优方向  uint8 * 局面数（规范局面上的方向，补齐到8字节）
+    到达概率  float32 * 局面数 * T（第t列为最大方块达到 2**(t+1) 的概率）
+    开局到达概率 float32 * T
+"""
+import argparse
+import heapq
+import mmap
+import random
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+
+from .policies import greedy_move
+from .symmetry import from_canonical_direction
+
+TABLE_MAGIC = b'G2048EXT'
+HEADER = struct.Struct('<8sQQQdQ16x')
+
+
+# 任意边长（每格4位）的压缩棋盘引擎：行查找表 + 转置，结构与 bitboard 相同
+class SmallBoardEngine:
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.row_bits = 4 * size
+        self.row_mask = (1 << self.row_bits) - 1
+        count = 16 ** size
+        left = [0] * count
+        gain_left = [0] * count
+        reverse = [0] * count
+        spread = [0] * count  # 把一行展开到第0列（第j个格子放到第j行）
+        for row in range(count):
+            line = [(row >> (4 * j)) & 0xF for j in range(size)]
+            tiles = [e for e in line if e]
+            merged = []
+            gain = 0
+            j = 0
+            while j < len(tiles):
+                if j + 1 < len(tiles) and tiles[j] == tiles[j + 1]:
+                    merged.append(tiles[j] + 1)
+                    gain += 1 << (tiles[j] + 1)
+                    j += 2
+                else:
+                    merged.append(tiles[j])
+                    j += 1
+            left[row] = sum(e << (4 * j) for j, e in enumerate(merged))
+            gain_left[row] = gain
+            reverse[row] = sum(e << (4 * j) for j, e in enumerate(reversed(line)))
+            spread[row] = sum(e << (self.row_bits * j) for j, e in enumerate(line))
+        self.left = left
+        self.gain_left = gain_left
+        self.right = [reverse[left[reverse[row]]] for row in range(count)]
+        self.gain_right = [gain_left[reverse[row]] for row in range(count)]
+        self.reverse = reverse
+        self.spread = spread
+
+    def rows(self, state):
+        bits = self.row_bits
+        mask = self.row_mask
+        return [(state >> (bits * i)) & mask for i in range(self.size)]
+
+    def transpose(self, state):
+        spread = self.spread
+        return sum(spread[row] << (4 * i) for i, row in enumerate(self.rows(state)))
+
+    def move(self, state, direction):
+        """返回 (新状态, 本次得分)，方向编号与 GameBoard 相同"""
+        vertical = direction in (0, 2)
+        board = self.transpose(state) if vertical else state
+        if direction in (0, 3):
+            table, gains = self.left, self.gain_left
+        else:
+            table, gains = self.right, self.gain_right
+        rows = self.rows(board)
+        bits = self.row_bits
+        result = sum(table[row] << (bits * i) for i, row in enumerate(rows))
+        if vertical:
+            result = self.transpose(result)
+        return result, sum(gains[row] for row in rows)
+
+    def symmetries(self, state):
+        """8个对称变换，顺序与 bitboard.symmetries 相同（方向可用 symmetry 模块换算）"""
+        bits = self.row_bits
+        reverse = self.reverse
+
+        def flip_h(s):
+            return sum(reverse[row] << (bits * i) for i, row in enumerate(self.rows(s)))
+
+        def flip_v(s):
+            return sum(row << (bits * i) for i, row in enumerate(reversed(self.rows(s))))
+
+        h = flip_h(state)
+        t = self.transpose(state)
+        ht = flip_h(t)
+        return (state, h, flip_v(state), flip_v(h), t, ht, flip_v(t), flip_v(ht))
+
+    def canonical_key(self, state):
+        """规范局面（8个对称局面中最小的一个）"""
+        return min(self.symmetries(state))
+
+    def canonical(self, state):
+        """(规范局面, 变换编号)"""
+        images = self.symmetries(state)
+        key = min(images)
+        return key, images.index(key)
+
+    def empty_cells(self, state):
+        return [k for k in range(self.cells) if not (state >> (4 * k)) & 0xF]
+
+    def max_exponent(self, state):
+        return max((state >> (4 * k)) & 0xF for k in range(self.cells))
+
+    def tile_sum(self, state):
+        return sum(1 << e for e in ((state >> (4 * k)) & 0xF for k in range(self.cells)) if e)
+
+    def pack(self, board):
+        """二维列表棋盘 -> 压缩整数"""
+        state = 0
+        for k, value in enumerate(v for row in board for v in row):
+            if value:
+                state |= (value.bit_length() - 1) << (4 * k)
+        return state
+
+    def spawns(self, afterstate):
+        """afterstate 之后所有可能的新方块：[(概率, 新状态), ...]"""
+        cells = self.empty_cells(afterstate)
+        p = 1.0 / len(cells)
+        out = []
+        for k in cells:
+            out.append((0.9 * p, afterstate | (1 << (4 * k))))
+            out.append((0.1 * p, afterstate | (2 << (4 * k))))
+        return out
+
+    def initial_states(self):
+        """开局（空棋盘上依次添加两个新方块）的所有局面：[(概率, 状态), ...]"""
+        out = []
+        for p, first in self.spawns(0):
+            for q, second in self.spawns(first):
+                out.append((p * q, second))
+        return out
+
+
+def solve(size, max_sum=None, progress=None):
+    """求解 size x size 棋盘
+    max_sum: 方块总和上限，总和超过上限的局面当作终局（之后得分为0）；None 表示完整求解
+    progress: 可选回调 progress(阶段, 已处理层数, 已处理局面数)
+    返回: dict(size, max_sum, tiles, layers, count, initial_value, initial_reach)
+        layers[总和] = (规范局面, 期望得分, 最优方向, 到达概率)，每层按局面升序，都是紧凑数组
+    """
+    engine = SmallBoardEngine(size)
+    canonical = engine.canonical_key
+
+    # 向前：按方块总和逐层枚举可达的规范局面，枚举完的一层转成有序数组
+    pending = {}
+    for _, state in engine.initial_states():
+        key = canonical(state)
+        pending.setdefault(engine.tile_sum(key), set()).add(key)
+    layers = {}
+    count = 0
+    level = min(pending)
+    while pending:
+        layer = pending.pop(level, None)
+        if layer:
+            for state in layer:
+                for direction in range(4):
+                    after, _ = engine.move(state, direction)
+                    if after == state:
+                        continue
+                    for k in engine.empty_cells(after):
+                        for exponent in (1, 2):
+                            successor = level + 2 * exponent
+                            if max_sum is None or successor <= max_sum:
+                                pending.setdefault(successor, set()).add(
+                                    canonical(after | (exponent << (4 * k))))
+            layers[level] = array('Q', sorted(layer))
+            count += len(layer)
+            if progress:
+                progress('enumerate', len(layers), count)
+        level += 2
+
+    # 方块不会超过总和，列数取上界（到不了的方块概率为0）
+    tiles = max(layers).bit_length() - 1
+    reach_of = _reach_function(engine, tiles)
+
+    # 向后：从总和最大的一层开始，新方块为2/4的后继分别在总和+2/+4的层中
+    indexes = {}
+    done = 0
+    for position, level in enumerate(sorted(layers, reverse=True), 1):
+        keys = layers[level]
+        values = array('d')
+        actions = bytearray()
+        reach = array('f')
+        following = []
+        for exponent in (1, 2):
+            successor = level + 2 * exponent
+            if successor in layers:
+                if successor not in indexes:
+                    indexes[successor] = {key: i for i, key in enumerate(layers[successor][0])}
+                following.append((exponent, indexes[successor], layers[successor]))
+            else:
+                following.append((exponent, None, None))
+        for state in keys:
+            best_value = 0.0
+            best_action = 255
+            best_reach = None
+            for direction in range(4):
+                after, gain = engine.move(state, direction)
+                if after == state:
+                    continue
+                cells = engine.empty_cells(after)
+                p = 1.0 / len(cells)
+                value = float(gain)
+                probabilities = [0.0] * tiles
+                for exponent, index, solved in following:
+                    weight = (0.9 if exponent == 1 else 0.1) * p
+                    for k in cells:
+                        successor = canonical(after | (exponent << (4 * k)))
+                        if index is None:
+                            # 超过上限：当作终局
+                            row = reach_of(successor)
+                        else:
+                            i = index[successor]
+                            value += weight * solved[1][i]
+                            row = solved[3][i * tiles:(i + 1) * tiles]
+                        for t in range(tiles):
+                            probabilities[t] += weight * row[t]
+                if best_action == 255 or value > best_value:
+                    best_value = value
+                    best_action = direction
+                    best_reach = probabilities
+            if best_reach is None:
+                best_reach = reach_of(state)
+            else:
+                for t in range(min(engine.max_exponent(state), tiles)):
+                    best_reach[t] = 1.0
+            values.append(best_value)
+            actions.append(best_action)
+            reach.extend(best_reach)
+        layers[level] = (keys, values, actions, reach)
+        # 更小的层只会用到总和不超过 level+2 的层
+        indexes.pop(level + 4, None)
+        done += len(keys)
+        if progress:
+            progress('solve', position, done)
+
+    # 开局期望：对所有开局局面取期望
+    initial_value = 0.0
+    initial_reach = [0.0] * tiles
+    for p, state in engine.initial_states():
+        key = canonical(state)
+        keys, values, _, reach = layers[engine.tile_sum(key)]
+        i = bisect_left(keys, key)
+        initial_value += p * values[i]
+        for t in range(tiles):
+            initial_reach[t] += p * reach[i * tiles + t]
+    return {
+        'size': size,
+        'max_sum': max_sum,
+        'tiles': tiles,
+        'layers': layers,
+        'count': count,
+        'initial_value': initial_value,
+        'initial_reach': initial_reach,
+    }
+
+
+def _reach_function(engine, tiles):
+    """终局的到达概率：已有的方块概率为1"""
+    def reach_of(state):
+        top = min(engine.max_exponent(state), tiles)
+        return [1.0] * top + [0.0] * (tiles - top)
+    return reach_of
+
+
+def write_table(path, result):
+    """把 solve 的结果写入结果表文件
+    各层分别有序，每一列都用多路归并按局面升序流式写出，不需要再复制一份全表
+    """
+    layers = result['layers']
+    tiles = result['tiles']
+    count = result['count']
+
+    def merged():
+        return heapq.merge(*(zip(layer[0], repeat(level), range(len(layer[0])))
+                             for level, layer in layers.items()))
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(TABLE_MAGIC, result['size'], count, tiles,
+                            result['initial_value'], result['max_sum'] or 0))
+        for column, typecode in ((0, 'Q'), (1, 'd'), (2, 'B'), (3, 'f')):
+            width = tiles if column == 3 else 1
+            chunk = array(typecode)
+            for _, level, i in merged():
+                chunk.extend(layers[level][column][i * width:(i + 1) * width])
+                if len(chunk) >= 65536:
+                    f.write(chunk.tobytes())
+                    chunk = array(typecode)
+            f.write(chunk.tobytes())
+            if column == 2:
+                f.write(bytes(-count % 8))
+        f.write(array('f', result['initial_reach']).tobytes())
+
+
+class ExactTable:
+    def __init__(self, path):
+        """用 mmap 打开结果表，各列是映射内存上的视图，不读入整个文件"""
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, count, tiles, initial_value, max_sum = HEADER.unpack_from(self._mmap, 0)
+        if magic != TABLE_MAGIC:
+            raise ValueError("不是有效的结果表: %s" % path)
+        self.size = size
+        self.count = count
+        self.tiles = tiles
+        self.initial_value = initial_value
+        self.max_sum = max_sum or None
+        self.engine = SmallBoardEngine(size)
+
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+        self.keys = view[offset:offset + 8 * count].cast('Q')
+        offset += 8 * count
+        self.values = view[offset:offset + 8 * count].cast('d')
+        offset += 8 * count
+        self.actions = view[offset:offset + count]
+        offset += count + (-count % 8)
+        self.reach = view[offset:offset + 4 * count * tiles].cast('f')
+        offset += 4 * count * tiles
+        self.initial_reach = list(view[offset:offset + 4 * tiles].cast('f'))
+        self._views = (view, self.keys, self.values, self.actions, self.reach)
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _state(self, board):
+        if isinstance(board, int):
+            return board
+        if hasattr(board, 'board'):
+            board = board.board
+        if len(board) != self.size:
+            raise ValueError("结果表是 %dx%d 棋盘的" % (self.size, self.size))
+        return self.engine.pack(board)
+
+    def index(self, state):
+        """规范局面在表中的下标，不可达的局面返回None"""
+        i = bisect_left(self.keys, state)
+        if i < self.count and self.keys[i] == state:
+            return i
+        return None
+
+    def value(self, board):
+        """最优策略下从该局面开始的期望得分（不含已得的分数）"""
+        i = self.index(self.engine.canonical_key(self._state(board)))
+        return None if i is None else self.values[i]
+
+    def reach_probabilities(self, board):
+        """最优策略下最大方块达到各数值的概率 {方块: 概率}"""
+        i = self.index(self.engine.canonical_key(self._state(board)))
+        if i is None:
+            return None
+        row = self.reach[i * self.tiles:(i + 1) * self.tiles]
+        return {2 << t: row[t] for t in range(self.tiles)}
+
+    def best_move(self, board):
+        """最优方向，无法移动或局面不可达时返回None"""
+        key, transform = self.engine.canonical(self._state(board))
+        i = self.index(key)
+        if i is None or self.actions[i] == 255:
+            return None
+        return from_canonical_direction(self.actions[i], transform)
+
+    def q_values(self, board):
+        """各有效方向的期望得分 {方向: 本步得分 + 之后的最优期望}
+        有总和上限时，超过上限的后继局面按终局（0分）计算
+        """
+        state = self._state(board)
+        engine = self.engine
+        out = {}
+        for direction in range(4):
+            after, gain = engine.move(state, direction)
+            if after == state:
+                continue
+            value = float(gain)
+            for p, successor in engine.spawns(after):
+                i = self.index(engine.canonical_key(successor))
+                if i is not None:
+                    value += p * self.values[i]
+            out[direction] = value
+        return out
+
+    def regret(self, board, direction):
+        """选择 direction 相对最优方向损失的期望得分，无效方向返回None"""
+        q = self.q_values(board)
+        if direction not in q:
+            return None
+        return max(q.values()) - q[direction]
+
+    def score_policy(self, policy, games=100, seed=0):
+        """用 GameBoard 进行 games 局，逐步对比策略与最优策略
+        policy(board) -> 方向，board 为 GameBoard
+        返回: 平均分数、最优开局期望、每步平均损失（最优期望 - 所选方向的期望）、选中最优方向的比例
+        有总和上限时只统计表中局面上的决策
+        """
+        from .board import GameBoard
+        rng = random.Random(seed)
+        total_score = 0
+        total_regret = 0.0
+        optimal = 0
+        decisions = 0
+        for _ in range(games):
+            board = GameBoard(self.size, rng=rng)
+            while not board.game_over:
+                direction = policy(board)
+                state = self.engine.pack(board.board)
+                if self.index(self.engine.canonical_key(state)) is not None:
+                    q = self.q_values(state)
+                    if direction not in q:
+                        break
+                    best = max(q.values())
+                    total_regret += best - q[direction]
+                    optimal += q[direction] >= best - 1e-9
+                    decisions += 1
+                if not board.move(direction).moved:
+                    break
+            total_score += board.score
+        return {
+            'games': games,
+            'mean_score': total_score / games if games else 0.0,
+            'optimal_expected_score': self.initial_value,
+            'mean_regret': total_regret / decisions if decisions else 0.0,
+            'optimal_move_rate': optimal / decisions if decisions else 0.0,
+        }
+
+
+def _policy(name, table, seed):
+    if name == 'optimal':
+        return table.best_move
+    if name == 'greedy':
+        return greedy_move
+    if name == 'random':
+        rng = random.Random(seed)
+        return lambda board: rng.choice(board.legal_moves())
+    raise ValueError("未知策略: %s" % name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="小棋盘精确求解")
+    sub = parser.add_subparsers(dest='command', required=True)
+    solve_parser = sub.add_parser('solve', help="求解并写入结果表")
+    solve_parser.add_argument('size', type=int, choices=(2, 3), help="棋盘边长")
+    solve_parser.add_argument('--output', required=True, help="结果表文件")
+    solve_parser.add_argument('--max-sum', type=int, default=None,
+                              help="方块总和上限，超过的局面当作终局（3x3完整求解需要数小时）")
+    score_parser = sub.add_parser('score', help="用结果表给策略打分")
+    score_parser.add_argument('table', help="结果表文件")
+    score_parser.add_argument('--policy', choices=('optimal', 'greedy', 'random'), default='greedy')
+    score_parser.add_argument('--games', type=int, default=100)
+    score_parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'solve':
+        start = time.perf_counter()
+
+        def progress(stage, layers, states):
+            if layers % 20 == 0:
+                print("%s: %d 层, %d 个局面, %.0fs" % (
+                    stage, layers, states, time.perf_counter() - start), file=sys.stderr)
+
+        result = solve(args.size, args.max_sum, progress)
+        write_table(args.output, result)
+        print("局面数: %d  开局最优期望得分: %.2f  用时: %.1fs" % (
+            result['count'], result['initial_value'], time.perf_counter() - start))
+        for t, p in enumerate(result['initial_reach']):
+            print("  P(最大方块 >= %d) = %.6f" % (2 << t, p))
+        return
+
+    with ExactTable(args.table) as table:
+        stats = table.score_policy(_policy(args.policy, table, args.seed), args.games, args.seed)
+    print(stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""中文字体查找（不依赖Kivy）
+
+按平台检查常见的系统中文字体，找到后把路径按平台记入缓存文件。
+之后启动时只需确认缓存的文件仍然存在，不必再逐个尝试注册候选字体。
+环境变量 GAME2048_FONT 可以直接指定字体文件。
+"""
+import json
+import os
+
+ENV_FONT = 'GAME2048_FONT'
+CACHE_NAME = 'fonts.json'
+
+# 各平台（kivy.utils.platform 的取值）的候选字体，按优先顺序排列
+FONT_CANDIDATES = {
+    'win': (
+        'C:/Windows/Fonts/msyh.ttc',     # 微软雅黑
+        'C:/Windows/Fonts/simsun.ttc',   # 宋体
+        'C:/Windows/Fonts/simhei.ttf',   # 黑体
+    ),
+    'macosx': (
+        '/System/Library/Fonts/PingFang.ttc',
+        '/System/Library/Fonts/STHeiti Medium.ttc',
+        '/System/Library/Fonts/Hiragino Sans GB.ttc',
+        '/Library/Fonts/Arial Unicode.ttf',
+    ),
+    'linux': (
+        '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+        '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+        '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+        '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+        '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+        '/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf',
+    ),
+    'android': (
+        '/system/fonts/NotoSansCJK-Regular.ttc',
+        '/system/fonts/NotoSansSC-Regular.otf',
+        '/system/fonts/DroidSansFallback.ttf',
+    ),
+    'ios': (
+        '/System/Library/Fonts/Core/PingFang.ttc',
+        '/System/Library/Fonts/LanguageSupport/PingFang.ttc',
+    ),
+}
+
+
+def _read_cache(path):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _write_cache(path, cache):
+    try:
+        with open(path, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # 缓存目录不可写时下次启动重新查找
+
+
+def find_font(platform, cache_path=None, environ=os.environ):
+    """返回当前平台可用的中文字体路径，找不到时返回None
+    platform: kivy.utils.platform 的取值
+    cache_path: 缓存文件路径，为None时不使用缓存
+    """
+    path = environ.get(ENV_FONT)
+    if path:
+        return path
+    cache = _read_cache(cache_path) if cache_path else {}
+    path = cache.get(platform)
+    if path and os.path.exists(path):
+        return path
+    for path in FONT_CANDIDATES.get(platform, ()):
+        if os.path.exists(path):
+            if cache_path:
+                cache[platform] = path
+                _write_cache(cache_path, cache)
+            return path
+    return None
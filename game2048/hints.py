@@ -0,0 +1,168 @@
+"""后台提示服务：在工作进程（或线程）中搜索最佳方向，不阻塞界面线程
+
+界面把当前棋盘的快照交给服务，搜索完成后通过回调返回方向。
+4x4棋盘用 expectimax 搜索，其他边长用贪心（立即得分最高的方向）。
+工作进程中的求解器常驻，置换表在相邻局面之间复用；
+服务本身还缓存最近局面的结果，同一局面（例如撤销后）或与它对称的局面再次请求时立即返回。
+"""
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain
+from threading import Lock
+
+from .policies import greedy_move
+from .symmetry import canonical_board, from_canonical_direction, to_canonical_direction
+
+# 工作进程（线程）中常驻的求解器
+_solver = None
+
+
+def _init_worker(time_budget, max_depth):
+    """创建求解器并提前构建查找表，第一次搜索不必等待"""
+    global _solver
+    from .solver import ExpectimaxSolver, heuristic_table
+    heuristic_table()
+    _solver = ExpectimaxSolver(time_budget=time_budget, max_depth=max_depth)
+
+
+def _search(size, cells, time_budget, max_depth):
+    """在工作进程中搜索，返回最佳方向（无法移动时为None）
+    cells: 按行展开的棋盘数值
+    """
+    board = [list(cells[i * size:(i + 1) * size]) for i in range(size)]
+    if size == 4:
+        if _solver is None:
+            _init_worker(time_budget, max_depth)
+        return _solver.best_move(board)
+    return greedy_move(board)
+
+
+class HintService:
+    def __init__(self, time_budget=0.1, max_depth=6, use_processes=True, cache_size=4096):
+        """
+        time_budget: 每次搜索的时间预算（秒）
+        max_depth: 搜索的最大深度
+        use_processes: 在独立进程中搜索（不与界面线程争抢GIL）；为False时使用后台线程
+        cache_size: 缓存最近多少个局面的结果（缓存以对称规范键为键，互为旋转/镜像的局面共用一项）
+        """
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.use_processes = use_processes
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self._executor = None
+        self._future = None
+        self._generation = 0
+        self._lock = Lock()
+
+    def _get_executor(self):
+        """第一次请求时才启动工作进程（线程）"""
+        if self._executor is None:
+            if self.use_processes:
+                # 用 spawn 启动，避免复制界面进程的图形上下文
+                self._executor = ProcessPoolExecutor(
+                    1, multiprocessing.get_context('spawn'),
+                    initializer=_init_worker, initargs=(self.time_budget, self.max_depth))
+            else:
+                self._executor = ThreadPoolExecutor(1)
+        return self._executor
+
+    def _discard_executor_locked(self):
+        """丢弃已损坏的进程池（工作进程意外退出），下次请求时重新创建"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _submit_locked(self, key):
+        """提交搜索；进程池已损坏时重建一次再提交，仍然失败时抛出 BrokenProcessPool"""
+        try:
+            return self._get_executor().submit(_search, key[0], key[1], self.time_budget, self.max_depth)
+        except BrokenProcessPool:
+            self._discard_executor_locked()
+            return self._get_executor().submit(_search, key[0], key[1], self.time_budget, self.max_depth)
+
+    @staticmethod
+    def snapshot(board):
+        """棋盘快照：(边长, 按行展开的数值元组)，可作为缓存的键，也可直接发送给工作进程"""
+        return len(board), tuple(chain.from_iterable(board))
+
+    def request(self, board, callback):
+        """请求棋盘 board 的提示，取消之前尚未返回的请求
+        callback(key, direction, error=None): 在后台线程中调用，key 为请求时的快照；请求被取消时不会调用。
+            搜索失败（工作进程崩溃等）时 direction 为None，error 为异常对象
+        返回: 本次请求的快照
+        """
+        key = self.snapshot(board)
+        canonical, transform = canonical_board(board)
+        # 回调可能再次调用 request/cancel，只能在释放锁之后调用
+        hit = False
+        failure = None
+        with self._lock:
+            self._cancel_locked()
+            generation = self._generation
+            if canonical in self.cache:
+                self.cache.move_to_end(canonical)
+                direction = self.cache[canonical]
+                hit = True
+            else:
+                try:
+                    self._future = future = self._submit_locked(key)
+                except BrokenProcessPool as error:
+                    self._discard_executor_locked()
+                    failure = error
+        if hit:
+            if direction is not None:
+                direction = from_canonical_direction(direction, transform)
+            callback(key, direction)
+            return key
+        if failure is not None:
+            callback(key, None, failure)
+            return key
+
+        def done(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                with self._lock:
+                    current = generation == self._generation
+                if current:
+                    callback(key, None, error)
+                return
+            direction = future.result()
+            with self._lock:
+                self.cache[canonical] = None if direction is None else to_canonical_direction(direction, transform)
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                current = generation == self._generation
+            if current:
+                callback(key, direction)
+
+        future.add_done_callback(done)
+        return key
+
+    def cancel(self):
+        """取消尚未返回的请求：还没开始的搜索直接取消，正在进行的搜索结果将被丢弃（但仍会缓存）"""
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        self._generation += 1
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    @property
+    def busy(self):
+        """是否有正在进行的请求"""
+        future = self._future
+        return future is not None and not future.done()
+
+    def shutdown(self):
+        """取消请求并关闭工作进程（线程）"""
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,89 @@
+"""撤销/重做历史：把棋盘状态压缩后保存在固定大小的环形缓冲区中
+
+每个状态占 8 + 边长*边长 字节：8字节分数 + 每个格子1字节指数（0=空，1=2，2=4，...），
+4x4棋盘每步只需24字节。缓冲区按内存上限一次分配好，写满后覆盖最早的状态；
+每个状态都是完整的棋盘，恢复任意一步只需解码这一条，不必重放中间的移动。
+"""
+import struct
+from itertools import chain
+
+SCORE = struct.Struct('<Q')
+
+# 数值与指数的对照表，用 map 在C层面完成编码和解码（symmetry 也用它编码任意边长的棋盘）
+EXPONENTS = {0: 0}
+VALUES = [0]
+for _e in range(1, 256):
+    EXPONENTS[1 << _e] = _e
+    VALUES.append(1 << _e)
+
+
+class History:
+    def __init__(self, size, max_bytes=1 << 20):
+        """
+        size: 棋盘边长
+        max_bytes: 缓冲区的内存上限（字节），至少能保存两个状态
+        """
+        self.size = size
+        self.entry_size = SCORE.size + size * size
+        self.capacity = max(2, max_bytes // self.entry_size)
+        self._buffer = bytearray(self.capacity * self.entry_size)
+        self.clear()
+
+    def clear(self):
+        """清空所有状态"""
+        self._start = 0    # 最早的状态在环中的位置
+        self._count = 0    # 保存的状态数
+        self._current = -1  # 当前状态的序号（从最早的状态数起）
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def can_undo(self):
+        return self._current > 0
+
+    @property
+    def can_redo(self):
+        return self._current < self._count - 1
+
+    def _offset(self, index):
+        return ((self._start + index) % self.capacity) * self.entry_size
+
+    def push(self, board, score):
+        """在当前状态之后追加一个状态，丢弃所有可以重做的状态；缓冲区满时覆盖最早的状态"""
+        self._count = self._current + 1
+        if self._count == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+            self._count -= 1
+        offset = self._offset(self._count)
+        SCORE.pack_into(self._buffer, offset, score)
+        cells = bytes(map(EXPONENTS.__getitem__, chain.from_iterable(board)))
+        self._buffer[offset + SCORE.size:offset + self.entry_size] = cells
+        self._count += 1
+        self._current = self._count - 1
+
+    def get(self, index):
+        """第index个状态的 (棋盘, 分数)"""
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        offset = self._offset(index)
+        score = SCORE.unpack_from(self._buffer, offset)[0]
+        start = offset + SCORE.size
+        size = self.size
+        board = [list(map(VALUES.__getitem__, self._buffer[start + i * size:start + (i + 1) * size]))
+                 for i in range(size)]
+        return board, score
+
+    def undo(self):
+        """退回上一个状态，返回 (棋盘, 分数)；没有可撤销的状态时返回None"""
+        if not self.can_undo:
+            return None
+        self._current -= 1
+        return self.get(self._current)
+
+    def redo(self):
+        """前进到下一个状态，返回 (棋盘, 分数)；没有可重做的状态时返回None"""
+        if not self.can_redo:
+            return None
+        self._current += 1
+        return self.get(self._current)
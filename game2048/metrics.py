@@ -0,0 +1,297 @@
+"""运行时指标与埋点：延迟统计、计时器、直方图，导出JSON/CSV，以及 cProfile 采集窗口（不依赖Kivy）"""
+import cProfile
+import csv
+import json
+import os
+import time
+from bisect import bisect_right
+from collections import deque
+
+
+# 延迟记录：只保留最近的若干个样本，按需计算百分位数
+class LatencyRecorder:
+    def __init__(self, max_samples=2048):
+        """max_samples: 保留的样本数，超出时丢弃最早的样本"""
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+
+    def add(self, seconds):
+        """添加一个样本（秒）"""
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, p):
+        """最近样本的第p百分位数（秒），没有样本时为0"""
+        return self.percentiles((p,))[p]
+
+    def percentiles(self, ps=(50, 90, 99)):
+        """一次计算多个百分位数（最近秩法），返回 {p: 秒}"""
+        if not self.samples:
+            return {p: 0.0 for p in ps}
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return {p: ordered[int(max(1, -(-n * p // 100))) - 1] for p in ps}
+
+    def summary(self, ps=(50, 90, 99)):
+        """便于写入日志的一行文字（毫秒）"""
+        values = self.percentiles(ps)
+        parts = ['p%s=%.1fms' % (p, values[p] * 1e3) for p in ps]
+        return 'n=%d %s max=%.1fms' % (self.count, ' '.join(parts),
+                                       max(self.samples) * 1e3 if self.samples else 0.0)
+
+
+# 计时器：累计调用次数、总耗时和最长耗时
+class Timer:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1e3,
+            'mean_us': self.total / self.count * 1e6 if self.count else 0.0,
+            'max_us': self.max * 1e6,
+        }
+
+
+# 直方图：按固定边界统计样本落在各区间的次数
+class Histogram:
+    def __init__(self, bounds):
+        """bounds: 递增的区间上界，最后还有一个“超过最大上界”的区间"""
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def add(self, value):
+        self.counts[bisect_right(self.bounds, value)] += 1
+
+    def as_dict(self, scale=1e3, unit='ms'):
+        """{区间名: 次数}，区间名以 scale 换算后的上界表示，例如 '<=16.7ms'"""
+        names = ['<=%g%s' % (round(bound * scale, 1), unit) for bound in self.bounds]
+        names.append('>%g%s' % (round(self.bounds[-1] * scale, 1), unit))
+        return dict(zip(names, self.counts))
+
+
+# 帧时间区间（秒）：对应 240/120/60/30/20/10 帧每秒
+FRAME_BOUNDS = (1 / 240, 1 / 120, 1 / 60, 1 / 30, 1 / 20, 1 / 10)
+
+# 环境变量：
+#   GAME2048_INSTRUMENT=1            开启埋点（0/false/no/off 为明确关闭，此时下面的变量也不开启埋点）
+#   GAME2048_INSTRUMENT_OUT=FILE     退出时导出到 FILE（.csv 为CSV，其他为JSON），同时开启埋点
+#   GAME2048_PROFILE=START:SECONDS   从启动后第 START 秒开始用 cProfile 采集 SECONDS 秒，同时开启埋点
+#   GAME2048_PROFILE_OUT=FILE        cProfile 结果文件（默认 game2048.prof，可用 pstats / snakeviz 查看）
+ENV_ENABLE = 'GAME2048_INSTRUMENT'
+ENV_OUTPUT = 'GAME2048_INSTRUMENT_OUT'
+ENV_PROFILE = 'GAME2048_PROFILE'
+ENV_PROFILE_OUTPUT = 'GAME2048_PROFILE_OUT'
+# 开关类环境变量中表示关闭的取值（不区分大小写）
+FALSE_VALUES = ('', '0', 'false', 'no', 'off')
+
+
+# 埋点：把计时包装装到类的方法上；未开启时不做任何修改，原方法没有额外开销
+class Instrumentation:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timers = {}
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}        # 名称 -> 无参函数，导出时取值
+        self._patched = []      # [(类, 方法名, 原方法), ...]
+        self._profile_window = None
+        self._profiler = None
+        self.profile_output = None
+
+    def timer(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer()
+        return timer
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def histogram(self, name, bounds=FRAME_BOUNDS):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(bounds)
+        return histogram
+
+    def wrap(self, cls, method_name, name=None, label=None):
+        """给 cls.method_name 加上计时
+        name: 计时器名称，默认为“类名.方法名”
+        label: 可选函数，根据调用参数返回名称后缀（例如按方向分别计时）
+        """
+        original = cls.__dict__[method_name]
+        name = name or '%s.%s' % (cls.__name__, method_name)
+        perf_counter = time.perf_counter
+        timer = self.timer(name)
+        timers = {}
+        instrumentation = self
+
+        if label is None:
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    timer.add(perf_counter() - start)
+        else:
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    elapsed = perf_counter() - start
+                    timer.add(elapsed)
+                    suffix = label(*args, **kwargs)
+                    sub = timers.get(suffix)
+                    if sub is None:
+                        sub = timers[suffix] = instrumentation.timer('%s[%s]' % (name, suffix))
+                    sub.add(elapsed)
+
+        wrapper.__name__ = original.__name__
+        wrapper.__doc__ = original.__doc__
+        wrapper.__wrapped__ = original
+        setattr(cls, method_name, wrapper)
+        self._patched.append((cls, method_name, original))
+
+    def uninstall(self):
+        """恢复所有被包装的方法"""
+        for cls, method_name, original in reversed(self._patched):
+            setattr(cls, method_name, original)
+        self._patched = []
+        self.stop_profile()
+
+    def install_engine(self):
+        """给引擎热点加上计时：按方向统计的 GameBoard.move 和 add_random_tile"""
+        from .board import GameBoard
+        directions = ('up', 'right', 'down', 'left')
+
+        def direction_label(board, direction, *args, **kwargs):
+            return directions[direction] if direction in (0, 1, 2, 3) else 'invalid'
+
+        self.wrap(GameBoard, 'move', label=direction_label)
+        self.wrap(GameBoard, 'add_random_tile')
+
+    # cProfile 采集窗口：由界面的帧回调（或调用方）定期调用 poll 来开始和结束
+    def profile_window(self, start, duration, output='game2048.prof'):
+        """从现在起第 start 秒开始采集 duration 秒"""
+        now = time.perf_counter() - self.started
+        self._profile_window = (now + start, now + start + duration)
+        self.profile_output = output
+
+    def poll(self):
+        """到达采集窗口时开始/结束 cProfile（cProfile 只采集调用 poll 的线程）"""
+        if self._profile_window is None:
+            return
+        now = time.perf_counter() - self.started
+        begin, end = self._profile_window
+        if self._profiler is None and begin <= now < end:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif now >= end:
+            self.stop_profile()
+
+    def stop_profile(self):
+        """结束采集并写入结果文件"""
+        self._profile_window = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_output)
+            self._profiler = None
+
+    @property
+    def profiling(self):
+        return self._profiler is not None
+
+    def snapshot(self):
+        """当前所有指标（可直接序列化为JSON）"""
+        return {
+            'uptime_s': time.perf_counter() - self.started,
+            'timers': {name: timer.as_dict() for name, timer in sorted(self.timers.items())},
+            'counters': dict(sorted(self.counters.items())),
+            'histograms': {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+            'gauges': {name: get() for name, get in sorted(self.gauges.items())},
+        }
+
+    def rows(self):
+        """把指标展开成 (类别, 名称, 字段, 数值) 行，供导出CSV"""
+        data = self.snapshot()
+        yield 'uptime', '', 's', data['uptime_s']
+        for kind in ('timers', 'histograms', 'gauges'):
+            for name, fields in data[kind].items():
+                if not isinstance(fields, dict):
+                    fields = {'value': fields}
+                for field, value in fields.items():
+                    yield kind[:-1], name, field, value
+        for name, value in data['counters'].items():
+            yield 'counter', name, 'count', value
+
+    def export(self, path):
+        """导出到文件：.csv 为CSV，其他为JSON"""
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('kind', 'name', 'field', 'value'))
+                writer.writerows(self.rows())
+        else:
+            with open(path, 'w') as f:
+                json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+
+# 当前生效的埋点（未开启时为None）
+_current = None
+
+
+def current():
+    """返回当前生效的 Instrumentation，未开启时返回None"""
+    return _current
+
+
+def enable():
+    """开启埋点并给引擎加上计时（已开启时直接返回）"""
+    global _current
+    if _current is None:
+        _current = Instrumentation()
+        _current.install_engine()
+    return _current
+
+
+def disable():
+    """关闭埋点，恢复所有原方法"""
+    global _current
+    if _current is not None:
+        _current.uninstall()
+        _current = None
+
+
+def env_flag(value):
+    """开关类环境变量的取值是否表示开启：未设置和 0/false/no/off/空值为关闭"""
+    return value is not None and value.strip().lower() not in FALSE_VALUES
+
+
+def enable_from_env(environ=os.environ):
+    """按环境变量开启埋点和 cProfile 采集窗口，未开启时返回None
+    GAME2048_INSTRUMENT 为真时开启；设置了导出文件或采集窗口时也开启，除非 GAME2048_INSTRUMENT 明确关闭
+    """
+    flag = environ.get(ENV_ENABLE, '')
+    if flag.strip() and not env_flag(flag):
+        return None
+    if not (env_flag(flag) or environ.get(ENV_OUTPUT) or environ.get(ENV_PROFILE)):
+        return None
+    instrumentation = enable()
+    window = environ.get(ENV_PROFILE)
+    if window:
+        start, _, duration = window.partition(':')
+        instrumentation.profile_window(float(start), float(duration or 10),
+                                       environ.get(ENV_PROFILE_OUTPUT, 'game2048.prof'))
+    return instrumentation
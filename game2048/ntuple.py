@@ -0,0 +1,282 @@
+"""N元组网络：用查找表学习局面价值的评估函数，以及 TD(0) 后状态（afterstate）训练
+
+用法:
+    python -m game2048.ntuple train weights.ntw --games 10000 --alpha 0.1
+    python -m game2048.ntuple play weights.ntw --games 100
+
+每个元组是棋盘上的若干个格子，这些格子的指数（0=空，1=2，2=4，...）拼成查找表的下标；
+局面的价值是8个对称变换下所有元组查表结果之和。默认使用4个6元组，每个元组 16**6 项，
+权重共约256MB，以 float32 存放在文件中并用 mmap 映射：多个进程打开同一个文件时共享一份物理内存，
+只读打开时不会复制到各进程的堆中。
+
+权重文件格式：
+    b'G2048NTW' + 8字节头部长度 + JSON头部 {"patterns": [[格子, ...], ...]}
+    头部按4096字节对齐后依次是每个元组的 float32 权重
+"""
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+from .bitboard import BitBoard, execute_move, symmetries
+from .solver import to_state
+
+WEIGHTS_MAGIC = b'G2048NTW'
+WEIGHTS_ALIGN = 4096
+
+# 元组的格子编号为 4*i+j。默认元组来自 Yeh 等人的2048程序：两个直线6元组和两个2x3矩形；
+# 配合8个对称变换覆盖整个棋盘
+DEFAULT_PATTERNS = ((0, 1, 2, 3, 4, 5), (4, 5, 6, 7, 8, 9), (0, 1, 2, 4, 5, 6), (4, 5, 6, 8, 9, 10))
+# 小网络（每个元组65536项，共1MB），用于快速试验
+SMALL_PATTERNS = ((0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 4, 5), (4, 5, 8, 9))
+
+
+def _segments(pattern):
+    """把元组拆成若干段连续的格子，每段一次移位和掩码即可从压缩棋盘中取出
+    返回: [(棋盘中的位移, 掩码, 下标中的位移), ...]
+    """
+    cells = sorted(pattern)
+    runs = []
+    for cell in cells:
+        if runs and runs[-1][0] + runs[-1][1] == cell:
+            runs[-1][1] += 1
+        else:
+            runs.append([cell, 1])
+    segments = []
+    out = 0
+    for start, length in runs:
+        segments.append((4 * start, (1 << (4 * length)) - 1, out))
+        out += 4 * length
+    return tuple(segments)
+
+
+def _feature_functions(patterns):
+    """生成两个函数：features(state) 返回局面所有特征下标（在权重数组中的位置），
+    value(state, weights) 直接返回这些特征的权重之和
+    返回: (features, value, 权重总数)
+
+    评估是搜索的叶子函数，每次要算 8*len(patterns) 个下标。按元组逐段循环时解释器开销占大头，
+    所以把所有下标展开成一个表达式再编译，一次调用只执行一条语句
+    """
+    terms = []
+    offset = 0
+    for pattern in patterns:
+        terms.append((offset, _segments(pattern)))
+        offset += 16 ** len(pattern)
+    items = []
+    for k in range(8):
+        for base, segments in terms:
+            parts = ['%d' % base] if base else []
+            for shift, mask, target in segments:
+                part = '((s%d >> %d) & %d)' % (k, shift, mask)
+                parts.append('(%s << %d)' % (part, target) if target else part)
+            items.append(' + '.join(parts))
+    unpack = '%s = symmetries(state)' % ', '.join('s%d' % k for k in range(8))
+    source = ('def features(state):\n    %s\n    return [%s]\n'
+              'def value(state, w):\n    %s\n    return %s\n') % (
+        unpack, ', '.join(items), unpack, ' + '.join('w[%s]' % item for item in items))
+    namespace = {'symmetries': symmetries}
+    exec(source, namespace)
+    return namespace['features'], namespace['value'], offset
+
+
+class NTupleNetwork:
+    def __init__(self, path, writable=False):
+        """打开权重文件（用 create 创建）
+        writable: 可写映射（训练时使用）；只读映射可以被任意多个进程共享
+        """
+        self.path = path
+        self.writable = writable
+        with open(path, 'rb') as f:
+            magic, header_size = struct.unpack('<8sQ', f.read(16))
+            if magic != WEIGHTS_MAGIC:
+                raise ValueError("不是有效的权重文件: %s" % path)
+            header = json.loads(f.read(header_size))
+        self.patterns = tuple(tuple(pattern) for pattern in header['patterns'])
+        self.features, self._value, self.size = _feature_functions(self.patterns)
+        start = _data_offset(header_size)
+
+        self._file = open(path, 'r+b' if writable else 'rb')
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=access)
+        # memoryview 按元素取出的是Python浮点数，比逐个索引NumPy数组快得多
+        self.weights = memoryview(self._mmap)[start:start + 4 * self.size].cast('f')
+
+    @classmethod
+    def create(cls, path, patterns=DEFAULT_PATTERNS):
+        """创建权重全为0的权重文件（稀疏文件，不会立即占用磁盘空间）并以可写方式打开"""
+        header = json.dumps({'patterns': [list(pattern) for pattern in patterns]}).encode('utf-8')
+        size = sum(16 ** len(pattern) for pattern in patterns)
+        with open(path, 'wb') as f:
+            f.write(struct.pack('<8sQ', WEIGHTS_MAGIC, len(header)))
+            f.write(header)
+            f.truncate(_data_offset(len(header)) + 4 * size)
+        return cls(path, writable=True)
+
+    def close(self):
+        self.weights.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        """把修改写回文件"""
+        self._mmap.flush()
+
+    def evaluate(self, board):
+        """局面价值：所有特征的权重之和
+        board: 压缩后的整数，或 GameBoard / BitBoard 对象、二维列表（4x4）
+        """
+        if not isinstance(board, int):
+            board = to_state(board)
+        return self._value(board, self.weights)
+
+    def update(self, state, target, alpha):
+        """把 state 的价值向 target 调整：每个特征的权重加上 alpha * 误差 / 特征数
+        返回: 调整前的误差
+        """
+        features = self.features(state)
+        weights = self.weights
+        error = target - sum([weights[index] for index in features])
+        step = alpha * error / len(features)
+        for index in features:
+            weights[index] += step
+        return error
+
+    def best_move(self, board):
+        """一步贪心：选择 本步得分 + 移动后局面价值 最大的方向，无法移动时返回None"""
+        state = to_state(board)
+        best = None
+        best_value = float('-inf')
+        for direction in range(4):
+            after, gain = execute_move(state, direction)
+            if after != state:
+                value = gain + self.evaluate(after)
+                if value > best_value:
+                    best = direction
+                    best_value = value
+        return best
+
+
+def _data_offset(header_size):
+    return -(-(16 + header_size) // WEIGHTS_ALIGN) * WEIGHTS_ALIGN
+
+
+# TD(0) 后状态学习：价值函数评估“移动之后、新方块出现之前”的局面，
+# 每一步把上一个后状态的价值向 (本步得分 + 当前后状态的价值) 调整，对局结束时向0调整
+class TDTrainer:
+    def __init__(self, network, alpha=0.1, seed=None):
+        self.network = network
+        self.alpha = alpha
+        self.rng = random.Random(seed)
+        self.games = 0
+
+    def play_game(self):
+        """用当前网络贪心走完一局，同时学习；返回结果字典"""
+        network = self.network
+        board = BitBoard(rng=self.rng)
+        previous = None
+        moves = 0
+        while True:
+            state = board.state
+            best = None
+            best_value = float('-inf')
+            for direction in range(4):
+                after, gain = execute_move(state, direction)
+                if after != state:
+                    value = gain + network.evaluate(after)
+                    if value > best_value:
+                        best = (after, gain)
+                        best_value = value
+            if best is None:
+                break
+            if previous is not None:
+                network.update(previous, best_value, self.alpha)
+            previous, gain = best
+            # 与 GameBoard.move 相同：有效移动后加分并添加新方块
+            board.state = previous
+            board.score += gain
+            board.add_random_tile()
+            moves += 1
+        if previous is not None:
+            network.update(previous, 0.0, self.alpha)
+        self.games += 1
+        return {
+            'game': self.games,
+            'score': board.score,
+            'max_tile': max(max(row) for row in board.board),
+            'moves': moves,
+        }
+
+    def train(self, games, callback=None):
+        """训练 games 局；callback(result) 在每局结束后调用"""
+        for _ in range(games):
+            result = self.play_game()
+            if callback:
+                callback(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="2048 N元组网络训练与评估")
+    parser.add_argument('command', choices=('train', 'play'), help="train 训练，play 用网络贪心对弈")
+    parser.add_argument('weights', help="权重文件（训练时不存在则创建）")
+    parser.add_argument('--games', type=int, default=1000, help="对局数")
+    parser.add_argument('--alpha', type=float, default=0.1, help="学习率")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--small', action='store_true', help="新建权重文件时使用4元组小网络")
+    parser.add_argument('--report', type=int, default=100, help="每多少局输出一次统计")
+    args = parser.parse_args(argv)
+
+    if args.command == 'train':
+        if os.path.exists(args.weights):
+            network = NTupleNetwork(args.weights, writable=True)
+        else:
+            network = NTupleNetwork.create(args.weights, SMALL_PATTERNS if args.small else DEFAULT_PATTERNS)
+    else:
+        network = NTupleNetwork(args.weights)
+
+    start = time.perf_counter()
+    window = []
+
+    def report(result):
+        window.append(result)
+        if len(window) == args.report or result['game'] == args.games:
+            print("第 %d 局  平均分数: %.0f  最大方块≥2048: %.0f%%  每秒步数: %.0f" % (
+                result['game'], sum(r['score'] for r in window) / len(window),
+                100.0 * sum(r['max_tile'] >= 2048 for r in window) / len(window),
+                sum(r['moves'] for r in window) / (time.perf_counter() - report.start)),
+                file=sys.stderr)
+            window.clear()
+            report.start = time.perf_counter()
+    report.start = start
+
+    with network:
+        if args.command == 'train':
+            TDTrainer(network, args.alpha, args.seed).train(args.games, report)
+            network.flush()
+        else:
+            rng = random.Random(args.seed)
+            for game in range(1, args.games + 1):
+                board = BitBoard(rng=rng)
+                moves = 0
+                while True:
+                    direction = network.best_move(board)
+                    if direction is None:
+                        break
+                    board.move(direction)
+                    moves += 1
+                report({'game': game, 'score': board.score,
+                        'max_tile': max(max(row) for row in board.board), 'moves': moves})
+
+
+if __name__ == '__main__':
+    main()
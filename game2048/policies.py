@@ -0,0 +1,32 @@
+"""不依赖搜索和查找表的简单策略，任意边长的棋盘都可以使用
+
+提示服务（非4x4棋盘）和精确解的策略评测共用这里的策略。
+"""
+from .board import GameBoard
+
+
+def greedy_move(board):
+    """选择立即得分最高的有效方向（得分相同时取编号较小的方向），无法移动时返回None
+    board: GameBoard 对象或二维列表
+    只在行（列）的副本上试走，不创建 GameBoard、不添加新方块
+    """
+    if isinstance(board, GameBoard):
+        board = board.board
+    rows = [list(row) for row in board]
+    columns = [list(column) for column in zip(*board)]
+    # 每个方向的所有行（列），从移动方向的一侧开始排列，与 GameBoard 的方向编号相同
+    lines = (columns, [row[::-1] for row in rows], [column[::-1] for column in columns], rows)
+    merge_line = GameBoard.merge_line
+    best = None
+    best_gain = -1
+    for direction, direction_lines in enumerate(lines):
+        moved = False
+        gain = 0
+        for line in direction_lines:
+            merged, line_gain = merge_line(line)
+            gain += line_gain
+            moved = moved or merged != line
+        if moved and gain > best_gain:
+            best = direction
+            best_gain = gain
+    return best
@@ -0,0 +1,200 @@
+"""二进制录像格式：流式写入，按步数快速定位回放
+
+文件布局（小端序）:
+    文件头   16字节: 魔数 b'2048'、版本、棋盘边长、检查点间隔、随机种子
+    数据块   若干个: 检查点 + 最多“检查点间隔”条走子记录
+
+    检查点: 8字节分数 + 每个格子1字节指数（0=空，1=2，2=4，...）
+    走子记录 2字节: 第0-1位方向，第2位新方块数值（0=2，1=4），
+                   第3位表示没有新方块，第4-15位新方块所在格子编号（行 * 边长 + 列）
+
+第0个检查点就是开局棋盘。因为每块长度固定，第k步所在的位置可以直接算出，
+回放时从最近的检查点开始，最多重放“检查点间隔”步即可到达任意一步。
+"""
+import mmap
+import os
+import struct
+
+from .board import GameBoard
+
+MAGIC = b'2048'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHq')
+SCORE = struct.Struct('<Q')
+RECORD = struct.Struct('<H')
+
+NO_SPAWN = 0x8
+MAX_CELLS = 1 << 12
+MAX_INTERVAL = 0xFFFF  # 文件头中检查点间隔占2字节
+
+
+def _exponent(value):
+    return value.bit_length() - 1 if value else 0
+
+
+def encode_record(direction, spawn, size):
+    """把一步走子编码为16位整数
+    spawn: 新方块 (行, 列, 数值)，没有新方块时为None
+    """
+    if spawn is None:
+        return direction | NO_SPAWN
+    i, j, value = spawn
+    return direction | ((1 if value == 4 else 0) << 2) | ((i * size + j) << 4)
+
+
+def decode_record(code, size):
+    """把16位整数解码为 (方向, 新方块)"""
+    direction = code & 0x3
+    if code & NO_SPAWN:
+        return direction, None
+    i, j = divmod(code >> 4, size)
+    return direction, (i, j, 4 if code & 0x4 else 2)
+
+
+# 录像写入器：只追加、带缓冲，每走满“检查点间隔”步写入一个检查点
+class ReplayWriter:
+    def __init__(self, path, board, seed=-1, score=0, checkpoint_interval=256, buffer_size=65536):
+        """
+        path: 录像文件路径
+        board: 开局棋盘（二维列表）
+        seed: 生成该局的随机种子（未知时为-1）
+        checkpoint_interval: 每隔多少步写入一个检查点（1到65535）
+        """
+        self.size = len(board)
+        if self.size * self.size > MAX_CELLS:
+            raise ValueError("录像格式最多支持%d个格子" % MAX_CELLS)
+        if not 1 <= checkpoint_interval <= MAX_INTERVAL:
+            raise ValueError("检查点间隔必须在1到%d之间: %r" % (MAX_INTERVAL, checkpoint_interval))
+        self.checkpoint_interval = checkpoint_interval
+        self.buffer_size = buffer_size
+        self.moves = 0
+        self._buffer = bytearray(HEADER.pack(MAGIC, VERSION, self.size, checkpoint_interval, seed))
+        self._file = open(path, 'wb')
+        self._write_checkpoint(board, score)
+
+    def _write_checkpoint(self, board, score):
+        self._buffer += SCORE.pack(score)
+        self._buffer += bytes(_exponent(value) for row in board for value in row)
+
+    def record(self, direction, spawn, game_board):
+        """追加一步有效移动
+        spawn: 新方块 (行, 列, 数值)
+        game_board: 移动之后的游戏板（GameBoard 或 BitBoard），每隔固定步数写入检查点
+        """
+        self._buffer += RECORD.pack(encode_record(direction, spawn, self.size))
+        self.moves += 1
+        if self.moves % self.checkpoint_interval == 0:
+            self._write_checkpoint(game_board.board, game_board.score)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区写入磁盘"""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 录像回放器：内存映射文件，按步数随机定位
+class ReplayReader:
+    def __init__(self, path):
+        """打开录像文件；文件头无效或缺少开局棋盘时抛出 ValueError"""
+        self._file = open(path, 'rb')
+        try:
+            # 先检查文件头再映射（空文件无法 mmap）
+            header = self._file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError("不是有效的录像文件（文件头不完整）: %s" % path)
+            magic, version, size, interval, seed = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or not size or not interval:
+                raise ValueError("不是有效的录像文件: %s" % path)
+            self.size = size
+            self.checkpoint_interval = interval
+            self.seed = seed
+            self._checkpoint_size = SCORE.size + size * size
+            self._block_size = self._checkpoint_size + interval * RECORD.size
+
+            # 根据文件长度算出完整的检查点数和总步数（最后一块可能不满）；
+            # 写入中断时末尾可能残留半个检查点或半条记录，只计入完整的部分
+            body = os.fstat(self._file.fileno()).st_size - HEADER.size
+            blocks, rest = divmod(body, self._block_size)
+            self.moves = blocks * interval
+            self._checkpoints = blocks + (rest >= self._checkpoint_size)
+            if rest > self._checkpoint_size:
+                self.moves += (rest - self._checkpoint_size) // RECORD.size
+            if not self._checkpoints:
+                raise ValueError("录像文件不完整（缺少开局棋盘）: %s" % path)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def __len__(self):
+        return self.moves
+
+    def _block_offset(self, block):
+        return HEADER.size + block * self._block_size
+
+    def record(self, index):
+        """第index步的 (方向, 新方块)"""
+        if not 0 <= index < self.moves:
+            raise IndexError(index)
+        block, k = divmod(index, self.checkpoint_interval)
+        offset = self._block_offset(block) + self._checkpoint_size + k * RECORD.size
+        return decode_record(RECORD.unpack_from(self._map, offset)[0], self.size)
+
+    def records(self, start=0, stop=None):
+        """依次产出 [start, stop) 范围内每一步的 (方向, 新方块)"""
+        stop = self.moves if stop is None else min(stop, self.moves)
+        for index in range(start, stop):
+            yield self.record(index)
+
+    def checkpoint(self, block):
+        """第block个检查点的 (分数, 棋盘)"""
+        if not 0 <= block < self._checkpoints:
+            raise IndexError(block)
+        offset = self._block_offset(block)
+        score = SCORE.unpack_from(self._map, offset)[0]
+        cells = self._map[offset + SCORE.size:offset + self._checkpoint_size]
+        board = [[(1 << e) if e else 0 for e in cells[i * self.size:(i + 1) * self.size]]
+                 for i in range(self.size)]
+        return score, board
+
+    def board_at(self, index):
+        """重建走完前index步之后的 GameBoard（0为开局）"""
+        if not 0 <= index <= self.moves:
+            raise IndexError(index)
+        # 文件在检查点中间被截断时，从前一个完整的检查点开始重放
+        block = min(index // self.checkpoint_interval, self._checkpoints - 1)
+        score, board = self.checkpoint(block)
+
+        game = GameBoard(self.size)
+        game.board = board
+        game.score = score
+        game.won = any(2048 in row for row in board)
+        game.game_over = game._is_game_over()
+        for direction, spawn in self.records(block * self.checkpoint_interval, index):
+            game.move(direction, spawn)
+        return game
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,199 @@
+"""蒙特卡洛策略：对每个有效方向做K次随机走子直到对局结束，选择平均得分最高的方向
+
+用法:
+    python -m game2048.rollout --rollouts 200 --workers 8 --seed 1 --moves 50
+
+随机走子分成固定大小的任务发给进程池。每个任务只有三个整数
+（移动后的压缩棋盘、走子次数、随机种子），返回两个整数（总得分、总步数），
+工作进程之间不共享任何状态。任务的随机种子只由总种子、决策序号、方向和任务编号决定，
+与进程数和任务完成的顺序无关，因此同一种子的结果总是相同的。
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+from .bitboard import BitBoard, empty_cells, execute_move
+from .solver import to_state
+
+
+def _rollout(state, rng_random):
+    """从移动后（新方块出现之前）的局面开始随机走子直到结束
+    返回: (得分, 步数)
+    """
+    score = 0
+    moves = 0
+    while True:
+        cells = empty_cells(state)
+        k = cells[int(rng_random() * len(cells))]
+        state |= (1 if rng_random() < 0.9 else 2) << (4 * k)
+        # 在有效方向中均匀选择：随机抽一个方向，无效就从候选中去掉再抽
+        options = [0, 1, 2, 3]
+        while options:
+            i = int(rng_random() * len(options))
+            new_state, gain = execute_move(state, options[i])
+            if new_state != state:
+                break
+            options[i] = options[-1]
+            options.pop()
+        else:
+            return score, moves
+        state = new_state
+        score += gain
+        moves += 1
+
+
+def _rollout_task(task):
+    """在工作进程中执行一批随机走子
+    task: (移动后的压缩棋盘, 走子次数, 随机种子)
+    返回: (总得分, 总步数)
+    """
+    state, count, seed = task
+    rng_random = random.Random(seed).random
+    total_score = 0
+    total_moves = 0
+    for _ in range(count):
+        score, moves = _rollout(state, rng_random)
+        total_score += score
+        total_moves += moves
+    return total_score, total_moves
+
+
+def task_seed(seed, decision, direction, chunk):
+    """任务的随机种子：与进程数无关，不同决策、方向和任务之间互不重叠"""
+    return (seed << 64) | (decision << 24) | (direction << 20) | chunk
+
+
+# 蒙特卡洛策略，接口与 ExpectimaxSolver 相同
+class MonteCarloPolicy:
+    def __init__(self, rollouts=100, workers=1, seed=0, chunk_size=16):
+        """
+        rollouts: 每个方向的随机走子次数
+        workers: 进程数，1 表示在当前进程中执行
+        seed: 总随机种子
+        chunk_size: 每个任务的走子次数（固定大小，结果与进程数无关）
+        """
+        if rollouts < 1:
+            raise ValueError("每个方向至少要走子1次: %r" % rollouts)
+        if chunk_size < 1:
+            raise ValueError("每个任务至少要走子1次: %r" % chunk_size)
+        self.rollouts = rollouts
+        self.workers = workers
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.decisions = 0
+        self._pool = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清零统计数据"""
+        self.rollouts_done = 0
+        self.rollout_moves = 0
+        self.search_time = 0.0
+        self.searches = 0
+
+    @property
+    def rollouts_per_second(self):
+        """平均每秒完成的随机走子局数"""
+        return self.rollouts_done / self.search_time if self.search_time else 0.0
+
+    def stats(self):
+        """以字典形式返回统计数据"""
+        return {
+            'searches': self.searches,
+            'rollouts': self.rollouts_done,
+            'rollout_moves': self.rollout_moves,
+            'search_time': self.search_time,
+            'rollouts_per_second': self.rollouts_per_second,
+            'moves_per_second': self.rollout_moves / self.search_time if self.search_time else 0.0,
+            'workers': self.workers,
+        }
+
+    def _map(self, tasks):
+        if self.workers <= 1:
+            return list(map(_rollout_task, tasks))
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers)
+        return self._pool.map(_rollout_task, tasks, chunksize=1)
+
+    def best_move(self, board):
+        """返回平均得分最高的方向（0=上, 1=右, 2=下, 3=左），无法移动时返回None
+        board: GameBoard / BitBoard 对象、二维列表或压缩后的整数（4x4）
+        """
+        state = to_state(board)
+        start = time.perf_counter()
+        moves = []
+        tasks = []
+        for direction in range(4):
+            new_state, gain = execute_move(state, direction)
+            if new_state == state:
+                continue
+            moves.append((direction, gain))
+            for chunk, first in enumerate(range(0, self.rollouts, self.chunk_size)):
+                count = min(self.chunk_size, self.rollouts - first)
+                tasks.append((new_state, count, task_seed(self.seed, self.decisions, direction, chunk)))
+        self.decisions += 1
+        if not moves:
+            return None
+
+        results = iter(self._map(tasks))
+        chunks = len(tasks) // len(moves)
+        best = None
+        best_value = -1.0
+        for direction, gain in moves:
+            total_score = 0
+            for _ in range(chunks):
+                score, steps = next(results)
+                total_score += score
+                self.rollout_moves += steps
+            value = gain + total_score / self.rollouts
+            if value > best_value:
+                best = direction
+                best_value = value
+
+        self.rollouts_done += self.rollouts * len(moves)
+        self.search_time += time.perf_counter() - start
+        self.searches += 1
+        return best
+
+    def close(self):
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="2048蒙特卡洛策略")
+    parser.add_argument('--rollouts', type=int, default=100, help="每个方向的随机走子次数")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help="进程数")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--moves', type=int, default=0, help="最多走多少步（0 表示走到对局结束）")
+    args = parser.parse_args(argv)
+
+    board = BitBoard(seed=args.seed)
+    with MonteCarloPolicy(args.rollouts, args.workers, args.seed) as policy:
+        moves = 0
+        while not board.game_over and (args.moves <= 0 or moves < args.moves):
+            direction = policy.best_move(board)
+            if direction is None:
+                break
+            board.move(direction)
+            moves += 1
+        stats = policy.stats()
+    print("步数: %d  分数: %d  最大方块: %d" % (
+        moves, board.score, max(max(row) for row in board.board)))
+    print("进程: %d  每秒走子局数: %.0f  每秒随机步数: %.0f" % (
+        stats['workers'], stats['rollouts_per_second'], stats['moves_per_second']), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
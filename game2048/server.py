@@ -0,0 +1,401 @@
+"""多会话游戏服务器：一个 asyncio 进程同时托管大量4x4对局，协议为 JSON Lines
+
+用法:
+    python -m game2048.server serve --port 2048 --evict-db sessions.sqlite
+    python -m game2048.server load --port 2048 --connections 50 --sessions 100000 --moves 200000
+
+每行一个请求，按顺序逐行返回响应：
+    {"op": "new", "seed": 1}          -> {"id": 7, "board": [16个数值], "score": 0, "over": false}
+    {"op": "move", "id": 7, "dir": 0} -> {"id": 7, "moved": true, "board": [...], "score": 4, "over": false}
+    {"op": "get", "id": 7}            -> 同 new
+    {"op": "close", "id": 7}          -> {"id": 7, "closed": true}
+    {"op": "stats"}                   -> {"sessions": ..., "evicted": ..., ...}
+出错时返回 {"error": "..."}。
+
+会话不创建 GameBoard 对象：每个会话只有编号、压缩棋盘、分数、随机数状态和最后访问时间五个64位数，
+按列存放在 array 中（每个会话40字节加上索引字典的一项），移动用位棋盘引擎执行。
+随机数用 splitmix64，状态只有一个整数；新方块的规则与 GameBoard.add_random_tile 相同（空格均匀，90%为2）。
+长时间未访问的会话写入 SQLite 后从内存中移除，再次访问时自动载入。
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+
+from .bitboard import empty_cells, execute_move, is_game_over
+from .metrics import LatencyRecorder
+
+MASK64 = (1 << 64) - 1
+# SQLite 的 INTEGER 是有符号64位整数，超出范围的会话编号不能用于查询
+MIN_ID = -(1 << 63)
+MAX_ID = (1 << 63) - 1
+# 新方块为2的概率，以32位整数表示
+TWO_THRESHOLD = int(0.9 * (1 << 32))
+SESSION = struct.Struct('<QQQ')
+
+
+def splitmix64(x):
+    """splitmix64 随机数：返回 (新状态, 64位随机数)"""
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    z = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x, z ^ (z >> 31)
+
+
+def spawn(state, rng):
+    """在随机空格添加新方块：高32位选格子，低32位决定是2还是4
+    返回: (新状态, 新随机数状态)
+    """
+    cells = empty_cells(state)
+    if not cells:
+        return state, rng
+    rng, z = splitmix64(rng)
+    k = cells[((z >> 32) * len(cells)) >> 32]
+    return state | ((1 if (z & 0xFFFFFFFF) < TWO_THRESHOLD else 2) << (4 * k)), rng
+
+
+def valid_session_id(session_id):
+    """会话编号必须是有符号64位范围内的整数（bool 不算）"""
+    return type(session_id) is int and MIN_ID <= session_id <= MAX_ID
+
+
+async def _discard_line(reader, consumed):
+    """丢弃超长的一行直到换行符为止，连接已关闭时返回False
+    consumed: LimitOverrunError 给出的已在缓冲区中、可以直接丢弃的字节数
+    """
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b'\n')
+            return True
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        except asyncio.IncompleteReadError:
+            return False
+
+
+def board_values(state):
+    """压缩棋盘 -> 按行展开的16个数值"""
+    return [(1 << e) if e else 0 for e in ((state >> (4 * k)) & 0xF for k in range(16))]
+
+
+# 会话表：按列存放所有在内存中的会话，删除时把最后一个会话移到空出的位置，保持各列紧凑
+class SessionTable:
+    def __init__(self):
+        self.ids = array('q')
+        self.states = array('Q')
+        self.scores = array('Q')
+        self.rngs = array('Q')
+        self.used = array('d')
+        self.slots = {}  # 会话编号 -> 位置
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, session_id):
+        return session_id in self.slots
+
+    def add(self, session_id, state, score, rng, now):
+        self.slots[session_id] = len(self.ids)
+        self.ids.append(session_id)
+        self.states.append(state)
+        self.scores.append(score)
+        self.rngs.append(rng)
+        self.used.append(now)
+
+    def remove(self, session_id):
+        """移除会话，返回 (压缩棋盘, 分数, 随机数状态)"""
+        slot = self.slots.pop(session_id)
+        record = (self.states[slot], self.scores[slot], self.rngs[slot])
+        last = len(self.ids) - 1
+        for column in (self.ids, self.states, self.scores, self.rngs, self.used):
+            column[slot] = column[last]
+            column.pop()
+        if slot != last:
+            self.slots[self.ids[slot]] = slot
+        return record
+
+    def idle(self, before):
+        """最后访问时间早于 before 的会话编号"""
+        ids = self.ids
+        return [ids[slot] for slot, used in enumerate(self.used) if used < before]
+
+    def memory_bytes(self):
+        """各列占用的字节数（不含索引字典）"""
+        return sum(column.itemsize * len(column)
+                   for column in (self.ids, self.states, self.scores, self.rngs, self.used))
+
+
+class GameServer:
+    def __init__(self, evict_path=None, idle_timeout=300.0, sweep_interval=10.0):
+        """
+        evict_path: 保存被换出会话的 SQLite 文件，为None时不换出
+        idle_timeout: 会话多久未访问（秒）后换出到磁盘
+        sweep_interval: 检查空闲会话的间隔（秒）
+        """
+        self.table = SessionTable()
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+        self.loaded = 0
+        self.requests = 0
+        self.db = None
+        next_id = 1
+        if evict_path:
+            self.db = sqlite3.connect(evict_path)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, data BLOB NOT NULL)')
+            next_id += self.db.execute('SELECT COALESCE(MAX(id), 0) FROM sessions').fetchone()[0]
+        self._next_id = next_id
+        self._server = None
+        self._sweeper = None
+
+    # 会话操作（同步执行，不涉及网络，也可以直接调用）
+    def _slot(self, session_id):
+        """会话在表中的位置，已换出的会话从磁盘载入；不存在（或编号无效）时返回None"""
+        if not valid_session_id(session_id):
+            return None
+        slot = self.table.slots.get(session_id)
+        if slot is None and self.db is not None:
+            row = self.db.execute('SELECT data FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            if row is not None:
+                with self.db:
+                    self.db.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+                self.table.add(session_id, *SESSION.unpack(row[0]), time.monotonic())
+                self.loaded += 1
+                slot = self.table.slots[session_id]
+        return slot
+
+    def _view(self, session_id, slot):
+        state = self.table.states[slot]
+        return {'id': session_id, 'board': board_values(state), 'score': self.table.scores[slot],
+                'over': is_game_over(state)}
+
+    def new_session(self, seed=None):
+        session_id = self._next_id
+        self._next_id += 1
+        rng = (seed if seed is not None else random.getrandbits(64)) & MASK64
+        state, rng = spawn(0, rng)
+        state, rng = spawn(state, rng)
+        self.table.add(session_id, state, 0, rng, time.monotonic())
+        return self._view(session_id, self.table.slots[session_id])
+
+    def move(self, session_id, direction):
+        slot = self._slot(session_id)
+        if slot is None:
+            return {'error': "会话不存在: %s" % session_id}
+        # JSON 的 true/false 和 1.0 都等于整数方向，必须按类型检查
+        if type(direction) is not int or not 0 <= direction <= 3:
+            return {'error': "无效方向: %r" % (direction,)}
+        table = self.table
+        table.used[slot] = time.monotonic()
+        state = table.states[slot]
+        new_state, gain = execute_move(state, direction)
+        moved = new_state != state
+        if moved:
+            new_state, table.rngs[slot] = spawn(new_state, table.rngs[slot])
+            table.states[slot] = new_state
+            table.scores[slot] += gain
+        view = self._view(session_id, slot)
+        view['moved'] = moved
+        return view
+
+    def get(self, session_id):
+        slot = self._slot(session_id)
+        if slot is None:
+            return {'error': "会话不存在: %s" % session_id}
+        self.table.used[slot] = time.monotonic()
+        return self._view(session_id, slot)
+
+    def close_session(self, session_id):
+        if self._slot(session_id) is None:
+            return {'error': "会话不存在: %s" % session_id}
+        self.table.remove(session_id)
+        return {'id': session_id, 'closed': True}
+
+    def evict_idle(self, now=None):
+        """把空闲超时的会话写入磁盘并移出内存（一个事务），返回换出的数量"""
+        if self.db is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        idle = self.table.idle(now - self.idle_timeout)
+        if idle:
+            rows = [(session_id, SESSION.pack(*self.table.remove(session_id))) for session_id in idle]
+            with self.db:
+                self.db.executemany('INSERT OR REPLACE INTO sessions (id, data) VALUES (?, ?)', rows)
+            self.evicted += len(rows)
+        return len(idle)
+
+    def stats(self):
+        on_disk = 0
+        if self.db is not None:
+            on_disk = self.db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return {
+            'sessions': len(self.table),
+            'on_disk': on_disk,
+            'evicted': self.evicted,
+            'loaded': self.loaded,
+            'requests': self.requests,
+            'memory_bytes': self.table.memory_bytes(),
+        }
+
+    def handle(self, request):
+        """处理一个请求字典，返回响应字典"""
+        self.requests += 1
+        op = request.get('op')
+        try:
+            if op == 'move':
+                return self.move(request['id'], request['dir'])
+            if op == 'new':
+                return self.new_session(request.get('seed'))
+            if op == 'get':
+                return self.get(request['id'])
+            if op == 'close':
+                return self.close_session(request['id'])
+            if op == 'stats':
+                return self.stats()
+        except KeyError as e:
+            return {'error': "缺少字段: %s" % e.args[0]}
+        return {'error': "未知操作: %s" % op}
+
+    # 网络
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial  # 连接关闭前的最后一行可以没有换行符
+                    if not line:
+                        break
+                except asyncio.LimitOverrunError as e:
+                    # 超过缓冲区上限的行：丢弃这一行并回复错误，连接保持打开
+                    if not await _discard_line(reader, e.consumed):
+                        break
+                    line = None
+                if line is None:
+                    response = {'error': "请求过长"}
+                else:
+                    try:
+                        response = self.handle(json.loads(line))
+                    except (ValueError, TypeError, AttributeError, RecursionError):
+                        response = {'error': "无法解析的请求"}
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                # 只在写缓冲区积压时才等待，连续请求不必每次让出事件循环
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.evict_idle()
+
+    async def start(self, host='127.0.0.1', port=2048):
+        """开始监听，返回 asyncio.Server（port=0 时由系统分配端口）"""
+        self._server = await asyncio.start_server(self._client, host, port)
+        if self.db is not None:
+            self._sweeper = asyncio.ensure_future(self._sweep())
+        return self._server
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def close(self):
+        """把内存中的所有会话写入磁盘（如果启用了换出）并关闭数据库"""
+        if self.db is not None:
+            self.evict_idle(float('inf'))
+            self.db.close()
+            self.db = None
+
+
+# 压测客户端：每个连接创建一批会话，轮流随机走子，记录每个请求的往返延迟
+async def _load_connection(host, port, sessions, moves, seed, recorder):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+
+    async def call(request):
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    ids = [(await call({'op': 'new', 'seed': rng.getrandbits(64)}))['id'] for _ in range(sessions)]
+    perf_counter = time.perf_counter
+    for k in range(moves):
+        i = k % len(ids)
+        start = perf_counter()
+        response = await call({'op': 'move', 'id': ids[i], 'dir': rng.randrange(4)})
+        recorder.add(perf_counter() - start)
+        if response.get('over'):
+            await call({'op': 'close', 'id': ids[i]})
+            ids[i] = (await call({'op': 'new', 'seed': rng.getrandbits(64)}))['id']
+    writer.close()
+
+
+async def run_load(host='127.0.0.1', port=2048, connections=10, sessions=1000, moves=10000, seed=0):
+    """并发压测，返回 (每秒移动数, LatencyRecorder)"""
+    recorder = LatencyRecorder(max_samples=moves)
+    per_connection = max(1, sessions // connections)
+    moves_per_connection = max(1, moves // connections)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _load_connection(host, port, per_connection, moves_per_connection, seed * 1000003 + c, recorder)
+        for c in range(connections)])
+    elapsed = time.perf_counter() - start
+    return recorder.count / elapsed if elapsed else 0.0, recorder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="2048多会话游戏服务器")
+    parser.add_argument('command', choices=('serve', 'load'), help="serve 启动服务器，load 运行压测客户端")
+    parser.add_argument('--host', default='127.0.0.1', help="监听（连接）地址")
+    parser.add_argument('--port', type=int, default=2048, help="端口")
+    parser.add_argument('--evict-db', help="换出空闲会话的 SQLite 文件")
+    parser.add_argument('--idle', type=float, default=300.0, help="会话空闲多少秒后换出")
+    parser.add_argument('--connections', type=int, default=10, help="压测：并发连接数")
+    parser.add_argument('--sessions', type=int, default=1000, help="压测：会话总数")
+    parser.add_argument('--moves', type=int, default=10000, help="压测：移动请求总数")
+    parser.add_argument('--seed', type=int, default=0, help="压测：随机种子")
+    args = parser.parse_args(argv)
+
+    if args.command == 'load':
+        rate, recorder = asyncio.run(run_load(args.host, args.port, args.connections,
+                                              args.sessions, args.moves, args.seed))
+        print("每秒移动: %.0f  延迟: %s" % (rate, recorder.summary((50, 99))))
+        return
+
+    server = GameServer(args.evict_db, args.idle)
+
+    async def serve():
+        listener = await server.start(args.host, args.port)
+        print("监听 %s:%d" % (args.host, args.port), file=sys.stderr)
+        try:
+            await listener.serve_forever()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
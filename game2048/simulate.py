@@ -0,0 +1,174 @@
+"""无界面自对弈：在多进程中批量进行2048对局，并逐局输出结果
+
+用法:
+    python -m game2048.simulate --games 100000 --workers 8 --policy greedy --seed 1
+    python -m game2048.simulate --games 1000000 --policy greedy --db results.sqlite
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from .board import GameBoard
+from .policies import greedy_move
+from .replay import ReplayWriter
+from .server import MASK64, splitmix64
+from .solver import ExpectimaxSolver, heuristic_table
+
+POLICIES = ('random', 'greedy', 'expectimax')
+
+
+def game_seed(seed, index):
+    """每局的随机种子只由总种子和对局编号决定，与进程数无关
+    用 splitmix64 混合成63位非负整数，任意 --seed 下录像头和结果库都能按有符号64位整数保存
+    """
+    _, mixed = splitmix64(seed & MASK64)
+    _, mixed = splitmix64((mixed + index) & MASK64)
+    return mixed >> 1
+
+
+def policy_seed(seed):
+    """策略随机数流的种子。棋盘直接用 seed；这里用字符串派生，
+    不会与任何一局棋盘的整数种子重合（例如 ~seed 与 seed + 1 产生的是同一个随机数流）
+    """
+    return '%d:policy' % seed
+
+
+def random_policy(rng):
+    """创建随机策略：用独立的随机数流在有效方向中随机选择"""
+    def choose(board):
+        moves = board.legal_moves()
+        return rng.choice(moves) if moves else None
+    return choose
+
+
+def make_policy(name, depth=2, seed=None):
+    """根据名称创建策略函数"""
+    if name == 'random':
+        return random_policy(random.Random(seed))
+    if name == 'greedy':
+        return greedy_move
+    if name == 'expectimax':
+        # 固定深度、不限时间，保证同一种子的结果与机器负载无关
+        solver = ExpectimaxSolver(time_budget=float('inf'), max_depth=depth)
+        return solver.best_move
+    raise ValueError("未知策略: %s" % name)
+
+
+def play_game(task):
+    """进行一局游戏，返回结果字典
+    task: (对局编号, 随机种子, 策略名称, 搜索深度, 录像目录)
+    """
+    index, seed, policy, depth, replay_dir = task
+    # 棋盘和策略各用一个独立的随机数流
+    board = GameBoard(seed=seed)
+    choose = make_policy(policy, depth, seed=policy_seed(seed))
+    recorder = None
+    if replay_dir:
+        recorder = ReplayWriter(os.path.join(replay_dir, 'game_%08d.rpl' % index), board.board, seed)
+    moves = 0
+    start = time.perf_counter()
+    while not board.game_over:
+        direction = choose(board)
+        if direction is None:
+            break
+        diff = board.move(direction)
+        if diff.moved:
+            moves += 1
+            if recorder:
+                recorder.record(direction, diff.new_tile, board)
+    elapsed = time.perf_counter() - start
+    if recorder:
+        recorder.close()
+
+    return {
+        'game': index,
+        'seed': seed,
+        'score': board.score,
+        'max_tile': max(max(row) for row in board.board),
+        'moves': moves,
+        'time': elapsed,
+    }
+
+
+def _init_worker(policy):
+    """进程初始化：提前构建查找表，避免计入第一局的用时"""
+    if policy == 'expectimax':
+        heuristic_table()
+
+
+def run(games, workers=1, policy='random', seed=0, depth=2, chunksize=None, replay_dir=None):
+    """按对局编号顺序逐局产出结果
+    replay_dir: 指定时把每局录像写入该目录
+    """
+    if replay_dir:
+        os.makedirs(replay_dir, exist_ok=True)
+    tasks = ((i, game_seed(seed, i), policy, depth, replay_dir) for i in range(games))
+    if workers <= 1:
+        _init_worker(policy)
+        for task in tasks:
+            yield play_game(task)
+        return
+
+    # 每个任务只传一个小元组；分块减少进程间通信次数，
+    # 每个进程分到多块，避免个别长局拖慢整体
+    if chunksize is None:
+        chunksize = max(1, min(256, games // (workers * 16)))
+    with multiprocessing.Pool(workers, _init_worker, (policy,)) as pool:
+        for result in pool.imap(play_game, tasks, chunksize):
+            yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="2048无界面自对弈")
+    parser.add_argument('--games', type=int, default=100, help="对局数")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help="进程数")
+    parser.add_argument('--policy', choices=POLICIES, default='random', help="走子策略")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--depth', type=int, default=2, help="expectimax 搜索深度")
+    parser.add_argument('--output', help="结果输出文件（JSON Lines），'-' 为标准输出；未指定 --db 时默认输出到标准输出")
+    parser.add_argument('--db', help="把结果批量写入 SQLite 结果库（见 game2048.store）")
+    parser.add_argument('--replay-dir', help="把每局录像写入该目录")
+    args = parser.parse_args(argv)
+
+    output = args.output if args.output or args.db else '-'
+    out = None
+    if output:
+        out = sys.stdout if output == '-' else open(output, 'w')
+    start = time.perf_counter()
+    stats = {'score': 0, 'count': 0}
+
+    def results():
+        for result in run(args.games, args.workers, args.policy, args.seed, args.depth,
+                          replay_dir=args.replay_dir):
+            if out is not None:
+                out.write(json.dumps(result) + '\n')
+            stats['score'] += result['score']
+            stats['count'] += 1
+            yield result
+
+    try:
+        if args.db:
+            from .store import ResultsStore
+            with ResultsStore(args.db) as store:
+                store.add_games(results(), args.policy)
+        else:
+            for _ in results():
+                pass
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+    total_score = stats['score']
+    count = stats['count']
+
+    elapsed = time.perf_counter() - start
+    print("对局: %d  用时: %.2fs  每秒对局: %.1f  平均分数: %.1f" % (
+        count, elapsed, count / elapsed if elapsed else 0.0,
+        total_score / count if count else 0.0), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
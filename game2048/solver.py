@@ -0,0 +1,262 @@
+import time
+from collections import OrderedDict
+
+from .bitboard import (BOARD_SIZE, ROW_MASK, CELL_MASK, execute_move, empty_mask,
+                       pack_board, transpose)
+from .symmetry import canonical_key
+
+# 期望最大（expectimax）搜索：玩家层取四个方向中的最大值，
+# 机会层按 add_random_tile 的规则取期望（空格均匀，90%为2，10%为4）
+
+# 启发式评估的权重
+SCORE_LOST_PENALTY = 200000.0
+SCORE_MONOTONICITY_POWER = 4.0
+SCORE_MONOTONICITY_WEIGHT = 47.0
+SCORE_SUM_POWER = 3.5
+SCORE_SUM_WEIGHT = 11.0
+SCORE_MERGES_WEIGHT = 700.0
+SCORE_EMPTY_WEIGHT = 270.0
+
+_heuristic_table = None
+
+
+def _build_heuristic_table():
+    """构建每种行状态的启发式分数表（65536项）"""
+    table = [0.0] * 65536
+    for row in range(65536):
+        line = [(row >> (4 * j)) & CELL_MASK for j in range(BOARD_SIZE)]
+
+        total = 0.0
+        empty = 0
+        merges = 0
+        prev = 0
+        counter = 0
+        for rank in line:
+            total += rank ** SCORE_SUM_POWER
+            if rank == 0:
+                empty += 1
+            else:
+                if prev == rank:
+                    counter += 1
+                elif counter > 0:
+                    merges += 1 + counter
+                    counter = 0
+                prev = rank
+        if counter > 0:
+            merges += 1 + counter
+
+        # 单调性：分别计算向左递减和向右递减的惩罚，取较小者
+        mono_left = 0.0
+        mono_right = 0.0
+        for j in range(1, BOARD_SIZE):
+            a = line[j - 1] ** SCORE_MONOTONICITY_POWER
+            b = line[j] ** SCORE_MONOTONICITY_POWER
+            if line[j - 1] > line[j]:
+                mono_left += a - b
+            else:
+                mono_right += b - a
+
+        table[row] = (SCORE_LOST_PENALTY + SCORE_EMPTY_WEIGHT * empty
+                      + SCORE_MERGES_WEIGHT * merges
+                      - SCORE_MONOTONICITY_WEIGHT * min(mono_left, mono_right)
+                      - SCORE_SUM_WEIGHT * total)
+    return table
+
+
+def heuristic_table():
+    """返回启发式分数表（第一次使用时构建）"""
+    global _heuristic_table
+    if _heuristic_table is None:
+        _heuristic_table = _build_heuristic_table()
+    return _heuristic_table
+
+
+def evaluate(state):
+    """对压缩棋盘做启发式评估：所有行与所有列的分数之和"""
+    table = heuristic_table()
+    t = transpose(state)
+    return (table[state & ROW_MASK] + table[(state >> 16) & ROW_MASK]
+            + table[(state >> 32) & ROW_MASK] + table[(state >> 48) & ROW_MASK]
+            + table[t & ROW_MASK] + table[(t >> 16) & ROW_MASK]
+            + table[(t >> 32) & ROW_MASK] + table[(t >> 48) & ROW_MASK])
+
+
+class SearchTimeout(Exception):
+    """搜索超过时间预算时在内部抛出，用于中止当前深度"""
+
+
+# 期望最大搜索求解器
+class ExpectimaxSolver:
+    # 每搜索这么多个节点检查一次时间
+    TIME_CHECK_INTERVAL = 256
+
+    def __init__(self, time_budget=0.01, max_depth=8, cache_size=200000, min_probability=0.0001,
+                 evaluator=None, symmetric_cache=False):
+        """
+        time_budget: 每步的搜索时间预算（秒）
+        max_depth: 迭代加深的最大深度（玩家走步数）
+        cache_size: 置换表最多保存的局面数，超出时淘汰最久未用的局面
+        min_probability: 到达概率低于该值的机会节点直接做启发式评估
+        evaluator: 学习得到的后状态价值函数（例如 NTupleNetwork.evaluate），估计的是之后还能得多少分；
+            指定时叶子节点用它评估，并且每一步的得分计入搜索值。默认使用手工启发式评估
+        symmetric_cache: 置换表以对称规范键为键，互为旋转/镜像的局面共用一项（评估函数须对称）
+        """
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.cache_size = cache_size
+        self.min_probability = min_probability
+        self.evaluator = evaluator
+        self._evaluate = evaluator or evaluate
+        self._rewards = evaluator is not None
+        self.symmetric_cache = symmetric_cache
+        self.cache = OrderedDict()
+        self.depth_reached = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清零统计数据"""
+        self.nodes = 0
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        self.search_time = 0.0
+        self.searches = 0
+
+    @property
+    def nodes_per_second(self):
+        """平均每秒搜索的节点数"""
+        return self.nodes / self.search_time if self.search_time else 0.0
+
+    @property
+    def cache_hit_rate(self):
+        """置换表命中率"""
+        return self.cache_hits / self.cache_lookups if self.cache_lookups else 0.0
+
+    def stats(self):
+        """以字典形式返回统计数据"""
+        return {
+            'searches': self.searches,
+            'nodes': self.nodes,
+            'search_time': self.search_time,
+            'nodes_per_second': self.nodes_per_second,
+            'cache_hit_rate': self.cache_hit_rate,
+            'cache_entries': len(self.cache),
+            'depth_reached': self.depth_reached,
+        }
+
+    def best_move(self, board):
+        """返回最佳移动方向（0=上, 1=右, 2=下, 3=左），无法移动时返回None
+        board: GameBoard / BitBoard 对象、二维列表或压缩后的整数
+        """
+        state = to_state(board)
+        start = time.perf_counter()
+        self._deadline = start + self.time_budget
+        self._check_countdown = self.TIME_CHECK_INTERVAL
+
+        moves = []
+        for direction in range(4):
+            new_state, gain = execute_move(state, direction)
+            if new_state != state:
+                moves.append((direction, new_state, gain))
+
+        best = moves[0][0] if moves else None
+        self.depth_reached = 0
+        if len(moves) > 1:
+            # 迭代加深：只采用完整搜完的最深一层的结果，
+            # 第一层无论是否超时都要搜完，保证总有结果
+            for depth in range(1, self.max_depth + 1):
+                try:
+                    best = self._search_root(moves, depth, must_finish=(depth == 1))
+                except SearchTimeout:
+                    break
+                self.depth_reached = depth
+                if time.perf_counter() >= self._deadline:
+                    break
+
+        self.search_time += time.perf_counter() - start
+        self.searches += 1
+        return best
+
+    def _search_root(self, moves, depth, must_finish):
+        """搜索根节点，返回最佳方向"""
+        self._must_finish = must_finish
+        best_direction = moves[0][0]
+        best_value = float('-inf')
+        for direction, new_state, gain in moves:
+            value = self._chance_node(new_state, depth - 1, 1.0)
+            if self._rewards:
+                value += gain
+            if value > best_value:
+                best_direction = direction
+                best_value = value
+        return best_direction
+
+    def _tick(self):
+        """节点计数，并定期检查是否超时"""
+        self.nodes += 1
+        self._check_countdown -= 1
+        if self._check_countdown <= 0:
+            self._check_countdown = self.TIME_CHECK_INTERVAL
+            if not self._must_finish and time.perf_counter() >= self._deadline:
+                raise SearchTimeout()
+
+    def _max_node(self, state, depth, probability):
+        """玩家层：取所有有效方向的最大值，无法移动时为0"""
+        self._tick()
+        rewards = self._rewards
+        # 学习得到的价值可能为负，不能用0作为下限
+        best = float('-inf') if rewards else 0.0
+        for direction in range(4):
+            new_state, gain = execute_move(state, direction)
+            if new_state != state:
+                value = self._chance_node(new_state, depth, probability)
+                if rewards:
+                    value += gain
+                if value > best:
+                    best = value
+        return best if best != float('-inf') else 0.0
+
+    def _chance_node(self, state, depth, probability):
+        """机会层：对所有可能出现的新方块取期望"""
+        if depth <= 0 or probability < self.min_probability:
+            self._tick()
+            return self._evaluate(state)
+
+        # 置换表：只有保存的搜索深度不低于当前深度时才能复用
+        self.cache_lookups += 1
+        key = canonical_key(state) if self.symmetric_cache else state
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] >= depth:
+            self.cache_hits += 1
+            self.cache.move_to_end(key)
+            return cached[1]
+
+        self._tick()
+        mask = empty_mask(state)
+        count = mask.bit_count()
+        probability /= count
+        total = 0.0
+        while mask:
+            low = mask & -mask
+            mask ^= low
+            total += 0.9 * self._max_node(state | low, depth - 1, probability * 0.9)
+            total += 0.1 * self._max_node(state | (low << 1), depth - 1, probability * 0.1)
+        value = total / count
+
+        self.cache[key] = (depth, value)
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return value
+
+
+def to_state(board):
+    """把各种形式的棋盘（压缩整数、BitBoard、GameBoard 或二维列表）统一为4x4压缩整数"""
+    if isinstance(board, int):
+        return board
+    if hasattr(board, 'state'):
+        return board.state
+    if hasattr(board, 'board'):
+        board = board.board
+    if len(board) != BOARD_SIZE or any(len(row) != BOARD_SIZE for row in board):
+        raise ValueError("求解器只支持4x4棋盘")
+    return pack_board(board)
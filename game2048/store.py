@@ -0,0 +1,318 @@
+"""对局结果库：SQLite（WAL模式）保存自对弈结果，支持批量写入、索引查询和流式导出
+
+用法:
+    python -m game2048.simulate --games 1000000 --policy greedy --db results.sqlite
+    python -m game2048.store results.sqlite --policy greedy --distribution
+    python -m game2048.store results.sqlite --top 100
+    python -m game2048.store results.sqlite --export-csv games.csv
+    python -m game2048.store results.sqlite --export-columnar games.col
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+from itertools import islice
+from operator import itemgetter
+
+COLUMNS = ('policy', 'game', 'seed', 'score', 'max_tile', 'moves', 'time')
+SELECT_COLUMNS = 'p.name, g.game, g.seed, g.score, g.max_tile, g.moves, g.time'
+
+# 策略名称单独存一张表，games 中只存整数编号，行和索引都更小
+# tile_stats 是按 (策略, 最大方块) 汇总的统计，写入时在同一事务中更新，
+# 分布和汇总查询只读这张小表，与对局数无关
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS policies (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )''',
+    '''CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY,
+        policy INTEGER NOT NULL REFERENCES policies (id),
+        game INTEGER NOT NULL,
+        seed INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        max_tile INTEGER NOT NULL,
+        moves INTEGER NOT NULL,
+        time REAL NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS tile_stats (
+        policy INTEGER NOT NULL,
+        max_tile INTEGER NOT NULL,
+        games INTEGER NOT NULL,
+        score_sum INTEGER NOT NULL,
+        moves_sum INTEGER NOT NULL,
+        max_score INTEGER NOT NULL,
+        PRIMARY KEY (policy, max_tile)
+    ) WITHOUT ROWID''',
+)
+
+# 排行查询按策略过滤后按分数排序，索引让它只读取需要的行；
+# 按最大方块的统计由 tile_stats 回答，不再需要 (policy, max_tile) 索引，写入时少维护一棵B树
+INDEXES = (
+    ('games_policy_score', 'CREATE INDEX IF NOT EXISTS games_policy_score ON games (policy, score)'),
+    ('games_score', 'CREATE INDEX IF NOT EXISTS games_score ON games (score)'),
+)
+
+# 列式文件：与Parquet类似，按行组存放，每个行组内每列连续存放；文件末尾是JSON格式的元数据
+#   文件头 b'G2048COL'
+#   行组   每列依次存放（整数列为int64，浮点列为float64，文本列为以\0结尾的UTF-8）
+#   元数据 JSON: {"columns": [[名称, 类型], ...], "row_groups": [{"rows": n, "offsets": [...], "lengths": [...]}]}
+#   文件尾 8字节元数据长度 + b'G2048COL'
+COLUMNAR_MAGIC = b'G2048COL'
+COLUMN_TYPES = {'policy': 'str', 'game': 'q', 'seed': 'q', 'score': 'q',
+                'max_tile': 'q', 'moves': 'q', 'time': 'd'}
+
+
+class ResultsStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # WAL：写入时不阻塞读取；NORMAL 同步级别在WAL模式下仍能保证数据库不损坏
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        # 64MB页缓存：批量写入时索引的内部页都留在内存中
+        self.conn.execute('PRAGMA cache_size=-65536')
+        with self.conn:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+            self._create_indexes()
+        self._policy_ids = dict(self.conn.execute('SELECT name, id FROM policies'))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COALESCE(SUM(games), 0) FROM tile_stats').fetchone()[0]
+
+    def _create_indexes(self):
+        for _, statement in INDEXES:
+            self.conn.execute(statement)
+
+    def _drop_indexes(self):
+        for name, _ in INDEXES:
+            self.conn.execute('DROP INDEX IF EXISTS %s' % name)
+
+    def _policy_id(self, policy):
+        """策略名称对应的编号，新策略写入 policies 表"""
+        policy_id = self._policy_ids.get(policy)
+        if policy_id is None:
+            with self.conn:
+                policy_id = self.conn.execute('INSERT INTO policies (name) VALUES (?)', (policy,)).lastrowid
+            self._policy_ids[policy] = policy_id
+        return policy_id
+
+    def add_games(self, results, policy, batch_size=50000, defer_indexes=None):
+        """批量写入对局结果，每批在一个事务中提交（同时更新 tile_stats）
+        results: 可迭代的结果字典（simulate.play_game 的返回值），可以是生成器
+        defer_indexes: 写入期间先删除索引，写完后一次性重建（排序建索引比逐行插入快得多）；
+            默认在库为空时（首次导入）启用
+        返回: 写入的行数
+        """
+        policy_id = self._policy_id(policy)
+        if defer_indexes is None:
+            defer_indexes = self.conn.execute('SELECT 1 FROM games LIMIT 1').fetchone() is None
+        fields = itemgetter('game', 'seed', 'score', 'max_tile', 'moves', 'time')
+        rows = ((policy_id,) + fields(result) for result in results)
+        total = 0
+        if defer_indexes:
+            with self.conn:
+                self._drop_indexes()
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self._insert(policy_id, batch)
+                total += len(batch)
+        finally:
+            if defer_indexes:
+                with self.conn:
+                    self._create_indexes()
+        return total
+
+    def _insert(self, policy_id, batch):
+        # 先在内存中按最大方块汇总这一批，再合并进 tile_stats
+        stats = {}
+        for row in batch:
+            score = row[3]
+            entry = stats.get(row[4])
+            if entry is None:
+                stats[row[4]] = [1, score, row[5], score]
+            else:
+                entry[0] += 1
+                entry[1] += score
+                entry[2] += row[5]
+                if score > entry[3]:
+                    entry[3] = score
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO games (policy, game, seed, score, max_tile, moves, time) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+            self.conn.executemany(
+                'INSERT INTO tile_stats (policy, max_tile, games, score_sum, moves_sum, max_score) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (policy, max_tile) DO UPDATE SET '
+                'games = games + excluded.games, score_sum = score_sum + excluded.score_sum, '
+                'moves_sum = moves_sum + excluded.moves_sum, '
+                'max_score = MAX(max_score, excluded.max_score)',
+                [(policy_id, max_tile) + tuple(entry) for max_tile, entry in stats.items()])
+
+    def policies(self):
+        """库中所有策略名称"""
+        return sorted(self._policy_ids)
+
+    def _where_policy(self, policy, column='policy'):
+        """按策略过滤的条件和参数；未知策略匹配不到任何行"""
+        if policy is None:
+            return '', ()
+        return ' WHERE %s = ?' % column, (self._policy_ids.get(policy, -1),)
+
+    def max_tile_distribution(self, policy=None):
+        """最大方块分布 [(最大方块, 局数), ...]，按最大方块升序"""
+        where, params = self._where_policy(policy)
+        query = 'SELECT max_tile, SUM(games) FROM tile_stats%s GROUP BY max_tile ORDER BY max_tile' % where
+        return self.conn.execute(query, params).fetchall()
+
+    def top_games(self, n=100, policy=None):
+        """分数最高的n局 [{列名: 值}, ...]"""
+        where, params = self._where_policy(policy, 'g.policy')
+        cursor = self.conn.execute(
+            'SELECT %s FROM games AS g JOIN policies AS p ON p.id = g.policy%s '
+            'ORDER BY g.score DESC LIMIT ?' % (SELECT_COLUMNS, where), params + (n,))
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def summary(self, policy=None):
+        """局数、平均分、最高分、平均步数"""
+        where, params = self._where_policy(policy)
+        games, score_sum, max_score, moves_sum = self.conn.execute(
+            'SELECT COALESCE(SUM(games), 0), SUM(score_sum), MAX(max_score), SUM(moves_sum) '
+            'FROM tile_stats%s' % where, params).fetchone()
+        return {
+            'games': games,
+            'mean_score': score_sum / games if games else None,
+            'max_score': max_score,
+            'mean_moves': moves_sum / games if games else None,
+        }
+
+    def _select(self, policy=None):
+        where, params = self._where_policy(policy, 'g.policy')
+        return self.conn.execute(
+            'SELECT %s FROM games AS g JOIN policies AS p ON p.id = g.policy%s ORDER BY g.id'
+            % (SELECT_COLUMNS, where), params)
+
+    def export_csv(self, path, policy=None, chunk_size=65536):
+        """流式导出为CSV，每次只在内存中保留一批行；返回导出的行数"""
+        cursor = self._select(policy)
+        total = 0
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                total += len(rows)
+        return total
+
+    def export_columnar(self, path, policy=None, row_group_size=65536):
+        """流式导出为列式文件（格式见文件开头的说明）；返回导出的行数"""
+        cursor = self._select(policy)
+        row_groups = []
+        total = 0
+        with open(path, 'wb') as f:
+            f.write(COLUMNAR_MAGIC)
+            while True:
+                rows = cursor.fetchmany(row_group_size)
+                if not rows:
+                    break
+                offsets = []
+                lengths = []
+                for name, values in zip(COLUMNS, zip(*rows)):
+                    kind = COLUMN_TYPES[name]
+                    if kind == 'str':
+                        data = ('\0'.join(values) + '\0').encode('utf-8')
+                    else:
+                        data = array(kind, values).tobytes()
+                    offsets.append(f.tell())
+                    lengths.append(len(data))
+                    f.write(data)
+                row_groups.append({'rows': len(rows), 'offsets': offsets, 'lengths': lengths})
+                total += len(rows)
+            footer = json.dumps({
+                'columns': [[name, COLUMN_TYPES[name]] for name in COLUMNS],
+                'row_groups': row_groups,
+            }).encode('utf-8')
+            f.write(footer)
+            f.write(struct.pack('<Q', len(footer)))
+            f.write(COLUMNAR_MAGIC)
+        return total
+
+
+def read_columnar(path, columns=None):
+    """逐个行组读取列式文件，产出 {列名: 数组或字符串列表}
+    columns: 只读取这些列（其他列不会从磁盘读出）
+    """
+    with open(path, 'rb') as f:
+        f.seek(-16, 2)
+        footer_size, magic = struct.unpack('<Q8s', f.read(16))
+        if magic != COLUMNAR_MAGIC:
+            raise ValueError("不是有效的列式文件: %s" % path)
+        f.seek(-16 - footer_size, 2)
+        meta = json.loads(f.read(footer_size))
+        names = [name for name, _ in meta['columns']]
+        kinds = dict(meta['columns'])
+        wanted = names if columns is None else columns
+        for group in meta['row_groups']:
+            out = {}
+            for name in wanted:
+                k = names.index(name)
+                f.seek(group['offsets'][k])
+                data = f.read(group['lengths'][k])
+                if kinds[name] == 'str':
+                    out[name] = data.decode('utf-8').split('\0')[:-1]
+                else:
+                    out[name] = array(kinds[name], data)
+            yield out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="2048对局结果库查询与导出")
+    parser.add_argument('db', help="结果库文件")
+    parser.add_argument('--policy', help="只统计该策略")
+    parser.add_argument('--distribution', action='store_true', help="输出最大方块分布")
+    parser.add_argument('--top', type=int, help="输出分数最高的N局")
+    parser.add_argument('--export-csv', help="导出为CSV文件")
+    parser.add_argument('--export-columnar', help="导出为列式文件")
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        start = time.perf_counter()
+        if args.distribution:
+            for max_tile, count in store.max_tile_distribution(args.policy):
+                print("%6d %10d" % (max_tile, count))
+        if args.top:
+            for row in store.top_games(args.top, args.policy):
+                print(json.dumps(row))
+        if args.export_csv:
+            print("导出 %d 行" % store.export_csv(args.export_csv, args.policy), file=sys.stderr)
+        if args.export_columnar:
+            print("导出 %d 行" % store.export_columnar(args.export_columnar, args.policy), file=sys.stderr)
+        if not (args.distribution or args.top or args.export_csv or args.export_columnar):
+            print(json.dumps(store.summary(args.policy)))
+        print("用时: %.1fms" % ((time.perf_counter() - start) * 1e3), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
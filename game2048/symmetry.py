@@ -0,0 +1,129 @@
+"""棋盘的对称规范化：8个旋转/镜像变换下的局面今后的走势完全相同，统一映射到同一个规范键
+
+变换编号与 bitboard.symmetries 的顺序一致（先做的变换写在右边）：
+    0 不变    1 左右翻转    2 上下翻转    3 旋转180度（上下∘左右）
+    4 转置    5 左右∘转置（顺时针旋转90度）    6 上下∘转置（逆时针旋转90度）    7 上下∘左右∘转置（反对角线翻转）
+
+规范键取8个变换结果中最小的一个。搜索时用 canonical(state) 查缓存，
+得到的方向用 from_canonical_direction 映射回原棋盘。
+4x4压缩棋盘只用位运算；任意边长的二维列表棋盘用按边长预先算好的格子置换表。
+"""
+from itertools import chain
+from operator import itemgetter
+
+from .bitboard import flip_horizontal, flip_vertical, symmetries, transpose
+from .history import EXPONENTS
+
+TRANSFORMS = 8
+
+# 方向在各基本变换下的对应关系（0=上, 1=右, 2=下, 3=左）
+_FLIP_H = (0, 3, 2, 1)
+_FLIP_V = (2, 1, 0, 3)
+_TRANSPOSE = (3, 2, 1, 0)
+
+
+def _compose(*maps):
+    """依次应用 maps 中的方向映射（第一个先做）"""
+    result = (0, 1, 2, 3)
+    for mapping in maps:
+        result = tuple(mapping[d] for d in result)
+    return result
+
+
+# DIRECTIONS[k][d]：原棋盘上的方向 d 对应变换 k 之后的棋盘上的哪个方向
+DIRECTIONS = (
+    (0, 1, 2, 3),
+    _FLIP_H,
+    _FLIP_V,
+    _compose(_FLIP_H, _FLIP_V),
+    _TRANSPOSE,
+    _compose(_TRANSPOSE, _FLIP_H),
+    _compose(_TRANSPOSE, _FLIP_V),
+    _compose(_TRANSPOSE, _FLIP_H, _FLIP_V),
+)
+# INVERSE_DIRECTIONS[k][d]：变换 k 之后的棋盘上的方向 d 对应原棋盘上的哪个方向
+INVERSE_DIRECTIONS = tuple(tuple(mapping.index(d) for d in range(4)) for mapping in DIRECTIONS)
+
+
+def transform(state, k):
+    """对压缩棋盘做第 k 个变换"""
+    if k >= 4:
+        state = transpose(state)
+    if k & 1:
+        state = flip_horizontal(state)
+    if k & 2:
+        state = flip_vertical(state)
+    return state
+
+
+def canonical_key(state):
+    """压缩棋盘的规范键（不需要变换编号时用，例如作为缓存的键）"""
+    return min(symmetries(state))
+
+
+def canonical(state):
+    """压缩棋盘的规范形式
+    返回: (规范键, 变换编号)，transform(state, 变换编号) == 规范键
+    """
+    images = symmetries(state)
+    key = min(images)
+    return key, images.index(key)
+
+
+def to_canonical_direction(direction, k):
+    """原棋盘上的方向 -> 经变换 k 得到的棋盘上的方向"""
+    return DIRECTIONS[k][direction]
+
+
+def from_canonical_direction(direction, k):
+    """经变换 k 得到的棋盘上的方向 -> 原棋盘上的方向"""
+    return INVERSE_DIRECTIONS[k][direction]
+
+
+# 任意边长：按边长缓存8个格子置换表，perm[i] 是变换后第 i 个格子（行优先）在原棋盘中的编号
+_permutations = {}
+
+
+def _cell_permutations(size):
+    getters = _permutations.get(size)
+    if getters is None:
+        last = size - 1
+        sources = (
+            lambda i, j: (i, j),
+            lambda i, j: (i, last - j),
+            lambda i, j: (last - i, j),
+            lambda i, j: (last - i, last - j),
+            lambda i, j: (j, i),
+            lambda i, j: (last - j, i),
+            lambda i, j: (j, last - i),
+            lambda i, j: (last - j, last - i),
+        )
+        getters = []
+        for source in sources:
+            perm = [source(*divmod(cell, size)) for cell in range(size * size)]
+            getters.append(itemgetter(*[i * size + j for i, j in perm]))
+        getters = _permutations[size] = tuple(getters)
+    return getters
+
+
+def canonical_board(board):
+    """任意边长二维列表棋盘的规范形式
+    返回: (规范键, 变换编号)，规范键是 边长 + 每格指数 的字节串，可直接用于去重或作为缓存的键
+    """
+    size = len(board)
+    cells = bytes(map(EXPONENTS.__getitem__, chain.from_iterable(board)))
+    if size == 1:
+        return bytes((size,)) + cells, 0
+    images = [bytes(get(cells)) for get in _cell_permutations(size)]
+    key = min(images)
+    return bytes((size,)) + key, images.index(key)
+
+
+def dedupe(boards):
+    """逐个产出 boards 中互不对称的棋盘（保留每组对称局面中第一次出现的那个）"""
+    seen = set()
+    for board in boards:
+        key = canonical_key(board) if isinstance(board, int) else canonical_board(board)[0]
+        if key not in seen:
+            seen.add(key)
+            yield board
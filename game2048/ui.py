@@ -0,0 +1,1003 @@
+"""Kivy界面：方块控件、单画布棋盘、游戏界面和应用类
+
+只在启动应用时导入，引擎部分（game2048.board）不依赖本模块
+"""
+import os
+import time
+
+# 首帧用时从导入本模块（开始加载Kivy）时算起
+STARTUP_TIME = time.perf_counter()
+
+from kivy.app import App
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.core.window import Window
+from kivy.properties import ListProperty, NumericProperty, ObjectProperty
+from kivy.uix.popup import Popup
+from kivy.metrics import dp
+from kivy.clock import Clock
+from kivy.logger import Logger
+from kivy.utils import platform
+from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.image import Image
+from kivy.graphics import Color, Rectangle
+from functools import partial
+from kivy.animation import Animation
+from .board import GameBoard
+from .colors import TILE_COLORS, TEXT_COLORS
+from . import fonts
+from . import metrics
+from .hints import HintService
+from .metrics import LatencyRecorder
+from .replay import ReplayWriter
+
+# 方块UI组件
+from kivy.animation import Animation
+from kivy.graphics import RoundedRectangle, InstructionGroup
+from kivy.uix.widget import Widget
+from kivy.core.text import Label as CoreLabel
+
+def _tile_style(value):
+    """方块的 (文字, 背景色, 文字颜色, 字号)"""
+    # 根据数字大小调整字体
+    if value >= 1000:
+        font_size = dp(18)
+    elif value >= 100:
+        font_size = dp(22)
+    else:
+        font_size = dp(24)
+    return (
+        str(value) if value > 0 else "",
+        TILE_COLORS.get(value, (205/255, 193/255, 180/255, 1)),
+        TEXT_COLORS.get(value, (119/255, 110/255, 101/255, 1)),
+        font_size,
+    )
+
+
+# 每种数值的外观预先算好，更新方块时只需查一次表
+TILE_STYLES = {value: _tile_style(value) for value in TILE_COLORS}
+
+
+def tile_style(value):
+    """查表得到方块外观，表中没有的数值（超过8192）第一次用到时加入"""
+    style = TILE_STYLES.get(value)
+    if style is None:
+        style = TILE_STYLES[value] = _tile_style(value)
+    return style
+
+
+class Tile(ButtonBehavior, Label):
+    value = NumericProperty(0)
+    background_color = ListProperty([1, 1, 1, 1])
+    
+    def __init__(self, **kwargs):
+        # 外观直接作为构造参数传入，标签创建时就是最终样式，不必构造后再逐项修改
+        text, background, color, font_size = tile_style(kwargs.get('value', 0))
+        kwargs.setdefault('text', text)
+        kwargs.setdefault('color', color)
+        kwargs.setdefault('font_size', font_size)
+        kwargs.setdefault('bold', True)
+        kwargs.setdefault('font_name', 'Roboto')  # 添加字体设置
+        super(Tile, self).__init__(**kwargs)
+        
+        # 初始化圆角矩形背景，之后只修改这两条绘图指令的属性，不再重建
+        with self.canvas.before:
+            self.rect_color = Color(*background)
+            self.rect = RoundedRectangle(
+                pos=self.pos,
+                size=self.size,
+                radius=[dp(5)]  # 设置圆角半径
+            )
+    
+    def _update_rect(self, *args):
+        """更新背景矩形的大小和位置"""
+        if hasattr(self, 'rect'):
+            self.rect.pos = self.pos
+            self.rect.size = self.size
+    
+    def update_tile(self, animate=True):
+        """更新方块外观"""
+        new_text, new_background, new_color, new_font_size = tile_style(self.value)
+        
+        # 更新文本和颜色
+        self.text = new_text
+        self.color = new_color
+        self.font_size = new_font_size
+        
+        # 更新背景颜色（直接修改已有的Color指令）
+        if hasattr(self, 'rect_color'):
+            self.rect_color.rgba = new_background
+        
+        # 如果是新值，添加简单的透明度动画（先取消未完成的动画，避免连续更新时动画堆积）
+        if animate and self.text != "":
+            Animation.cancel_all(self, 'opacity')
+            self.opacity = 0
+            anim = Animation(opacity=1, duration=0.2)
+            anim.start(self)
+
+    def on_value(self, instance, value):
+        """当值改变时更新外观"""
+        self.update_tile()
+    
+    def on_size(self, *args):
+        """当大小改变时只移动背景矩形"""
+        self._update_rect()
+    
+    def on_pos(self, *args):
+        """当位置改变时只移动背景矩形"""
+        self._update_rect()
+
+# 数字纹理缓存：每种(数值, 字号)只渲染一次，所有棋盘共用
+_VALUE_TEXTURES = {}
+
+
+def get_value_texture(value, font_size):
+    """返回方块数字的纹理（第一次使用时渲染并缓存）"""
+    key = (value, font_size)
+    texture = _VALUE_TEXTURES.get(key)
+    if texture is None:
+        label = CoreLabel(
+            text=str(value),
+            font_size=font_size,
+            bold=True,
+            font_name='Roboto',
+            color=TEXT_COLORS.get(value, (249/255, 246/255, 242/255, 1))
+        )
+        label.refresh()
+        texture = label.texture
+        _VALUE_TEXTURES[key] = texture
+    return texture
+
+
+# 单画布棋盘：整个棋盘在一个指令组中绘制，不为每个格子创建控件
+class BoardWidget(Widget):
+    SPACING = dp(5)          # 4x4棋盘的格子间距，更大的棋盘按比例缩小
+    FADE_DURATION = 0.2      # 新方块淡入时长
+    ROUNDED_MAX_SIZE = 16    # 边长超过该值时格子只有几个像素，改用普通矩形（顶点少得多）
+    
+    def __init__(self, board_size=4, **kwargs):
+        super(BoardWidget, self).__init__(**kwargs)
+        self.board_size = board_size
+        scale = min(1.0, 4.0 / board_size)
+        self.spacing = self.SPACING * scale
+        self.values = [[0] * board_size for _ in range(board_size)]
+        self._fades = {}
+        self._fade_event = None
+        self._textures = {}  # 数值 -> 本棋盘字号下的数字纹理
+        # 每个格子当前的数字纹理，空格为None
+        # （Rectangle.texture 设为None后读回的是Kivy的默认白色纹理，不能据此判断格子是否有文字）
+        self.cell_textures = [None] * (board_size * board_size)
+        
+        # 每个格子四条指令：背景色、背景矩形、文字颜色、文字矩形
+        self.group = InstructionGroup()
+        self.bg_colors = []
+        self.bg_rects = []
+        self.text_colors = []
+        self.text_rects = []
+        for i in range(board_size):
+            for j in range(board_size):
+                bg_color = Color(*TILE_COLORS[0])
+                if board_size <= self.ROUNDED_MAX_SIZE:
+                    bg_rect = RoundedRectangle(radius=[dp(5) * scale])
+                else:
+                    bg_rect = Rectangle()
+                text_color = Color(1, 1, 1, 1)
+                text_rect = Rectangle(size=(0, 0))
+                for instruction in (bg_color, bg_rect, text_color, text_rect):
+                    self.group.add(instruction)
+                self.bg_colors.append(bg_color)
+                self.bg_rects.append(bg_rect)
+                self.text_colors.append(text_color)
+                self.text_rects.append(text_rect)
+        self.canvas.add(self.group)
+        
+        self._layout()
+        self.bind(pos=self._layout, size=self._layout)
+    
+    def font_size_for(self, value):
+        """与 Tile.update_tile 相同的字号规则，棋盘大于4x4时按格子大小缩小"""
+        font_size = tile_style(value)[3]
+        if self.board_size > 4:
+            font_size = max(dp(6), font_size * 4 / self.board_size)
+        return int(font_size)
+    
+    def _cell_rect(self, i, j):
+        """格子(i, j)的位置和大小，第0行在最上方"""
+        n = self.board_size
+        spacing = self.spacing
+        cell_w = (self.width - spacing * (n + 1)) / n
+        cell_h = (self.height - spacing * (n + 1)) / n
+        x = self.x + spacing + j * (cell_w + spacing)
+        y = self.top - (i + 1) * (cell_h + spacing)
+        return x, y, cell_w, cell_h
+    
+    def _layout(self, *args):
+        """位置或大小改变时只修改已有矩形的几何属性，并记下每个格子的位置供刷新文字时使用"""
+        self._geometry = []
+        for i in range(self.board_size):
+            for j in range(self.board_size):
+                x, y, w, h = self._cell_rect(i, j)
+                self._geometry.append((x, y, w, h))
+                bg_rect = self.bg_rects[len(self._geometry) - 1]
+                bg_rect.pos = (x, y)
+                bg_rect.size = (w, h)
+        for k in range(len(self._geometry)):
+            self._place_text(k)
+    
+    def _place_text(self, k):
+        """把第k个格子的文字居中；文字放不进格子时不显示（很大的棋盘上格子只有几个像素）"""
+        x, y, w, h = self._geometry[k]
+        text_rect = self.text_rects[k]
+        texture = self.cell_textures[k]
+        if texture is not None and texture.width <= w and texture.height <= h:
+            tw, th = texture.size
+        else:
+            tw = th = 0
+        text_rect.size = (tw, th)
+        text_rect.pos = (x + (w - tw) / 2, y + (h - th) / 2)
+    
+    def set_board(self, board, cells=None):
+        """把棋盘数值画到画布上
+        cells: 需要刷新的格子 [(行, 列), ...]，为None时刷新整个棋盘
+        数值变化不影响格子的背景矩形，只需修改颜色和文字
+        """
+        n = self.board_size
+        if cells is None:
+            cells = [(i, j) for i in range(n) for j in range(n)]
+        values = self.values
+        for i, j in cells:
+            value = board[i][j]
+            if values[i][j] == value:
+                continue
+            values[i][j] = value
+            k = i * n + j
+            self.bg_colors[k].rgba = tile_style(value)[1]
+            texture = self.texture_for(value) if value else None
+            self.cell_textures[k] = texture
+            self.text_rects[k].texture = texture
+            self._place_text(k)
+    
+    def texture_for(self, value):
+        """本棋盘字号下的数字纹理"""
+        texture = self._textures.get(value)
+        if texture is None:
+            texture = self._textures[value] = get_value_texture(value, self.font_size_for(value))
+        return texture
+    
+    def prebuild_textures(self, values=tuple(TILE_COLORS)):
+        """预先渲染常见数值的纹理，之后第一次合并出新数值时不必临时渲染"""
+        for value in values:
+            if value:
+                self.texture_for(value)
+    
+    def fade_in(self, i, j):
+        """新方块淡入：所有淡入共用一个时钟事件"""
+        self._fades[(i, j)] = 0.0
+        self._set_alpha(i, j, 0.0)
+        if self._fade_event is None:
+            self._fade_event = Clock.schedule_interval(self._update_fades, 0)
+    
+    def _set_alpha(self, i, j, alpha):
+        k = i * self.board_size + j
+        self.bg_colors[k].a = alpha
+        self.text_colors[k].a = alpha
+    
+    def _update_fades(self, dt):
+        for cell in list(self._fades):
+            elapsed = self._fades[cell] + dt
+            if elapsed >= self.FADE_DURATION:
+                del self._fades[cell]
+                self._set_alpha(cell[0], cell[1], 1.0)
+            else:
+                self._fades[cell] = elapsed
+                self._set_alpha(cell[0], cell[1], elapsed / self.FADE_DURATION)
+        if not self._fades:
+            self._fade_event.cancel()
+            self._fade_event = None
+
+# 游戏界面
+class Game2048(BoxLayout):
+    score_label = ObjectProperty(None)
+    grid_layout = ObjectProperty(None)
+    game_board = None
+    tiles = None
+    
+    board_widget = None
+    
+    # 触摸控制相关常量
+    MIN_SWIPE_DISTANCE = dp(30)    # 最小滑动距离
+    SWIPE_THRESHOLD = 0.3          # 滑动方向判定阈值
+    
+    # 渲染方式：'board' 为单画布 BoardWidget，'tiles' 为每个格子一个 Tile 控件
+    RENDERER = 'board'
+    
+    # 录像目录：设置环境变量 GAME2048_REPLAY_DIR 后每局游戏都会录像
+    REPLAY_DIR = os.environ.get('GAME2048_REPLAY_DIR')
+    
+    # 棋盘边长：可用环境变量 GAME2048_BOARD_SIZE 设置（例如 8、16、64）
+    BOARD_SIZE = int(os.environ.get('GAME2048_BOARD_SIZE', 4))
+    # 'tiles' 渲染方式每个格子一个控件，边长超过该值时改用单画布渲染
+    TILES_MAX_SIZE = 8
+    
+    # 撤销/重做历史的内存上限（4x4棋盘约可保存17万步）
+    HISTORY_BYTES = 4 << 20
+    
+    # 提示搜索的时间预算（秒）；桌面平台在独立进程中搜索，移动平台使用后台线程
+    HINT_TIME_BUDGET = 0.1
+    HINT_PROCESSES = platform not in ('android', 'ios')
+    # 自动游戏每秒走几步：可用环境变量 GAME2048_AUTOPLAY_RATE 设置
+    AUTOPLAY_RATE = float(os.environ.get('GAME2048_AUTOPLAY_RATE', 5))
+    DIRECTION_NAMES = ('上', '右', '下', '左')
+    
+    def __init__(self, **kwargs):
+        # 设置窗口背景色
+        Window.clearcolor = (250/255, 248/255, 239/255, 1)
+        
+        self.renderer = kwargs.pop('renderer', self.RENDERER)
+        self.board_size = kwargs.pop('board_size', self.BOARD_SIZE)
+        if self.board_size > self.TILES_MAX_SIZE:
+            self.renderer = 'board'
+        super(Game2048, self).__init__(**kwargs)
+        
+        # 初始化触摸事件变量
+        self.touch_start_x = 0
+        self.touch_start_y = 0
+        
+        # 设置键盘事件
+        self._keyboard = Window.request_keyboard(self._keyboard_closed, self)
+        self._keyboard.bind(on_key_down=self._on_keyboard_down)
+        
+        # 输入队列：移动立即作用于游戏板，界面每帧最多刷新一次，只绘制最新的局面
+        self._pending_cells = set()    # 排队期间所有移动改变过的格子
+        self._pending_new_tile = None  # 最近一个新方块的位置
+        self._pending_inputs = []      # 尚未绘制的输入时刻
+        self._painted_inputs = []      # 已刷新、等待画面提交的输入时刻
+        self._render_trigger = Clock.create_trigger(self._render)
+        self.input_latency = LatencyRecorder()
+        Window.bind(on_flip=self._on_flip)
+        
+        # 首帧画出之后再做启动时用不到的工作（开始录像、预先渲染数字纹理）
+        self.time_to_first_frame = None
+        Window.bind(on_flip=self._on_first_flip)
+        
+        # 基本布局设置
+        self.orientation = 'vertical'
+        self.padding = dp(10)
+        self.spacing = dp(10)
+        
+        # 创建顶部控制栏
+        top_bar = BoxLayout(size_hint=(1, 0.15), spacing=dp(10))
+        
+        # 创建标题和分数容器
+        title_score_box = BoxLayout(orientation='vertical', size_hint=(0.7, 1))
+        
+        # 游戏标题
+        title_label = Label(
+            text="2048",
+            size_hint=(1, 0.6),
+            font_size=dp(36),
+            bold=True,
+            color=(119/255, 110/255, 101/255, 1),
+            font_name='Roboto'  # 添加字体设置
+        )
+        
+        # 分数显示
+        score_box = BoxLayout(
+            orientation='vertical',
+            size_hint=(1, 0.4),
+            padding=(dp(5), 0),
+            spacing=dp(2)
+        )
+        
+        score_title = Label(
+            text="分数",
+            size_hint=(1, 0.4),
+            font_size=dp(14),
+            color=(119/255, 110/255, 101/255, 1),
+            font_name='Roboto'  # 添加字体设置
+        )
+        
+        self.score_label = Label(
+            text="0",
+            size_hint=(1, 0.6),
+            font_size=dp(20),
+            bold=True,
+            color=(119/255, 110/255, 101/255, 1),
+            font_name='Roboto'  # 添加字体设置
+        )
+        
+        score_box.add_widget(score_title)
+        score_box.add_widget(self.score_label)
+        
+        title_score_box.add_widget(title_label)
+        title_score_box.add_widget(score_box)
+        
+        # 控制按钮和提示
+        buttons_box = BoxLayout(orientation='vertical', size_hint=(0.3, 1), spacing=dp(5))
+        new_game_button = Button(
+            text="新游戏",
+            size_hint=(1, 0.5),
+            background_color=(143/255, 122/255, 102/255, 1),
+            color=(1, 1, 1, 1),
+            font_size=dp(16),
+            bold=True,
+            font_name='Roboto'  # 添加字体设置
+        )
+        new_game_button.bind(on_press=self.new_game)
+        buttons_box.add_widget(new_game_button)
+        
+        self.hint_label = Label(
+            text="",
+            size_hint=(1, 0.5),
+            font_size=dp(14),
+            color=(119/255, 110/255, 101/255, 1),
+            font_name='Roboto'
+        )
+        buttons_box.add_widget(self.hint_label)
+        
+        top_bar.add_widget(title_score_box)
+        top_bar.add_widget(buttons_box)
+        self.add_widget(top_bar)
+        
+        # 创建游戏网格容器（带背景色）
+        grid_container = BoxLayout(size_hint=(1, 0.85))
+        with grid_container.canvas.before:
+            Color(187/255, 173/255, 160/255, 1)  # 游戏板背景色
+            self.grid_bg = Rectangle(pos=grid_container.pos, size=grid_container.size)
+        grid_container.bind(pos=self._update_grid_bg, size=self._update_grid_bg)
+        
+        # 创建游戏网格
+        if self.renderer == 'board':
+            self.board_widget = BoardWidget(
+                board_size=self.board_size,
+                size_hint=(0.95, 0.95),
+                pos_hint={'center_x': 0.5, 'center_y': 0.5}
+            )
+            grid_container.add_widget(self.board_widget)
+        else:
+            self.grid_layout = GridLayout(
+                cols=self.board_size,
+                spacing=dp(5),
+                padding=dp(5),
+                size_hint=(0.95, 0.95),
+                pos_hint={'center_x': 0.5, 'center_y': 0.5}
+            )
+            grid_container.add_widget(self.grid_layout)
+        self.add_widget(grid_container)
+        
+        # 初始化游戏
+        self.game_board = GameBoard(self.board_size, history_bytes=self.HISTORY_BYTES)
+        self.tiles = []
+        self.recorder = None
+        self.recordings = 0  # 本次运行已开始的录像数，保证同一毫秒内开始的录像文件名也不同
+        self.setup_board()
+        
+        # 后台提示与自动游戏
+        self.hints = HintService(time_budget=min(self.HINT_TIME_BUDGET, 0.8 / self.AUTOPLAY_RATE),
+                                 use_processes=self.HINT_PROCESSES)
+        self.autoplay = False
+        self._hint_key = None        # 当前等待的提示对应的局面，局面改变后为None
+        self._autoplay_event = None
+        self._next_autoplay = 0.0    # 下一步自动移动的最早时刻
+        
+        # 性能埋点（通过环境变量或F12开启）
+        self.overlay = None
+        self._frame_event = None
+        self._overlay_event = None
+        if metrics.current() is not None:
+            self._attach_instrumentation(metrics.current())
+        
+    def _update_grid_bg(self, instance, value):
+        """更新网格背景的位置和大小"""
+        if hasattr(self, 'grid_bg'):
+            self.grid_bg.pos = instance.pos
+            self.grid_bg.size = instance.size
+    
+    def setup_board(self):
+        """初始化游戏板UI"""
+        if self.board_widget is not None:
+            self.board_widget.set_board(self.game_board.board)
+            self.score_label.text = str(self.game_board.score)
+            return
+        
+        self.grid_layout.clear_widgets()
+        self.tiles = []
+        
+        # 每个格子创建一个方块
+        for i in range(self.board_size):
+            row = []
+            for j in range(self.board_size):
+                tile = Tile(value=self.game_board.board[i][j])
+                self.grid_layout.add_widget(tile)
+                row.append(tile)
+            self.tiles.append(row)
+        
+        # 更新分数
+        self.score_label.text = str(self.game_board.score)
+    
+    def update_board(self, new_tile_pos=None, diff=None, cells=None):
+        """更新游戏板UI
+        diff: 本次移动的 MoveDiff，提供时只更新发生变化的格子
+        cells: 直接指定需要更新的格子；diff 和 cells 都为None时刷新整个棋盘
+        """
+        board = self.game_board.board
+        if diff is not None:
+            cells = diff.changed_cells()
+        
+        if self.board_widget is not None:
+            self.board_widget.set_board(board, cells)
+            if new_tile_pos:
+                self.board_widget.fade_in(*new_tile_pos)
+        else:
+            if cells is None:
+                cells = [(i, j) for i in range(self.board_size) for j in range(self.board_size)]
+            for i, j in cells:
+                tile = self.tiles[i][j]
+                value = board[i][j]
+                if tile.value == value:
+                    continue
+                # 使用动画更新方块值
+                if new_tile_pos and (i, j) == new_tile_pos:
+                    # 新方块出现动画
+                    tile.value = value
+                    Animation.cancel_all(tile, 'opacity')
+                    tile.opacity = 0
+                    anim = Animation(opacity=1, duration=0.2)
+                    anim.start(tile)
+                else:
+                    tile.value = value
+        
+        # 更新分数
+        self.score_label.text = str(self.game_board.score)
+        
+        # 检查游戏状态
+        if self.game_board.won:
+            self.show_game_message("恭喜！", "你达到了2048！\n继续游戏或开始新游戏？", 
+                                  [("继续", self.dismiss_popup), ("新游戏", self.new_game)])
+            self.game_board.won = False  # 防止重复显示
+        
+        elif self.game_board.game_over:
+            self.show_game_message("游戏结束", "没有更多可能的移动了！\n你的分数: " + str(self.game_board.score), 
+                                  [("新游戏", self.new_game)])
+    
+    def move(self, direction):
+        """执行移动：立即作用于游戏板，界面在下一帧统一刷新
+        按住或连续按键时，同一帧内的多次移动只绘制一次最终局面
+        """
+        start = time.perf_counter()
+        diff = self.game_board.move(direction)
+        if diff.moved:
+            if self.recorder:
+                self.recorder.record(direction, diff.new_tile, self.game_board)
+            self._pending_cells |= diff.changed_cells()
+            if diff.new_tile:
+                self._pending_new_tile = diff.new_tile_pos
+            self._pending_inputs.append(start)
+            self._render_trigger()
+            self._board_changed()
+    
+    def _render(self, *args):
+        """每帧最多执行一次：把排队期间所有移动的变化一起画出"""
+        cells, self._pending_cells = self._pending_cells, set()
+        new_tile_pos, self._pending_new_tile = self._pending_new_tile, None
+        self.update_board(new_tile_pos, cells=cells)
+        self._painted_inputs.extend(self._pending_inputs)
+        self._pending_inputs = []
+    
+    def _discard_pending(self):
+        """整盘刷新前丢弃尚未绘制的移动，下一帧不再把旧局面的变化画到新局面上"""
+        self._render_trigger.cancel()
+        self._pending_cells = set()
+        self._pending_new_tile = None
+        self._pending_inputs = []
+    
+    def _on_flip(self, *args):
+        """画面提交后记录从输入到画面的延迟"""
+        if self._painted_inputs:
+            now = time.perf_counter()
+            for start in self._painted_inputs:
+                self.input_latency.add(now - start)
+            self._painted_inputs = []
+    
+    def _on_first_flip(self, *args):
+        """第一帧画面提交：记录首帧用时，之后再做推迟的启动工作"""
+        Window.unbind(on_flip=self._on_first_flip)
+        self.time_to_first_frame = time.perf_counter() - STARTUP_TIME
+        Logger.info('Game2048: 首帧用时 %.0f ms' % (self.time_to_first_frame * 1e3))
+        Clock.schedule_once(self._finish_startup)
+    
+    def _finish_startup(self, dt):
+        """首帧之后：开始录像（新游戏可能已经开始了录像），预先渲染其余数值的纹理"""
+        if self.recorder is None:
+            self._start_recording()
+        if self.board_widget is not None:
+            self.board_widget.prebuild_textures()
+    
+    def new_game(self, *args):
+        """开始新游戏"""
+        if hasattr(self, 'popup') and self.popup:
+            self.popup.dismiss()
+        self.game_board.reset()
+        self._discard_pending()
+        self.update_board()
+        self._start_recording()
+        self._board_changed()
+    
+    def undo(self, *args):
+        """撤销上一步"""
+        if self.game_board.undo():
+            self._after_history_step()
+    
+    def redo(self, *args):
+        """重做被撤销的一步"""
+        if self.game_board.redo():
+            self._after_history_step()
+    
+    def _after_history_step(self):
+        """撤销/重做后整盘刷新；录像不能倒退，从当前局面开始新的录像"""
+        self.dismiss_popup()
+        self._discard_pending()
+        self.update_board()
+        if self.recorder:
+            self._start_recording()
+        self._board_changed()
+    
+    def show_hint(self, *args):
+        """在后台搜索当前局面的最佳方向，结果在之后的某一帧显示"""
+        self.hint_label.text = "思考中…"
+        self._hint_key = self.hints.request(self.game_board.board, self._on_hint_ready)
+    
+    def _on_hint_ready(self, key, direction, error=None):
+        """在后台线程中调用：转交给界面线程处理"""
+        Clock.schedule_once(partial(self._apply_hint, key, direction, error))
+    
+    def _apply_hint(self, key, direction, error, dt):
+        """显示提示；自动游戏时按设定的速度执行这一步"""
+        if key != self._hint_key:
+            return  # 局面已经改变，结果作废
+        if error is not None:
+            Logger.warning('Game2048: 提示搜索失败: %r' % (error,))
+            self._hint_key = None
+            self.hint_label.text = "提示失败"
+            self.stop_autoplay()
+            return
+        if direction is None:
+            self.hint_label.text = "无法移动"
+            self.stop_autoplay()
+            return
+        self.hint_label.text = "提示：" + self.DIRECTION_NAMES[direction]
+        if self.autoplay:
+            delay = max(0.0, self._next_autoplay - time.perf_counter())
+            self._autoplay_event = Clock.schedule_once(partial(self._autoplay_move, key, direction), delay)
+    
+    def _autoplay_move(self, key, direction, dt):
+        if not self.autoplay or key != self._hint_key:
+            return
+        self._autoplay_event = None
+        self._next_autoplay = time.perf_counter() + 1.0 / self.AUTOPLAY_RATE
+        self.move(direction)
+    
+    def _board_changed(self):
+        """局面改变：作废尚未返回的提示（玩家抢先走了一步），自动游戏时为新局面请求下一步"""
+        self.hints.cancel()
+        self._hint_key = None
+        self.hint_label.text = ""
+        if self._autoplay_event is not None:
+            self._autoplay_event.cancel()
+            self._autoplay_event = None
+        if self.autoplay:
+            if self.game_board.game_over:
+                self.stop_autoplay()
+            else:
+                self.show_hint()
+    
+    def toggle_autoplay(self, *args):
+        """开始/停止自动游戏"""
+        if self.autoplay:
+            self.stop_autoplay()
+        else:
+            self.autoplay = True
+            self._next_autoplay = 0.0
+            self.show_hint()
+    
+    def stop_autoplay(self):
+        """停止自动游戏"""
+        self.autoplay = False
+        if self._autoplay_event is not None:
+            self._autoplay_event.cancel()
+            self._autoplay_event = None
+    
+    def _start_recording(self):
+        """从当前局面开始录制（未设置录像目录时不录制）"""
+        self.stop_recording()
+        if self.REPLAY_DIR:
+            os.makedirs(self.REPLAY_DIR, exist_ok=True)
+            self.recordings += 1
+            name = time.strftime('%Y%m%d-%H%M%S') + '-%03d-%d.rpl' % (
+                int(time.time() * 1000) % 1000, self.recordings)
+            self.recorder = ReplayWriter(os.path.join(self.REPLAY_DIR, name), self.game_board.board,
+                                         score=self.game_board.score)
+    
+    def stop_recording(self):
+        """结束录制并把缓冲区写入磁盘"""
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+    
+    def show_game_message(self, title, message, buttons):
+        """显示游戏消息弹窗"""
+        content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        content.add_widget(Label(text=message, font_size=dp(18), font_name='Roboto'))
+        
+        # 添加按钮
+        btn_layout = BoxLayout(size_hint=(1, 0.4), spacing=dp(10))
+        for btn_text, btn_callback in buttons:
+            btn = Button(text=btn_text, font_name='Roboto')
+            btn.bind(on_press=btn_callback)
+            btn_layout.add_widget(btn)
+        
+        content.add_widget(btn_layout)
+        
+        self.popup = Popup(
+            title=title, 
+            content=content, 
+            size_hint=(0.8, 0.5), 
+            auto_dismiss=False,
+            title_font='Roboto'  # 设置标题字体
+        )
+        self.popup.open()
+    
+    def dismiss_popup(self, *args):
+        """关闭弹窗"""
+        if hasattr(self, 'popup') and self.popup:
+            self.popup.dismiss()
+    
+    def _keyboard_closed(self):
+        """键盘关闭时的处理，清理键盘绑定"""
+        if self._keyboard:
+            self._keyboard.unbind(on_key_down=self._on_keyboard_down)
+            self._keyboard = None
+    
+    def _on_keyboard_down(self, keyboard, keycode, text, modifiers):
+        """处理键盘按键事件"""
+        # 定义按键映射
+        key_mapping = {
+            'up': 0,     # 上
+            'w': 0,      # 上
+            'right': 1,  # 右
+            'd': 1,      # 右
+            'down': 2,   # 下
+            's': 2,      # 下
+            'left': 3,   # 左
+            'a': 3       # 左
+        }
+        
+        # 检查按键是否在映射中
+        if keycode[1] in key_mapping:
+            direction = key_mapping[keycode[1]]
+            self.move(direction)
+            return True
+            
+        # 特殊按键处理
+        elif keycode[1] == 'r':  # 按R键重新开始游戏
+            self.new_game()
+            return True
+        elif keycode[1] == 'u':  # 按U键撤销
+            self.undo()
+            return True
+        elif keycode[1] == 'y':  # 按Y键重做
+            self.redo()
+            return True
+        elif keycode[1] == 'h':  # 按H键显示提示
+            self.show_hint()
+            return True
+        elif keycode[1] == 'p':  # 按P键开始/停止自动游戏
+            self.toggle_autoplay()
+            return True
+        elif keycode[1] == 'f12':  # F12键显示/隐藏性能面板
+            self.toggle_overlay()
+            return True
+        elif keycode[1] == 'f11':  # F11键导出性能数据
+            self.export_metrics()
+            return True
+        elif keycode[1] == 'escape':  # ESC键关闭键盘
+            keyboard.release()
+            return True
+            
+        return False
+    
+    def _attach_instrumentation(self, instrumentation):
+        """开始统计帧时间，并把输入延迟加入导出的指标"""
+        for p in (50, 90, 99):
+            instrumentation.gauges['input_latency_p%d_ms' % p] = partial(self._latency_ms, p)
+        instrumentation.gauges['time_to_first_frame_ms'] = self._first_frame_ms
+        if self._frame_event is None:
+            self._frame_event = Clock.schedule_interval(self._on_frame, 0)
+    
+    def _latency_ms(self, p):
+        return self.input_latency.percentile(p) * 1e3
+    
+    def _first_frame_ms(self):
+        return self.time_to_first_frame * 1e3 if self.time_to_first_frame is not None else 0.0
+    
+    def _on_frame(self, dt):
+        """每帧记录帧时间，并检查 cProfile 采集窗口"""
+        instrumentation = metrics.current()
+        if instrumentation is None:
+            self._frame_event.cancel()
+            self._frame_event = None
+            return
+        instrumentation.histogram('frame_time').add(dt)
+        instrumentation.poll()
+    
+    def toggle_overlay(self, *args):
+        """显示/隐藏性能面板；埋点尚未开启时先开启"""
+        if self.overlay is not None:
+            self._overlay_event.cancel()
+            self._overlay_event = None
+            Window.remove_widget(self.overlay)
+            self.overlay = None
+            return
+        instrumentation = metrics.current()
+        if instrumentation is None:
+            instrumentation = enable_instrumentation()
+        self._attach_instrumentation(instrumentation)
+        
+        self.overlay = Label(
+            size_hint=(None, None),
+            halign='left',
+            valign='top',
+            font_size=dp(11),
+            color=(1, 1, 1, 1),
+            font_name='Roboto'
+        )
+        with self.overlay.canvas.before:
+            Color(0, 0, 0, 0.6)
+            overlay_bg = Rectangle()
+        
+        def follow(label, *args):
+            label.text_size = (None, None)
+            label.texture_update()
+            label.size = label.texture_size
+            label.pos = (dp(5), Window.height - label.height - dp(5))
+            overlay_bg.pos = label.pos
+            overlay_bg.size = label.size
+        self.overlay.bind(text=follow)
+        Window.add_widget(self.overlay)
+        self._update_overlay()
+        self._overlay_event = Clock.schedule_interval(self._update_overlay, 0.5)
+    
+    def _update_overlay(self, *args):
+        """刷新性能面板的文字"""
+        instrumentation = metrics.current()
+        if self.overlay is None or instrumentation is None:
+            return
+        timers = instrumentation.timers
+        lines = []
+        frames = instrumentation.histograms.get('frame_time')
+        if frames is not None:
+            lines.append('frames  ' + '  '.join('%s:%d' % item for item in frames.as_dict().items()))
+        for name in sorted(timers):
+            timer = timers[name]
+            lines.append('%-28s n=%-7d mean=%8.1fus max=%8.1fus' % (
+                name, timer.count, timer.total / timer.count * 1e6 if timer.count else 0.0,
+                timer.max * 1e6))
+        lines.append('input latency  ' + self.input_latency.summary())
+        if instrumentation.profiling:
+            lines.append('cProfile: 采集中 -> %s' % instrumentation.profile_output)
+        self.overlay.text = '\n'.join(lines)
+    
+    def export_metrics(self, path=None):
+        """导出性能数据（默认为环境变量 GAME2048_INSTRUMENT_OUT 指定的文件）"""
+        instrumentation = metrics.current()
+        if instrumentation is None:
+            return None
+        path = path or os.environ.get(metrics.ENV_OUTPUT) or 'game2048-metrics.json'
+        instrumentation.export(path)
+        Logger.info('Game2048: 性能数据已导出到 %s' % path)
+        return path
+    
+    def on_touch_down(self, touch):
+        """处理触摸开始事件"""
+        self.touch_start_x = touch.x
+        self.touch_start_y = touch.y
+        return super(Game2048, self).on_touch_down(touch)
+    
+    def on_touch_up(self, touch):
+        """处理触摸结束事件，判断滑动方向"""
+        # 计算滑动距离和角度
+        dx = touch.x - self.touch_start_x
+        dy = touch.y - self.touch_start_y
+        
+        # 计算总滑动距离
+        total_distance = (dx * dx + dy * dy) ** 0.5
+        
+        # 如果滑动距离太小，忽略这次滑动
+        if total_distance < self.MIN_SWIPE_DISTANCE:
+            return super(Game2048, self).on_touch_up(touch)
+        
+        # 计算水平和垂直方向的移动比例
+        try:
+            dx_ratio = abs(dx / total_distance)
+            dy_ratio = abs(dy / total_distance)
+        except ZeroDivisionError:
+            return super(Game2048, self).on_touch_up(touch)
+        
+        # 根据滑动方向的主导性来决定移动方向
+        if dx_ratio > self.SWIPE_THRESHOLD and dx_ratio > dy_ratio:
+            # 水平滑动
+            if dx > 0:
+                self.move(1)  # 右
+            else:
+                self.move(3)  # 左
+        elif dy_ratio > self.SWIPE_THRESHOLD and dy_ratio > dx_ratio:
+            # 垂直滑动
+            if dy > 0:
+                self.move(0)  # 上
+            else:
+                self.move(2)  # 下
+        
+        return super(Game2048, self).on_touch_up(touch)
+
+from kivy.core.text import LabelBase
+from kivy.resources import resource_add_path
+
+def install_instrumentation(instrumentation):
+    """给界面热点加上计时：Tile.update_tile 调用、画布构建次数和棋盘刷新用时"""
+    instrumentation.wrap(Tile, 'update_tile')
+    instrumentation.wrap(Tile, '__init__', name='Tile.canvas_build')
+    instrumentation.wrap(BoardWidget, '__init__', name='BoardWidget.canvas_build')
+    instrumentation.wrap(BoardWidget, 'set_board')
+    instrumentation.wrap(Game2048, 'update_board')
+
+
+def enable_instrumentation():
+    """开启引擎和界面的埋点（已开启时直接返回）"""
+    installed = metrics.current() is not None
+    instrumentation = metrics.enable()
+    if not installed:
+        install_instrumentation(instrumentation)
+    return instrumentation
+
+# 主应用类
+class Game2048App(App):
+    def build(self):
+        """构建应用"""
+        # 设置窗口大小
+        if platform != 'android' and platform != 'ios':
+            Window.size = (400, 600)
+        
+        # 添加字体路径（项目根目录）
+        resource_add_path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        
+        # 注册中文字体：查找结果按平台缓存，之后启动时只需确认文件仍然存在
+        try:
+            cache_path = os.path.join(self.user_data_dir, fonts.CACHE_NAME)
+        except OSError:
+            cache_path = None  # 用户数据目录无法创建时不缓存
+        font = fonts.find_font(platform, cache_path)
+        if font is not None:
+            LabelBase.register('Roboto', font)
+        else:
+            Logger.warning('Game2048: 未能加载中文字体，中文可能无法正确显示')
+        
+        # 按环境变量开启埋点，需在创建界面之前完成，才能统计到画布构建
+        instrumentation = metrics.enable_from_env()
+        if instrumentation is not None:
+            install_instrumentation(instrumentation)
+        
+        self.game = Game2048()
+        return self.game
+    
+    def on_stop(self):
+        """退出时保存录像，并把输入延迟写入日志；开启埋点时导出性能数据"""
+        self.game.stop_recording()
+        self.game.hints.shutdown()
+        Logger.info('Game2048: 输入到画面的延迟 %s' % self.game.input_latency.summary())
+        instrumentation = metrics.current()
+        if instrumentation is not None:
+            instrumentation.stop_profile()
+            if os.environ.get(metrics.ENV_OUTPUT):
+                self.game.export_metrics()
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# 使用离屏窗口和模拟GL后端，界面相关的测试不需要显示器
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
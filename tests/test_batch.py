@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pytest
+
+from game2048.batch import BatchGameBoard
+from game2048.board import GameBoard
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 5, 7])
+def test_default_mode_matches_game_board(size):
+    """默认模式下每个棋盘与同一种子的 GameBoard 逐步相同（移动、得分、新方块、结束和重新开局）"""
+    n = 20
+    seeds = [1000 * size + i for i in range(n)]
+    batch = BatchGameBoard(n, size, seed=seeds)
+    games = [GameBoard(size, seed=s) for s in seeds]
+    np.testing.assert_array_equal(batch.boards, [g.board for g in games])
+
+    rng = random.Random(size)
+    for _ in range(300):
+        directions = [rng.randrange(4) for _ in range(n)]
+        moved, gains, _ = batch.move(directions)
+        for b, (game, direction) in enumerate(zip(games, directions)):
+            diff = game.move(direction)
+            assert moved[b] == diff.moved
+            assert gains[b] == diff.score_gain
+            assert batch.score[b] == game.score
+            assert batch.game_over[b] == game.game_over
+            np.testing.assert_array_equal(batch.boards[b], game.board)
+        if batch.game_over.any():
+            done = batch.game_over.copy()
+            batch.reset(done)
+            for b in np.nonzero(done)[0]:
+                games[b].reset()
+                np.testing.assert_array_equal(batch.boards[b], games[b].board)
+
+
+def test_integer_seed_offsets_per_board():
+    batch = BatchGameBoard(3, 4, seed=7)
+    for b in range(3):
+        np.testing.assert_array_equal(batch.boards[b], GameBoard(4, seed=7 + b).board)
+
+
+def test_seed_count_must_match():
+    with pytest.raises(ValueError):
+        BatchGameBoard(3, 4, seed=[1, 2])
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 5, 7])
+def test_fast_rng_rules_match_game_board(size):
+    """fast_rng 模式的随机数与 GameBoard 不同，但移动和合并规则相同：逐个棋盘用 GameBoard 重放同一步"""
+    n = 50
+    batch = BatchGameBoard(n, size, seed=size, fast_rng=True)
+    rng = random.Random(size)
+    for _ in range(200):
+        before = batch.boards.copy()
+        directions = np.array([rng.randrange(4) for _ in range(n)])
+        moved, gains, positions = batch.move(directions)
+        for b in range(n):
+            game = GameBoard(size)
+            game.board = [list(map(int, row)) for row in before[b]]
+            diff = game.move(directions[b], spawn=None if not moved[b] else
+                             (int(positions[b][0]), int(positions[b][1]),
+                              int(batch.boards[b][positions[b][0], positions[b][1]])))
+            assert moved[b] == diff.moved
+            assert gains[b] == diff.score_gain
+            np.testing.assert_array_equal(batch.boards[b], game.board)
+        batch.reset(batch.game_over.copy())
+
+
+def test_fast_rng_is_reproducible():
+    runs = []
+    for _ in range(2):
+        batch = BatchGameBoard(8, 4, seed=3, fast_rng=True)
+        for k in range(20):
+            batch.move(np.full(8, k % 4))
+        runs.append(batch.boards.copy())
+    np.testing.assert_array_equal(runs[0], runs[1])
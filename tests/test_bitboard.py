@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from game2048.bitboard import BitBoard, execute_move, overflows, pack_board, unpack_board
+from game2048.board import GameBoard
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_seeded_game_matches_game_board(seed):
+    """同一种子、同样的方向序列，位棋盘与 GameBoard 的每一步都相同"""
+    bit = BitBoard(seed=seed)
+    game = GameBoard(4, seed=seed)
+    directions = random.Random('directions:%d' % seed)
+    assert bit.board == game.board
+    while not game.game_over:
+        direction = directions.randrange(4)
+        moved, position = bit.move(direction)
+        diff = game.move(direction)
+        assert moved == diff.moved
+        assert position == diff.new_tile_pos
+        assert bit.board == game.board
+        assert bit.score == game.score
+        assert bit.game_over == game.game_over
+        assert bit.legal_moves() == game.legal_moves()
+    assert bit.game_over
+
+
+def test_execute_move_matches_game_board():
+    rng = random.Random(1)
+    for _ in range(500):
+        board = [[rng.choice((0, 0, 2, 4, 8, 16, 2048)) for _ in range(4)] for _ in range(4)]
+        state = pack_board(board)
+        assert unpack_board(state) == board
+        for direction in range(4):
+            game = GameBoard(4)
+            game.board = [row[:] for row in board]
+            before = game.score
+            new_state, gain = execute_move(state, direction)
+            game.add_random_tile = lambda: None  # 只比较移动本身
+            game.move(direction)
+            assert unpack_board(new_state) == game.board
+            assert gain == game.score - before
+
+
+def test_merging_two_32768_raises():
+    board = [[32768, 0, 0, 32768], [2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+    bit = BitBoard(seed=1)
+    bit.board = board
+    for direction in (1, 3):
+        with pytest.raises(ValueError):
+            bit.move(direction)
+        assert bit.board == board and bit.score == 0
+    # 与两个32768不在同一行（列）的方向照常移动
+    moved, _ = bit.move(2)
+    assert moved
+
+
+def test_overflows_matches_capped_merges():
+    rng = random.Random(3)
+    for _ in range(2000):
+        board = [[rng.choice((0, 0, 16384, 32768, 32768, 2)) for _ in range(4)] for _ in range(4)]
+        state = pack_board(board)
+        for direction in range(4):
+            game = GameBoard(4, seed=0)
+            game.board = [row[:] for row in board]
+            game.move(direction)
+            # GameBoard 没有上限：合并出65536当且仅当位棋盘会溢出
+            expected = any(65536 in row for row in game.board)
+            assert overflows(state, direction) == expected
+            bit = BitBoard(seed=0)
+            bit.state = state
+            if expected:
+                with pytest.raises(ValueError):
+                    bit.move(direction)
+            else:
+                bit.move(direction)
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from game2048.board import GameBoard, MoveDiff
+
+
+def reference_move(board, direction):
+    """逐行复制、去零、合并的直接实现，作为原地移动的对照"""
+    size = len(board)
+    grid = [row[:] for row in board]
+    # 转到“向左移动”的坐标系
+    if direction == 0:
+        grid = [list(col) for col in zip(*grid)]
+    elif direction == 1:
+        grid = [row[::-1] for row in grid]
+    elif direction == 2:
+        grid = [list(col)[::-1] for col in zip(*grid)]
+    gain = 0
+    result = []
+    for row in grid:
+        tiles = [v for v in row if v]
+        merged = []
+        k = 0
+        while k < len(tiles):
+            if k + 1 < len(tiles) and tiles[k] == tiles[k + 1]:
+                merged.append(tiles[k] * 2)
+                gain += tiles[k] * 2
+                k += 2
+            else:
+                merged.append(tiles[k])
+                k += 1
+        result.append(merged + [0] * (size - len(merged)))
+    if direction == 0:
+        result = [list(col) for col in zip(*result)]
+    elif direction == 1:
+        result = [row[::-1] for row in result]
+    elif direction == 2:
+        result = [list(col) for col in zip(*[row[::-1] for row in result])]
+    return result, gain
+
+
+def random_board(rng, size):
+    return [[rng.choice((0, 0, 0, 2, 2, 4, 8)) for _ in range(size)] for _ in range(size)]
+
+
+def apply_diff(board, diff):
+    """只用 MoveDiff 中的滑动和合并记录重建移动后的棋盘（不含新方块）"""
+    result = [row[:] for row in board]
+    values = {}
+    for source, _ in diff.slides:
+        values[source] = board[source[0]][source[1]]
+    for source_a, source_b, _, _ in diff.merges:
+        values[source_a] = values[source_b] = None
+    for (i, j) in values:
+        result[i][j] = 0
+    for source, (i, j) in diff.slides:
+        result[i][j] = values[source]
+    for _, _, (i, j), value in diff.merges:
+        result[i][j] = value
+    return result
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 5, 6])
+def test_move_matches_reference_and_diff(size):
+    rng = random.Random(size)
+    for _ in range(300):
+        board = random_board(rng, size)
+        direction = rng.randrange(4)
+        expected, gain = reference_move(board, direction)
+        game = GameBoard(size, seed=0)
+        game.board = [row[:] for row in board]
+        game.score = 0
+        diff = game.move(direction)
+
+        assert diff.moved == (expected != board)
+        assert diff.score_gain == gain == game.score
+        after = [row[:] for row in game.board]
+        if diff.new_tile:
+            i, j, value = diff.new_tile
+            assert value in (2, 4) and expected[i][j] == 0
+            after[i][j] = 0
+        assert after == expected
+        assert apply_diff(board, diff) == expected
+
+        changed = {(i, j) for i in range(size) for j in range(size) if board[i][j] != game.board[i][j]}
+        assert changed <= diff.changed_cells()
+
+
+def test_empty_mask_tracks_board():
+    game = GameBoard(5, seed=3)
+    rng = random.Random(3)
+    while not game.game_over:
+        game.move(rng.randrange(4))
+        expected = sum(1 << (i * 5 + j) for i in range(5) for j in range(5) if game.board[i][j] == 0)
+        assert game._empty == expected
+
+
+def test_move_diff_unpacks_like_old_return_value():
+    game = GameBoard(4, seed=1)
+    moved, position = game.move(game.legal_moves()[0])
+    assert moved and position is not None
+    assert game.board[position[0]][position[1]] in (2, 4)
+
+
+def test_invalid_direction_does_nothing():
+    game = GameBoard(4, seed=1)
+    board = [row[:] for row in game.board]
+    diff = game.move(7)
+    assert isinstance(diff, MoveDiff) and not diff.moved
+    assert game.board == board
+
+
+def test_same_seed_same_game():
+    a = GameBoard(4, seed=42)
+    b = GameBoard(4, seed=42)
+    rng = random.Random(0)
+    while not a.game_over:
+        direction = rng.randrange(4)
+        assert a.move(direction).new_tile == b.move(direction).new_tile
+        assert a.board == b.board
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_spawn_after_direct_cell_writes(seed):
+    """直接写入格子后，新方块不会落在已有方块上"""
+    game = GameBoard(4, seed=seed)
+    game.board = [[0] * 4 for _ in range(4)]
+    game.board[0][0] = 2
+    game.board[1][1] = 4
+    for n in range(5):
+        game.add_random_tile()
+        assert sum(value != 0 for row in game.board for value in row) == 3 + n
+    assert game.board[0][0] == 2 and game.board[1][1] == 4
@@ -0,0 +1,75 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from game2048.env import VectorEnv, _layout, _worker
+
+
+def run(env, steps=60, seed=3):
+    """固定的方向序列走若干步，复制每一步的所有输出"""
+    rng = np.random.default_rng(0)
+    trace = [env.reset(seed=seed).copy()]
+    for _ in range(steps):
+        obs, reward, done, info = env.step(rng.integers(0, 4, env.num_envs))
+        trace.append((obs.copy(), reward.copy(), done.copy(), info['action_mask'].copy(),
+                      info['score'].copy(), info['final_score'].copy()))
+    return trace
+
+
+def assert_same(a, b):
+    assert len(a) == len(b)
+    np.testing.assert_array_equal(a[0], b[0])
+    for x, y in zip(a[1:], b[1:]):
+        for u, v in zip(x, y):
+            np.testing.assert_array_equal(u, v)
+
+
+@pytest.mark.parametrize('observation', ['exponent', 'onehot'])
+def test_reset_and_step_shapes(observation):
+    with VectorEnv(5, size=3, observation=observation, planes=8, obs_dtype=np.float32) as env:
+        expected = (3, 3) if observation == 'exponent' else (8, 3, 3)
+        assert env.observation_shape == expected
+        obs = env.reset(seed=1)
+        assert obs.shape == (5,) + expected and obs.dtype == np.float32
+        assert env.action_masks().shape == (5, 4) and env.action_masks().dtype == bool
+        obs, reward, done, info = env.step([0, 1, 2, 3, 0])
+        assert obs.shape == (5,) + expected
+        assert reward.shape == done.shape == (5,)
+        assert reward.dtype == np.int64 and done.dtype == bool
+        assert info['action_mask'].shape == (5, 4)
+        assert info['score'].shape == info['final_score'].shape == info['final_max_tile'].shape == (5,)
+        if observation == 'onehot':
+            # 每个格子恰好属于一个平面
+            np.testing.assert_array_equal(obs.sum(axis=1), 1)
+
+
+def test_sync_and_shared_backends_match():
+    with VectorEnv(6, observation='onehot', backend='sync') as env:
+        expected = run(env)
+    with VectorEnv(6, observation='onehot', backend='shared', workers=1) as env:
+        assert_same(run(env), expected)
+
+
+def test_shared_backend_is_reproducible():
+    with VectorEnv(7, backend='shared', workers=3) as env:
+        first = run(env)
+        assert_same(run(env), first)
+    with VectorEnv(7, backend='shared', workers=3) as env:
+        assert_same(run(env), first)
+
+
+def test_worker_attach_failure_closes_pipe():
+    parent, child = multiprocessing.Pipe()
+    layout = _layout(2, 4, 'exponent', 16, np.uint8)
+    with pytest.raises(FileNotFoundError):
+        _worker(child, 'game2048-missing-segment', layout, 4, 'exponent', 16, 0, 2)
+    assert child.closed
+    parent.close()
+
+
+def test_rejects_unknown_options():
+    with pytest.raises(ValueError):
+        VectorEnv(2, observation='pixels')
+    with pytest.raises(ValueError):
+        VectorEnv(2, backend='threads')
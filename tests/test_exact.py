@@ -0,0 +1,124 @@
+from functools import lru_cache
+
+import pytest
+
+from game2048.board import GameBoard
+from game2048.exact import ExactTable, solve, write_table
+
+
+def merge(board, direction):
+    """不依赖引擎的2x2移动：返回 (移动后的棋盘, 得分)"""
+    # 每个方向上的两行，从移动方向一侧开始
+    lines = {0: ((0, 2), (1, 3)), 1: ((1, 0), (3, 2)), 2: ((2, 0), (3, 1)), 3: ((0, 1), (2, 3))}[direction]
+    result = list(board)
+    gain = 0
+    for first, second in lines:
+        tiles = [v for v in (board[first], board[second]) if v]
+        if len(tiles) == 2 and tiles[0] == tiles[1]:
+            tiles = [tiles[0] * 2]
+            gain += tiles[0]
+        tiles += [0] * (2 - len(tiles))
+        result[first], result[second] = tiles
+    return tuple(result), gain
+
+
+def spawns(board):
+    cells = [k for k in range(4) if not board[k]]
+    for k in cells:
+        for value, p in ((2, 0.9), (4, 0.1)):
+            out = list(board)
+            out[k] = value
+            yield p / len(cells), tuple(out)
+
+
+@lru_cache(maxsize=None)
+def brute_value(board):
+    """直接递归的最优期望得分"""
+    best = 0.0
+    for direction in range(4):
+        after, gain = merge(board, direction)
+        if after == board:
+            continue
+        best = max(best, gain + sum(p * brute_value(s) for p, s in spawns(after)))
+    return best
+
+
+def brute_initial():
+    return sum(p * q * brute_value(second)
+               for p, first in spawns((0, 0, 0, 0)) for q, second in spawns(first))
+
+
+def reachable():
+    seen = set()
+    stack = [s for _, first in spawns((0, 0, 0, 0)) for _, s in spawns(first)]
+    while stack:
+        board = stack.pop()
+        if board in seen:
+            continue
+        seen.add(board)
+        for direction in range(4):
+            after, _ = merge(board, direction)
+            if after != board:
+                stack.extend(s for _, s in spawns(after))
+    return seen
+
+
+def test_merge_reference_matches_game_board():
+    for board in reachable():
+        for direction in range(4):
+            game = GameBoard(2, seed=0)
+            game.board = [list(board[:2]), list(board[2:])]
+            after, gain = merge(board, direction)
+            moved = after != board
+            diff = game.move(direction)
+            assert diff.moved == moved
+            if moved:
+                assert diff.score_gain == gain
+                i, j, _ = diff.new_tile
+                game.board[i][j] = 0  # 去掉新方块，剩下的是移动后的局面
+                assert tuple(game.board[0] + game.board[1]) == after
+
+
+def test_solve_2x2_matches_brute_force():
+    result = solve(2)
+    assert result['initial_value'] == pytest.approx(brute_initial(), rel=1e-12)
+    assert result['max_sum'] is None
+
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    path = tmp_path_factory.mktemp('exact') / 'exact2.tbl'
+    write_table(str(path), solve(2))
+    with ExactTable(str(path)) as table:
+        yield table
+
+
+def test_table_values_match_brute_force(table):
+    assert table.initial_value == pytest.approx(brute_initial(), rel=1e-12)
+    for board in reachable():
+        grid = [list(board[:2]), list(board[2:])]
+        assert table.value(grid) == pytest.approx(brute_value(board), rel=1e-9, abs=1e-12)
+        q = table.q_values(grid)
+        expected = {d: merge(board, d)[1] + sum(p * brute_value(s) for p, s in spawns(merge(board, d)[0]))
+                    for d in range(4) if merge(board, d)[0] != board}
+        assert q.keys() == expected.keys()
+        for d in q:
+            assert q[d] == pytest.approx(expected[d], rel=1e-9, abs=1e-12)
+        best = table.best_move(grid)
+        if expected:
+            assert q[best] == pytest.approx(max(expected.values()), rel=1e-9)
+            assert table.regret(grid, best) == pytest.approx(0.0, abs=1e-9)
+        else:
+            assert best is None
+
+
+def test_table_rejects_wrong_size(table):
+    with pytest.raises(ValueError):
+        table.value([[0] * 3] * 3)
+
+
+def test_score_policy_optimal_has_no_regret(table):
+    stats = table.score_policy(table.best_move, games=20, seed=1)
+    assert stats['games'] == 20
+    assert stats['mean_regret'] == pytest.approx(0.0, abs=1e-9)
+    assert stats['optimal_move_rate'] == 1.0
@@ -0,0 +1,160 @@
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from game2048 import hints
+from game2048.hints import HintService
+from game2048.symmetry import canonical_board
+
+BOARD = [[2, 2, 0, 0], [0, 4, 0, 0], [0, 0, 0, 0], [0, 0, 0, 8]]
+
+
+class Results:
+    """收集回调结果，等待后台线程调用"""
+
+    def __init__(self):
+        self.calls = []
+        self.event = threading.Event()
+
+    def __call__(self, key, direction, error=None):
+        self.calls.append((key, direction, error))
+        self.event.set()
+
+    def wait(self, timeout=60):
+        assert self.event.wait(timeout)
+        return self.calls[-1]
+
+
+def test_recovers_from_broken_process_pool():
+    service = HintService(time_budget=0.01, max_depth=1)
+    try:
+        # 工作进程意外退出后进程池损坏，之后的 submit 会抛出 BrokenProcessPool
+        broken = service._get_executor()
+        with pytest.raises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result(timeout=60)
+        results = Results()
+        key = service.request(BOARD, results)
+        assert service._executor is not broken
+        got_key, direction, error = results.wait()
+        assert got_key == key and error is None and direction in range(4)
+    finally:
+        service.shutdown()
+
+
+class AlwaysBroken:
+    def __init__(self):
+        self.shutdowns = 0
+
+    def submit(self, *args):
+        raise BrokenProcessPool('broken')
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns += 1
+
+
+def test_reports_error_when_retry_fails(monkeypatch):
+    service = HintService(use_processes=False)
+    executors = []
+
+    def get_executor():
+        if service._executor is None:
+            service._executor = AlwaysBroken()
+            executors.append(service._executor)
+        return service._executor
+
+    monkeypatch.setattr(service, '_get_executor', get_executor)
+    results = Results()
+    key = service.request(BOARD, results)
+    # 只重试一次
+    assert len(executors) == 2
+    assert all(executor.shutdowns == 1 for executor in executors)
+    assert service._executor is None
+    assert results.calls[0][:2] == (key, None)
+    assert isinstance(results.calls[0][2], BrokenProcessPool)
+
+
+def test_search_error_is_passed_to_callback(monkeypatch):
+    def failing_search(*args):
+        raise RuntimeError('search failed')
+
+    monkeypatch.setattr(hints, '_search', failing_search)
+    service = HintService(use_processes=False)
+    try:
+        results = Results()
+        key = service.request(BOARD, results)
+        got_key, direction, error = results.wait()
+        assert (got_key, direction) == (key, None)
+        assert isinstance(error, RuntimeError)
+        # 失败的结果不进入缓存
+        assert not service.cache
+    finally:
+        service.shutdown()
+
+
+def test_thread_search_and_cache():
+    service = HintService(time_budget=0.01, max_depth=1, use_processes=False)
+    try:
+        results = Results()
+        key = service.request(BOARD, results)
+        got_key, direction, error = results.wait()
+        assert got_key == key and error is None and direction in range(4)
+        # 同一局面再次请求时直接从缓存返回
+        cached = Results()
+        service.request(BOARD, cached)
+        assert cached.calls == [(key, direction, None)]
+    finally:
+        service.shutdown()
+
+
+def test_game_shows_hint_failure():
+    pytest.importorskip('kivy')
+    from game2048.ui import Game2048
+    game = Game2048()
+    try:
+        game.autoplay = True
+        game.show_hint()
+        assert game.hint_label.text == "思考中…"
+        game._apply_hint(game._hint_key, None, BrokenProcessPool('broken'), 0)
+        assert game.hint_label.text == "提示失败"
+        assert not game.autoplay and game._hint_key is None
+    finally:
+        game.hints.shutdown()
+
+
+def run_with_timeout(function, timeout=10):
+    """在单独线程中运行，死锁时测试失败而不是一直挂起"""
+    thread = threading.Thread(target=function, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "回调中再次调用服务时死锁"
+
+
+def test_cache_hit_callback_can_reenter():
+    service = HintService(use_processes=False)
+    service.cache[canonical_board(BOARD)[0]] = 3
+    calls = []
+
+    def callback(key, direction, error=None):
+        calls.append(direction)
+        if len(calls) == 1:
+            # 在回调中立即发出下一个请求（例如自动游戏时的连续提示）
+            service.request(BOARD, callback)
+        service.cancel()
+
+    run_with_timeout(lambda: service.request(BOARD, callback))
+    assert len(calls) == 2 and calls[0] == calls[1] is not None
+
+
+def test_failure_callback_can_reenter(monkeypatch):
+    service = HintService(use_processes=False)
+    monkeypatch.setattr(service, '_get_executor', AlwaysBroken)
+    errors = []
+
+    def callback(key, direction, error=None):
+        errors.append(error)
+        service.cancel()
+
+    run_with_timeout(lambda: service.request(BOARD, callback))
+    assert len(errors) == 1 and isinstance(errors[0], BrokenProcessPool)
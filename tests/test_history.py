@@ -0,0 +1,118 @@
+from game2048.board import GameBoard
+from game2048.history import History
+
+
+def board_with(value, size=4):
+    board = [[0] * size for _ in range(size)]
+    board[0][0] = value
+    return board
+
+
+def test_undo_and_redo_round_trip():
+    history = History(4, max_bytes=1 << 10)
+    for k in range(1, 5):
+        history.push(board_with(2 ** k), k)
+    assert history.undo() == (board_with(8), 3)
+    assert history.undo() == (board_with(4), 2)
+    assert history.redo() == (board_with(8), 3)
+    assert history.redo() == (board_with(16), 4)
+    assert history.redo() is None
+
+
+def test_undo_stops_at_capacity():
+    """缓冲区写满后覆盖最早的状态，最多只能撤销 capacity-1 步"""
+    history = History(4, max_bytes=3 * (8 + 16))
+    assert history.capacity == 3
+    for k in range(1, 8):
+        history.push(board_with(2 ** k), k)
+    assert len(history) == 3
+    assert history.undo() == (board_with(64), 6)
+    assert history.undo() == (board_with(32), 5)
+    assert history.undo() is None
+    assert not history.can_undo
+    # 重做回到最新的状态，之后不能再重做
+    assert history.redo() == (board_with(64), 6)
+    assert history.redo() == (board_with(128), 7)
+    assert history.redo() is None
+
+
+def test_capacity_is_at_least_two_states():
+    history = History(4, max_bytes=1)
+    assert history.capacity == 2
+    history.push(board_with(2), 0)
+    history.push(board_with(4), 4)
+    history.push(board_with(8), 12)
+    assert history.undo() == (board_with(4), 4)
+    assert history.undo() is None
+
+
+def test_new_push_discards_redo():
+    history = History(4)
+    for k in range(1, 5):
+        history.push(board_with(2 ** k), k)
+    history.undo()
+    history.undo()
+    history.push(board_with(1024), 99)
+    assert not history.can_redo
+    assert history.redo() is None
+    assert len(history) == 3
+    assert history.undo() == (board_with(4), 2)
+
+
+def test_wraparound_keeps_latest_states():
+    history = History(3, max_bytes=4 * (8 + 9))
+    for k in range(1, 12):
+        history.push(board_with(2 ** k, 3), k)
+    states = [history.get(i) for i in range(len(history))]
+    assert [score for _, score in states] == [8, 9, 10, 11]
+
+
+def test_game_board_undo_redo():
+    game = GameBoard(4, seed=5, history_bytes=1 << 12)
+    assert not game.undo()
+    snapshots = [([row[:] for row in game.board], game.score)]
+    for direction in (0, 3, 2, 1, 0, 3):
+        if game.move(direction).moved:
+            snapshots.append(([row[:] for row in game.board], game.score))
+    for board, score in reversed(snapshots[:-1]):
+        assert game.undo()
+        assert (game.board, game.score) == (board, score)
+    assert not game.undo()
+    assert game.redo()
+    assert (game.board, game.score) == snapshots[1]
+
+
+def test_game_board_move_after_undo_invalidates_redo():
+    game = GameBoard(4, seed=6, history_bytes=1 << 12)
+    game.move(game.legal_moves()[0])
+    game.move(game.legal_moves()[0])
+    assert game.undo()
+    assert game.move(game.legal_moves()[0]).moved
+    assert not game.redo()
+
+
+def test_game_board_undo_past_capacity():
+    capacity = 4
+    game = GameBoard(4, seed=7, history_bytes=capacity * (8 + 16))
+    moves = 0
+    while moves < 10 and not game.game_over:
+        if game.move(game.legal_moves()[0]).moved:
+            moves += 1
+    undone = 0
+    while game.undo():
+        undone += 1
+    assert undone == capacity - 1
+
+
+def test_restore_recomputes_game_over_and_keeps_won():
+    game = GameBoard(2, seed=0, history_bytes=1 << 10)
+    game.board = [[2, 0], [0, 0]]
+    game.history.clear()
+    game.history.push(game.board, 0)
+    game.board = [[2, 4], [4, 2]]
+    game.game_over = True
+    game.won = True
+    game.history.push(game.board, 0)
+    assert game.undo()
+    assert not game.game_over
+    assert game.won
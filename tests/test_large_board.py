@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from game2048.board import ArrayMoveDiff, GameBoard
+
+
+def vectorized_board(monkeypatch, size, seed):
+    monkeypatch.setattr(GameBoard, 'VECTORIZE_MIN_SIZE', 2)
+    board = GameBoard(size, seed=seed)
+    monkeypatch.undo()
+    return board
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 5, 8, 12, 20])
+def test_vectorized_path_matches_per_cell_path(monkeypatch, size):
+    """强制走NumPy路径的棋盘与逐格路径逐步比较：棋盘、得分、新方块和 MoveDiff 内容都相同"""
+    fast = vectorized_board(monkeypatch, size, seed=size)
+    slow = GameBoard(size, seed=size)
+    assert fast._vectorized and not slow._vectorized
+    rng = random.Random(size)
+    for _ in range(400):
+        if slow.game_over:
+            break
+        direction = rng.randrange(4)
+        a = fast.move(direction)
+        b = slow.move(direction)
+        assert a.moved == b.moved
+        assert a.score_gain == b.score_gain
+        assert a.new_tile == b.new_tile
+        assert sorted(a.slides) == sorted(b.slides)
+        assert sorted(a.merges) == sorted(b.merges)
+        assert a.changed_cells() == b.changed_cells()
+        assert fast.board == slow.board
+        assert fast.score == slow.score
+        assert fast._empty == slow._empty
+        assert fast.game_over == slow.game_over
+        if a.moved:
+            assert isinstance(a, ArrayMoveDiff)
+
+
+def test_default_threshold_uses_vectorized_path_for_large_boards():
+    assert GameBoard(GameBoard.VECTORIZE_MIN_SIZE)._vectorized
+    assert not GameBoard(GameBoard.VECTORIZE_MIN_SIZE - 1)._vectorized
+
+
+def test_large_board_keeps_row_objects():
+    """NumPy路径只改写发生变化的行，棋盘仍是原来的列表对象"""
+    game = GameBoard(64, seed=1)
+    rows = list(game.board)
+    game.move(game.legal_moves()[0])
+    assert all(a is b for a, b in zip(rows, game.board))
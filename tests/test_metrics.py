@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+
+import pytest
+
+from game2048 import metrics
+from game2048.board import GameBoard
+
+
+@pytest.fixture(autouse=True)
+def disabled():
+    metrics.disable()
+    yield
+    metrics.disable()
+
+
+@pytest.mark.parametrize('value', ['', '0', 'false', 'False', 'no', 'OFF', ' 0 '])
+def test_flag_off_values(value):
+    original = GameBoard.__dict__['move']
+    assert metrics.enable_from_env({metrics.ENV_ENABLE: value}) is None
+    assert metrics.current() is None
+    assert GameBoard.__dict__['move'] is original
+
+
+@pytest.mark.parametrize('value', ['1', 'true', 'yes', 'on', 'ON'])
+def test_flag_on_values(value):
+    instrumentation = metrics.enable_from_env({metrics.ENV_ENABLE: value})
+    assert instrumentation is not None and metrics.current() is instrumentation
+
+
+def test_output_and_profile_enable_unless_explicitly_off():
+    assert metrics.enable_from_env({}) is None
+    assert metrics.enable_from_env({metrics.ENV_OUTPUT: 'm.json'}) is not None
+    metrics.disable()
+    assert metrics.enable_from_env({metrics.ENV_ENABLE: '', metrics.ENV_OUTPUT: 'm.json'}) is not None
+    metrics.disable()
+    assert metrics.enable_from_env({metrics.ENV_ENABLE: '0', metrics.ENV_OUTPUT: 'm.json'}) is None
+    assert metrics.enable_from_env({metrics.ENV_ENABLE: 'off', metrics.ENV_PROFILE: '1:2'}) is None
+
+
+def test_disabled_patches_nothing():
+    methods = dict(GameBoard.__dict__)
+    game = GameBoard(seed=1)
+    for direction in (0, 1, 2, 3):
+        game.move(direction)
+    assert dict(GameBoard.__dict__) == methods
+    assert not hasattr(GameBoard.move, '__wrapped__')
+
+
+def test_enable_and_disable_restore_methods():
+    original = GameBoard.__dict__['move']
+    metrics.enable()
+    assert GameBoard.move.__wrapped__ is original
+    metrics.disable()
+    assert GameBoard.__dict__['move'] is original
+
+
+def play(moves):
+    game = GameBoard(seed=3)
+    for k in range(moves):
+        game.move(k % 4)
+
+
+def test_export_json(tmp_path):
+    instrumentation = metrics.enable()
+    instrumentation.count('frames', 3)
+    instrumentation.histogram('frame_time').add(0.01)
+    instrumentation.gauges['answer'] = lambda: 42
+    play(20)
+    path = str(tmp_path / 'metrics.json')
+    instrumentation.export(path)
+    with open(path) as f:
+        data = json.load(f)
+    timers = data['timers']
+    assert timers['GameBoard.move']['count'] == 20
+    assert sum(timers['GameBoard.move[%s]' % name]['count']
+               for name in ('up', 'right', 'down', 'left')) == 20
+    assert data['counters'] == {'frames': 3}
+    assert data['histograms']['frame_time']['<=16.7ms'] == 1
+    assert data['gauges'] == {'answer': 42}
+
+
+def test_export_csv_matches_snapshot(tmp_path):
+    instrumentation = metrics.enable()
+    instrumentation.count('frames', 2)
+    play(10)
+    path = str(tmp_path / 'metrics.CSV')
+    instrumentation.export(path)
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['kind', 'name', 'field', 'value']
+    table = {(kind, name, field): value for kind, name, field, value in rows[1:]}
+    assert table[('timer', 'GameBoard.move', 'count')] == '10'
+    assert table[('counter', 'frames', 'count')] == '2'
+    assert ('uptime', '', 's') in table
+
+
+def test_profile_window_writes_stats(tmp_path):
+    path = str(tmp_path / 'run.prof')
+    instrumentation = metrics.enable_from_env({metrics.ENV_PROFILE: '0:60', metrics.ENV_PROFILE_OUTPUT: path})
+    instrumentation.poll()
+    assert instrumentation.profiling
+    play(5)
+    instrumentation.stop_profile()
+    assert not instrumentation.profiling and os.path.getsize(path) > 0
+
+
+def test_latency_percentiles():
+    recorder = metrics.LatencyRecorder(max_samples=100)
+    for ms in range(1, 201):
+        recorder.add(ms / 1e3)
+    assert recorder.count == 200
+    # 只保留最近100个样本（101..200ms）
+    assert recorder.percentiles((50, 99)) == {50: 0.150, 99: 0.199}
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from game2048.bitboard import BitBoard, symmetries
+from game2048.ntuple import SMALL_PATTERNS, NTupleNetwork, TDTrainer, _feature_functions
+
+# 包含不连续、未排序的元组，覆盖拆段的各种情况
+PATTERNS = SMALL_PATTERNS + ((0, 5, 10, 15), (3, 2, 1), (6, 7, 9, 12, 13))
+
+
+def reference_features(state, patterns):
+    """逐格取出指数拼成下标：元组的格子按编号排序，第k个格子占下标的第k个4位"""
+    indexes = []
+    for s in symmetries(state):
+        offset = 0
+        for pattern in patterns:
+            index = 0
+            for k, cell in enumerate(sorted(pattern)):
+                index |= ((s >> (4 * cell)) & 0xF) << (4 * k)
+            indexes.append(offset + index)
+            offset += 16 ** len(pattern)
+    return indexes
+
+
+def random_states(count, seed=0):
+    rng = random.Random(seed)
+    return [sum(rng.randrange(16) << (4 * k) for k in range(16)) for _ in range(count)]
+
+
+@pytest.fixture
+def network(tmp_path):
+    with NTupleNetwork.create(str(tmp_path / 'weights.ntw'), SMALL_PATTERNS) as network:
+        yield network
+
+
+def test_generated_functions_match_reference():
+    features, value, size = _feature_functions(PATTERNS)
+    assert size == sum(16 ** len(pattern) for pattern in PATTERNS)
+    rng = random.Random(1)
+    weights = [rng.random() for _ in range(size)]
+    for state in random_states(200) + [0, (1 << 64) - 1]:
+        expected = reference_features(state, PATTERNS)
+        assert features(state) == expected
+        assert all(0 <= index < size for index in expected)
+        assert value(state, weights) == pytest.approx(sum(weights[index] for index in expected))
+
+
+def test_evaluate_accepts_board_forms(network):
+    board = BitBoard(seed=3)
+    for index in network.features(board.state):
+        network.weights[index] += 0.5
+    expected = network.evaluate(board.state)
+    assert expected > 0
+    assert network.evaluate(board) == network.evaluate(board.board) == expected
+
+
+@pytest.mark.parametrize('target', [100.0, -100.0])
+def test_td_update_moves_value_toward_target(network, target):
+    state = random_states(1, seed=2)[0]
+    before = network.evaluate(state)
+    error = network.update(state, target, alpha=0.1)
+    assert error == pytest.approx(target - before)
+    after = network.evaluate(state)
+    assert (after - before) * error > 0
+    assert abs(target - after) < abs(target - before)
+    assert network.update(state, target, alpha=0.1) == pytest.approx(target - after)
+
+
+def test_training_changes_weights(network):
+    result = TDTrainer(network, alpha=0.1, seed=4).play_game()
+    assert result['game'] == 1 and result['moves'] > 0
+    assert any(bytes(network.weights.cast('B')))
+
+
+def test_saved_weights_load_back_bit_for_bit(tmp_path):
+    path = str(tmp_path / 'weights.ntw')
+    with NTupleNetwork.create(path, PATTERNS) as network:
+        TDTrainer(network, alpha=0.1, seed=5).train(3)
+        network.update(random_states(1, seed=6)[0], 1e-7, alpha=0.3)
+        network.flush()
+        saved = bytes(network.weights.cast('B'))
+        values = [network.evaluate(state) for state in random_states(20, seed=7)]
+    assert any(saved)
+    with NTupleNetwork(path) as loaded:
+        assert loaded.patterns == PATTERNS
+        assert bytes(loaded.weights.cast('B')) == saved
+        assert [loaded.evaluate(state) for state in random_states(20, seed=7)] == values
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'weights.ntw'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        NTupleNetwork(str(path))
@@ -0,0 +1,66 @@
+import random
+
+from game2048.bitboard import execute_move, pack_board
+from game2048.board import GameBoard
+from game2048.policies import greedy_move
+
+
+def reference_greedy(board):
+    """逐个方向在 GameBoard 副本上真正移动一次"""
+    size = len(board)
+    best = None
+    best_gain = -1
+    for direction in range(4):
+        game = GameBoard(size, seed=0)
+        game.board = [row[:] for row in board]
+        diff = game.move(direction)
+        if diff.moved and diff.score_gain > best_gain:
+            best = direction
+            best_gain = diff.score_gain
+    return best
+
+
+def bitboard_greedy(board):
+    """用位棋盘引擎算出的贪心方向"""
+    state = pack_board(board)
+    best = None
+    best_gain = -1
+    for direction in range(4):
+        new_state, gain = execute_move(state, direction)
+        if new_state != state and gain > best_gain:
+            best = direction
+            best_gain = gain
+    return best
+
+
+def test_greedy_move_matches_bitboard_greedy():
+    rng = random.Random(1)
+    for _ in range(300):
+        board = [[rng.choice((0, 0, 2, 2, 4, 8, 16)) for _ in range(4)] for _ in range(4)]
+        assert greedy_move(board) == bitboard_greedy(board)
+
+
+def test_greedy_move_matches_game_board_on_any_size():
+    rng = random.Random(2)
+    for size in (2, 3, 5, 8):
+        for _ in range(100):
+            board = [[rng.choice((0, 0, 2, 2, 4, 8)) for _ in range(size)] for _ in range(size)]
+            assert greedy_move(board) == reference_greedy(board)
+
+
+def test_greedy_move_accepts_game_board():
+    game = GameBoard(5, seed=5)
+    board = [row[:] for row in game.board]
+    assert greedy_move(game) == greedy_move(board)
+    assert game.board == board  # 不修改传入的棋盘
+
+
+def test_greedy_move_no_valid_move():
+    assert greedy_move([[2, 4], [4, 2]]) is None
+
+
+def test_merge_line():
+    assert GameBoard.merge_line([2, 2, 2, 2]) == ([4, 4, 0, 0], 8)
+    assert GameBoard.merge_line([0, 4, 4, 8]) == ([8, 8, 0, 0], 8)
+    assert GameBoard.merge_line([2, 0, 2, 4, 4]) == ([4, 8, 0, 0, 0], 12)
+    assert GameBoard.merge_line([2, 4, 8]) == ([2, 4, 8], 0)
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from game2048.board import GameBoard
+from game2048.replay import HEADER, ReplayReader, ReplayWriter, decode_record, encode_record
+
+
+def record_game(path, seed, moves, checkpoint_interval=8, size=4):
+    """进行一局并录像，返回每一步之后的 (棋盘, 分数)（第0项为开局）"""
+    game = GameBoard(size, seed=seed)
+    states = [([row[:] for row in game.board], game.score)]
+    with ReplayWriter(path, game.board, seed, checkpoint_interval=checkpoint_interval,
+                      buffer_size=64) as writer:
+        step = 0
+        while len(states) <= moves and not game.game_over:
+            direction = step % 4
+            step += 1
+            diff = game.move(direction)
+            if diff.moved:
+                writer.record(direction, diff.new_tile, game)
+                states.append(([row[:] for row in game.board], game.score))
+    return states
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'game.rpl')
+    states = record_game(path, seed=1, moves=100)
+    with ReplayReader(path) as replay:
+        assert replay.seed == 1 and replay.size == 4 and replay.checkpoint_interval == 8
+        assert len(replay) == len(states) - 1
+        final = replay.board_at(len(replay))
+        assert (final.board, final.score) == states[-1]
+
+
+@pytest.mark.parametrize('interval', [1, 3, 8, 1000])
+def test_seek_matches_linear_replay(tmp_path, interval):
+    path = str(tmp_path / 'game.rpl')
+    states = record_game(path, seed=2, moves=60, checkpoint_interval=interval, size=5)
+    with ReplayReader(path) as replay:
+        # 从开局逐步重放
+        score, board = replay.checkpoint(0)
+        game = GameBoard(5, seed=0)
+        game.board = board
+        game.score = score
+        linear = [([row[:] for row in game.board], game.score)]
+        for direction, spawn in replay.records():
+            game.move(direction, spawn)
+            linear.append(([row[:] for row in game.board], game.score))
+        assert linear == states
+        for index in range(len(replay) + 1):
+            seek = replay.board_at(index)
+            assert (seek.board, seek.score) == states[index]
+        with pytest.raises(IndexError):
+            replay.board_at(len(replay) + 1)
+
+
+def test_record_encoding_round_trip():
+    for size in (2, 4, 64):
+        for direction in range(4):
+            for spawn in (None, (0, 0, 2), (size - 1, size - 1, 4), (1, 0, 2)):
+                assert decode_record(encode_record(direction, spawn, size), size) == (direction, spawn)
+
+
+def test_empty_and_bad_files(tmp_path):
+    empty = tmp_path / 'empty.rpl'
+    empty.write_bytes(b'')
+    with pytest.raises(ValueError):
+        ReplayReader(str(empty))
+    bad = tmp_path / 'bad.rpl'
+    bad.write_bytes(b'not a replay file at all')
+    with pytest.raises(ValueError):
+        ReplayReader(str(bad))
+    # 只有文件头、没有开局棋盘
+    path = str(tmp_path / 'game.rpl')
+    record_game(path, seed=3, moves=5)
+    header_only = tmp_path / 'header.rpl'
+    with open(path, 'rb') as f:
+        header_only.write_bytes(f.read(HEADER.size + 3))
+    with pytest.raises(ValueError):
+        ReplayReader(str(header_only))
+
+
+def test_truncated_file(tmp_path):
+    path = str(tmp_path / 'game.rpl')
+    states = record_game(path, seed=4, moves=40, checkpoint_interval=8)
+    with open(path, 'rb') as f:
+        data = f.read()
+    checkpoint_size = 8 + 16
+    block_size = checkpoint_size + 8 * 2
+    # 在每个可能的位置截断：读到的步数只包括完整的记录，每一步都能重建
+    for length in range(HEADER.size + checkpoint_size, len(data) + 1):
+        truncated = tmp_path / 'cut.rpl'
+        truncated.write_bytes(data[:length])
+        with ReplayReader(str(truncated)) as replay:
+            blocks, rest = divmod(length - HEADER.size, block_size)
+            expected = blocks * 8 + max(0, rest - checkpoint_size) // 2
+            assert len(replay) == expected
+            for index in (0, len(replay) // 2, len(replay)):
+                seek = replay.board_at(index)
+                assert (seek.board, seek.score) == states[index]
+
+
+@pytest.mark.parametrize('interval', [0, -1, 1 << 16])
+def test_invalid_checkpoint_interval(tmp_path, interval):
+    path = str(tmp_path / 'game.rpl')
+    with pytest.raises(ValueError):
+        ReplayWriter(path, [[0] * 4] * 4, checkpoint_interval=interval)
+    assert not os.path.exists(path)
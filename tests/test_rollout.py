@@ -0,0 +1,57 @@
+import pytest
+
+from game2048.bitboard import BitBoard
+from game2048.rollout import MonteCarloPolicy, _rollout_task, task_seed
+
+BOARD = [[2, 4, 8, 16],
+         [4, 8, 16, 32],
+         [2, 0, 4, 0],
+         [0, 0, 2, 0]]
+
+
+def play(workers, decisions=4):
+    """同一种子下连续做几次决策，记录方向和随机步数"""
+    board = BitBoard(seed=7)
+    board.board = BOARD
+    trace = []
+    with MonteCarloPolicy(rollouts=10, workers=workers, seed=3, chunk_size=3) as policy:
+        for _ in range(decisions):
+            direction = policy.best_move(board)
+            if direction is None:
+                break
+            board.move(direction)
+            trace.append((direction, policy.rollout_moves))
+        assert policy.rollouts_done == policy.stats()['rollouts'] > 0
+    return trace, board.board
+
+
+def test_same_results_across_worker_counts():
+    expected = play(workers=1)
+    assert expected[0]
+    assert play(workers=2) == expected
+    assert play(workers=3) == expected
+
+
+def test_task_seeds_do_not_overlap():
+    seeds = {task_seed(1, decision, direction, chunk)
+             for decision in range(3) for direction in range(4) for chunk in range(5)}
+    assert len(seeds) == 3 * 4 * 5
+    assert task_seed(1, 0, 0, 0) != task_seed(2, 0, 0, 0)
+
+
+def test_rollout_task_is_deterministic():
+    task = (BitBoard(seed=1).state, 5, task_seed(0, 0, 0, 0))
+    assert _rollout_task(task) == _rollout_task(task)
+
+
+@pytest.mark.parametrize('kwargs', [{'rollouts': 0}, {'rollouts': -1}, {'chunk_size': 0}])
+def test_rejects_empty_rollouts(kwargs):
+    with pytest.raises(ValueError):
+        MonteCarloPolicy(**kwargs)
+
+
+def test_no_moves_returns_none():
+    stuck = [[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]]
+    policy = MonteCarloPolicy(rollouts=1)
+    assert policy.best_move(stuck) is None
+    assert policy.rollouts_done == 0
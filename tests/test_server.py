@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from game2048.server import MAX_ID, MIN_ID, GameServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = GameServer(str(tmp_path / 'sessions.sqlite'))
+    yield server
+    server.close()
+
+
+@pytest.mark.parametrize('session_id', [MAX_ID + 1, MIN_ID - 1, 1 << 100, '7', 7.0, True, [7], None])
+def test_invalid_session_id_with_evict_db(server, session_id):
+    for op in ('get', 'move', 'close'):
+        response = server.handle({'op': op, 'id': session_id, 'dir': 0})
+        assert 'error' in response
+
+
+def test_session_ids_at_range_limits(server):
+    for session_id in (MAX_ID, MIN_ID):
+        assert 'error' in server.handle({'op': 'get', 'id': session_id})
+    # 有效编号的会话换出后仍能载入
+    session = server.handle({'op': 'new', 'seed': 1})
+    assert server.evict_idle(float('inf')) == 1
+    assert server.handle({'op': 'get', 'id': session['id']}) == session
+
+
+@pytest.mark.parametrize('direction', [True, False, 1.0, 0.0, '1', None, [1], -1, 4])
+def test_invalid_direction(server, direction):
+    session = server.handle({'op': 'new', 'seed': 2})
+    response = server.handle({'op': 'move', 'id': session['id'], 'dir': direction})
+    assert 'error' in response
+    # 会话不受影响
+    assert server.handle({'op': 'get', 'id': session['id']}) == session
+
+
+def test_json_true_is_not_a_direction(server):
+    session = server.handle({'op': 'new', 'seed': 2})
+    request = json.loads('{"op": "move", "id": %d, "dir": true}' % session['id'])
+    assert 'error' in server.handle(request)
+    assert 'error' not in server.handle(dict(request, dir=1))
+
+
+def run_client(server, lines):
+    """连接服务器，发送 lines（字节串）后关闭写端，返回收到的每行响应"""
+    async def main():
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+        for line in lines:
+            writer.write(line)
+            await writer.drain()
+        writer.write_eof()
+        responses = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            responses.append(json.loads(line))
+        writer.close()
+        await server.stop()
+        return responses
+    return asyncio.run(main())
+
+
+def test_connection_survives_bad_lines(server):
+    new = json.dumps({'op': 'new', 'seed': 1}).encode() + b'\n'
+    responses = run_client(server, [
+        b'x' * 200000 + b'\n',                                # 超过缓冲区上限的行
+        new,
+        b'{"op": "get", "id": 1' + b' ' * 150000,            # 超长的行分几次到达
+        b' ' * 150000 + b'}\n',
+        b'\xff\xfe\n',                                        # 不是UTF-8
+        json.dumps({'op': 'get', 'id': 1 << 64}).encode() + b'\n',
+        b'[' * 50000 + b'\n',                                  # 嵌套过深
+        json.dumps({'op': 'get', 'id': 1}).encode(),          # 最后一行没有换行符
+    ])
+    # 分两次发送的超长行只算一行
+    assert len(responses) == 7
+    assert responses[0] == {'error': "请求过长"}
+    assert responses[1]['id'] == 1
+    assert responses[2] == {'error': "请求过长"}
+    assert all('error' in response for response in responses[3:6])
+    assert responses[6] == responses[1]
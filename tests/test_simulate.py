@@ -0,0 +1,86 @@
+import json
+import random
+
+import pytest
+
+from game2048.board import GameBoard
+from game2048.policies import greedy_move
+
+from game2048.replay import ReplayReader
+from game2048.simulate import game_seed, main, make_policy, play_game, policy_seed
+from game2048.store import ResultsStore
+
+
+def stream(seed, n=20):
+    rng = random.Random(seed)
+    return [rng.random() for _ in range(n)]
+
+
+def test_policy_and_spawn_streams_differ_between_neighbouring_seeds():
+    seeds = [game_seed(1, index) for index in range(50)] + list(range(-5, 50))
+    spawn = {seed: stream(seed) for seed in seeds}
+    policy = {seed: stream(policy_seed(seed)) for seed in seeds}
+    for seed in seeds:
+        assert policy[seed] != spawn[seed]
+        for other in (seed - 1, seed + 1):
+            # 旧实现用 ~seed 作为策略种子，与第 -(seed + 1) 局的棋盘随机数流相同
+            assert policy[seed] != stream(other)
+            assert policy[seed] != stream(~other)
+            assert policy[seed] != stream(policy_seed(other))
+
+
+def test_random_policy_is_reproducible():
+    results = [play_game((0, game_seed(3, 7), 'random', 2, None)) for _ in range(2)]
+    for result in results:
+        del result['time']
+    assert results[0] == results[1]
+
+
+def test_neighbouring_games_differ():
+    scores = {play_game((index, game_seed(3, index), 'random', 2, None))['score']
+              for index in range(10)}
+    assert len(scores) > 1
+
+
+def test_make_policy_unknown_name():
+    with pytest.raises(ValueError):
+        make_policy('nope')
+
+
+@pytest.mark.parametrize('seed', [0, 1, -1, 2 ** 31, 2 ** 40, 2 ** 64 + 3])
+def test_game_seed_fits_signed_64_bits(seed):
+    seeds = [game_seed(seed, index) for index in range(1000)]
+    assert all(0 <= s < 2 ** 63 for s in seeds)
+    assert len(set(seeds)) == len(seeds)
+
+
+def test_large_seed_through_replay_and_db(tmp_path, capsys):
+    replay_dir = tmp_path / 'replays'
+    db = tmp_path / 'results.sqlite'
+    output = tmp_path / 'results.jsonl'
+    main(['--games', '3', '--workers', '1', '--policy', 'greedy', '--seed', str(2 ** 40),
+          '--replay-dir', str(replay_dir), '--db', str(db), '--output', str(output)])
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [result['seed'] for result in results] == [game_seed(2 ** 40, i) for i in range(3)]
+    with ResultsStore(str(db)) as store:
+        assert len(store) == 3
+        assert store.summary('greedy')['games'] == 3
+    for result in results:
+        with ReplayReader(str(replay_dir / ('game_%08d.rpl' % result['game']))) as replay:
+            assert replay.seed == result['seed']
+            assert len(replay) == result['moves']
+            assert replay.board_at(len(replay)).score == result['score']
+
+
+def test_play_game_replays_on_game_board():
+    """同一种子的棋盘按记录的方向重放得到同一局"""
+    seed = game_seed(5, 0)
+    result = play_game((0, seed, 'greedy', 2, None))
+    board = GameBoard(seed=seed)
+    moves = 0
+    while not board.game_over:
+        direction = greedy_move(board)
+        if direction is None:
+            break
+        moves += board.move(direction).moved
+    assert (board.score, moves) == (result['score'], result['moves'])
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+from game2048.bitboard import BitBoard, pack_board
+from game2048.board import GameBoard
+from game2048.solver import ExpectimaxSolver, evaluate, to_state
+
+BOARD = [[2, 4, 8, 16],
+         [4, 8, 16, 32],
+         [0, 2, 4, 0],
+         [0, 0, 2, 0]]
+
+STUCK = [[2, 4, 2, 4],
+         [4, 2, 4, 2],
+         [2, 4, 2, 4],
+         [4, 2, 4, 2]]
+
+
+def searching(solver):
+    """直接调用内部节点函数前，准备好 best_move 会设置的搜索状态"""
+    solver._deadline = float('inf')
+    solver._check_countdown = solver.TIME_CHECK_INTERVAL
+    solver._must_finish = True
+    return solver
+
+
+def states(count):
+    """互不相同、各有空格的压缩棋盘"""
+    return [pack_board([[2 << (k % 10), 0, 0, 0], [0, 4, 0, 0], [0, 0, 0, 0], [0, 0, 0, 2 << (k // 10)]])
+            for k in range(count)]
+
+
+def test_cache_size_limit():
+    solver = ExpectimaxSolver(time_budget=10, max_depth=3, cache_size=16)
+    solver.best_move(BOARD)
+    assert solver.depth_reached == 3
+    assert 0 < len(solver.cache) <= 16
+
+
+def test_cache_evicts_least_recently_used():
+    solver = searching(ExpectimaxSolver(cache_size=2))
+    a, b, c = states(3)
+    solver._chance_node(a, 1, 1.0)
+    solver._chance_node(b, 1, 1.0)
+    solver._chance_node(a, 1, 1.0)  # 命中，a 变成最近使用
+    assert solver.cache_hits == 1
+    solver._chance_node(c, 1, 1.0)
+    assert list(solver.cache) == [a, c]
+
+
+def test_cache_reused_only_at_equal_or_greater_depth():
+    solver = searching(ExpectimaxSolver())
+    state = states(1)[0]
+    solver.cache[state] = (1, 123.0)
+    assert solver._chance_node(state, 1, 1.0) == 123.0
+    deeper = solver._chance_node(state, 2, 1.0)
+    assert deeper != 123.0
+    assert solver.cache[state] == (2, deeper)
+    # 更深的结果可以用于较浅的搜索
+    hits = solver.cache_hits
+    assert solver._chance_node(state, 1, 1.0) == deeper
+    assert solver.cache_hits == hits + 1
+
+
+def test_min_probability_cutoff():
+    state = states(1)[0]
+    cut = searching(ExpectimaxSolver(min_probability=1.5))
+    assert cut._chance_node(state, 3, 1.0) == evaluate(state)
+    assert cut.nodes == 1 and not cut.cache
+
+    full = searching(ExpectimaxSolver(min_probability=0.0))
+    partial = searching(ExpectimaxSolver(min_probability=0.01))
+    full._chance_node(state, 2, 1.0)
+    partial._chance_node(state, 2, 1.0)
+    assert partial.nodes < full.nodes
+
+
+def test_time_budget_respected():
+    solver = ExpectimaxSolver(time_budget=0.05, max_depth=20)
+    solver.best_move(BOARD)  # 预先构建启发式表
+    start = time.perf_counter()
+    assert solver.best_move(BOARD) is not None
+    assert time.perf_counter() - start < 0.5
+    assert 1 <= solver.depth_reached < 20
+
+
+def test_depth_one_always_finishes():
+    solver = ExpectimaxSolver(time_budget=0.0, max_depth=8)
+    direction = solver.best_move(BOARD)
+    assert solver.depth_reached == 1
+    assert direction == ExpectimaxSolver(time_budget=10, max_depth=1).best_move(BOARD)
+
+
+def test_no_moves_returns_none():
+    solver = ExpectimaxSolver()
+    assert solver.best_move(STUCK) is None
+    assert solver.depth_reached == 0
+
+
+def test_single_move_skips_search():
+    board = [[4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2], [0, 0, 0, 0]]
+    solver = ExpectimaxSolver()
+    assert solver.best_move(board) == 2
+    assert solver.nodes == 0
+
+
+def test_to_state_accepts_board_forms():
+    state = pack_board(BOARD)
+    game = GameBoard(4, seed=0)
+    game.board = [row[:] for row in BOARD]
+    bit = BitBoard(seed=0)
+    bit.board = BOARD
+    assert to_state(state) == state
+    assert to_state(BOARD) == state
+    assert to_state(game) == state
+    assert to_state(bit) == state
+
+
+@pytest.mark.parametrize('board', [
+    [[0] * 3 for _ in range(3)],
+    [[0] * 5 for _ in range(5)],
+    [[0] * 4 for _ in range(3)],
+    [[0] * 4, [0] * 4, [0] * 3, [0] * 4],
+])
+def test_to_state_rejects_non_4x4(board):
+    with pytest.raises(ValueError):
+        to_state(board)
+    game = GameBoard(len(board), seed=0)
+    if len(board) != 4:
+        with pytest.raises(ValueError):
+            to_state(game)
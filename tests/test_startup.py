@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, tmp_path, **env):
+    """在新进程中运行代码（sys.modules 是干净的），返回标准输出"""
+    environ = dict(os.environ)
+    environ['HOME'] = str(tmp_path)  # Kivy 的配置和用户数据目录放在临时目录
+    environ.update(env)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=environ,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+def test_import_main_does_not_load_kivy(tmp_path):
+    output = run_python(
+        "import sys, main\n"
+        "board = main.GameBoard(4, seed=1)\n"
+        "print(any(name == 'kivy' or name.startswith('kivy.') for name in sys.modules))\n"
+        "print('game2048.ui' in sys.modules)\n",
+        tmp_path)
+    assert output == ['False', 'False']
+
+
+def test_import_game_board_skips_tables(tmp_path):
+    output = run_python(
+        "import sys\n"
+        "from game2048 import GameBoard\n"
+        "GameBoard(4, seed=1).move(0)\n"
+        "print('game2048.bitboard' in sys.modules, 'game2048.solver' in sys.modules)\n",
+        tmp_path)
+    assert output == ['False', 'False']
+
+
+def test_package_lazy_exports():
+    import game2048
+    from game2048.bitboard import BitBoard
+    assert game2048.BitBoard is BitBoard
+    with pytest.raises(AttributeError):
+        game2048.NoSuchName
+
+
+def test_main_ui_names_resolve_to_ui_module():
+    pytest.importorskip('kivy')
+    import main
+    from game2048 import ui
+    for name in main._UI_NAMES:
+        assert getattr(main, name) is getattr(ui, name)
+    with pytest.raises(AttributeError):
+        main.NoSuchName
+
+
+def test_board_size_from_environment_after_lazy_import(tmp_path):
+    pytest.importorskip('kivy')
+    output = run_python(
+        "import main\n"
+        "game = main.Game2048()\n"
+        "print(game.board_size, len(game.game_board.board), game.board_widget.board_size)\n"
+        "game.hints.shutdown()\n",
+        tmp_path, GAME2048_BOARD_SIZE='5')
+    assert output == ['5', '5', '5']
+
+
+def test_board_resize_after_lazy_import():
+    pytest.importorskip('kivy')
+    import main
+    game = main.Game2048(board_size=6)
+    try:
+        assert game.board_size == 6 and game.game_board.size == 6
+        assert len(game.board_widget.bg_rects) == 36
+        game.move(0)
+        game._render()
+    finally:
+        game.hints.shutdown()
+    # 超过 TILES_MAX_SIZE 时逐格控件太慢，自动改用单画布棋盘
+    game = main.Game2048(renderer='tiles', board_size=main.Game2048.TILES_MAX_SIZE + 1)
+    try:
+        assert game.renderer == 'board'
+        assert game.board_widget.board_size == main.Game2048.TILES_MAX_SIZE + 1
+    finally:
+        game.hints.shutdown()
+
+
+def test_app_reports_time_to_first_frame(tmp_path):
+    pytest.importorskip('kivy')
+    output = run_python(
+        "from game2048.ui import Game2048App\n"
+        "from kivy.clock import Clock\n"
+        "app = Game2048App()\n"
+        "def check(dt):\n"
+        "    if app.game.time_to_first_frame is not None:\n"
+        "        print(app.game.time_to_first_frame)\n"
+        "        app.stop()\n"
+        "        return False\n"
+        "Clock.schedule_interval(check, 0)\n"
+        "app.run()\n",
+        tmp_path)
+    assert float(output[-1]) > 0
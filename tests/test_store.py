@@ -0,0 +1,129 @@
+import csv
+import random
+
+import pytest
+
+from game2048.store import COLUMNS, ResultsStore, read_columnar
+
+
+def results(count, seed=0, start=0):
+    """生成器形式的对局结果，与 simulate.play_game 的返回值字段相同"""
+    rng = random.Random(seed)
+    for game in range(start, start + count):
+        yield {'game': game, 'seed': rng.getrandbits(63), 'score': rng.randrange(100000),
+               'max_tile': 2 ** rng.randrange(4, 12), 'moves': rng.randrange(50, 2000),
+               'time': rng.random()}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    store.add_games(results(1000, seed=1), 'greedy', batch_size=128)
+    store.add_games(results(300, seed=2), 'random', batch_size=7)
+    yield store
+    store.close()
+
+
+def indexes(store):
+    return {name for (name,) in store.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_bulk_ingest(store):
+    assert len(store) == 1300
+    assert store.conn.execute('SELECT COUNT(*) FROM games').fetchone()[0] == 1300
+    assert store.policies() == ['greedy', 'random']
+    # 首次导入时推迟建索引，写完后索引要重建
+    assert {'games_policy_score', 'games_score'} <= indexes(store)
+    # 库不为空时直接写入，不删除索引
+    assert store.add_games(results(50, seed=3, start=1000), 'greedy', batch_size=16) == 50
+    assert len(store) == 1350
+    assert store.add_games(iter(()), 'greedy') == 0
+
+
+def test_tile_stats_match_group_by(store):
+    store.add_games(results(200, seed=4, start=1000), 'greedy')
+    stats = store.conn.execute(
+        'SELECT policy, max_tile, games, score_sum, moves_sum, max_score FROM tile_stats '
+        'ORDER BY policy, max_tile').fetchall()
+    direct = store.conn.execute(
+        'SELECT policy, max_tile, COUNT(*), SUM(score), SUM(moves), MAX(score) FROM games '
+        'GROUP BY policy, max_tile ORDER BY policy, max_tile').fetchall()
+    assert stats == direct
+
+    for policy in (None, 'greedy', 'random'):
+        where, params = store._where_policy(policy, 'g.policy')
+        rows = store.conn.execute(
+            'SELECT g.max_tile, COUNT(*) FROM games AS g%s GROUP BY g.max_tile ORDER BY g.max_tile'
+            % where, params).fetchall()
+        assert store.max_tile_distribution(policy) == rows
+    assert store.max_tile_distribution('missing') == []
+
+
+def test_summary_and_top_games(store):
+    scores = sorted(store.conn.execute('SELECT score FROM games').fetchall(), reverse=True)
+    top = store.top_games(5)
+    assert [row['score'] for row in top] == [score for (score,) in scores[:5]]
+    assert set(top[0]) == set(COLUMNS)
+    summary = store.summary('random')
+    games, total = store.conn.execute(
+        'SELECT COUNT(*), SUM(score) FROM games WHERE policy = ?', (store._policy_ids['random'],)).fetchone()
+    assert summary['games'] == games == 300
+    assert summary['mean_score'] == total / games
+    assert store.summary('missing') == {'games': 0, 'mean_score': None, 'max_score': None, 'mean_moves': None}
+
+
+def expected_rows(store, policy=None):
+    return [tuple(row) for row in store._select(policy)]
+
+
+@pytest.mark.parametrize('policy', [None, 'random'])
+def test_export_csv_round_trip(store, tmp_path, policy):
+    path = str(tmp_path / 'games.csv')
+    assert store.export_csv(path, policy, chunk_size=100) == len(expected_rows(store, policy))
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == COLUMNS
+    parsed = [(name, int(game), int(seed), int(score), int(max_tile), int(moves), float(elapsed))
+              for name, game, seed, score, max_tile, moves, elapsed in rows[1:]]
+    assert parsed == expected_rows(store, policy)
+
+
+@pytest.mark.parametrize('policy', [None, 'greedy'])
+def test_export_columnar_round_trip(store, tmp_path, policy):
+    path = str(tmp_path / 'games.col')
+    expected = expected_rows(store, policy)
+    assert store.export_columnar(path, policy, row_group_size=256) == len(expected)
+    groups = list(read_columnar(path))
+    assert [len(group['score']) for group in groups][:-1] == [256] * (len(groups) - 1)
+    rows = []
+    for group in groups:
+        rows.extend(zip(*(group[name] for name in COLUMNS)))
+    assert rows == expected
+
+    # 只读部分列
+    scores = [score for group in read_columnar(path, ['score']) for score in group['score']]
+    assert scores == [row[3] for row in expected]
+
+
+def test_read_columnar_rejects_other_files(tmp_path):
+    path = tmp_path / 'games.csv'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        list(read_columnar(str(path)))
+
+
+def test_reopen_existing_wal_db(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    with ResultsStore(path) as store:
+        store.add_games(results(100, seed=5), 'greedy')
+        distribution = store.max_tile_distribution()
+    with ResultsStore(path) as store:
+        assert store.conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert len(store) == 100
+        assert store.policies() == ['greedy']
+        assert store.max_tile_distribution() == distribution
+        # 重新打开后已有策略沿用原来的编号
+        store.add_games(results(10, seed=6, start=100), 'greedy')
+        store.add_games(results(10, seed=7), 'random')
+        assert store.conn.execute('SELECT COUNT(*) FROM policies').fetchone()[0] == 2
+        assert len(store) == 120
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from game2048.bitboard import execute_move, unpack_board
+from game2048.board import GameBoard
+from game2048.symmetry import (TRANSFORMS, canonical, canonical_board, canonical_key, dedupe,
+                               from_canonical_direction, to_canonical_direction, transform)
+
+
+def random_state(rng):
+    return sum(rng.choice((0, 0, 1, 1, 2, 3, 5)) << (4 * k) for k in range(16))
+
+
+def random_board(rng, size):
+    return [[rng.choice((0, 0, 2, 2, 4, 8, 32)) for _ in range(size)] for _ in range(size)]
+
+
+def transform_board(board, k):
+    """二维列表棋盘的第 k 个变换，顺序与 transform 相同：先转置，再左右翻转，再上下翻转"""
+    if k >= 4:
+        board = [list(column) for column in zip(*board)]
+    if k & 1:
+        board = [row[::-1] for row in board]
+    if k & 2:
+        board = board[::-1]
+    return [list(row) for row in board]
+
+
+def slide(board, direction):
+    """不添加新方块的移动，返回 (新棋盘, 得分)"""
+    board = [row[:] for row in board]
+    size = len(board)
+    gain = 0
+    for index in range(size):
+        if direction in (0, 2):
+            line = [board[i][index] for i in range(size)]
+        else:
+            line = board[index][:]
+        if direction in (1, 2):
+            line.reverse()
+        merged, line_gain = GameBoard.merge_line(line)
+        gain += line_gain
+        if direction in (1, 2):
+            merged.reverse()
+        for k, value in enumerate(merged):
+            if direction in (0, 2):
+                board[k][index] = value
+            else:
+                board[index][k] = value
+    return board, gain
+
+
+@pytest.mark.parametrize('k', range(TRANSFORMS))
+@pytest.mark.parametrize('direction', range(4))
+def test_direction_round_trip(k, direction):
+    assert from_canonical_direction(to_canonical_direction(direction, k), k) == direction
+    assert to_canonical_direction(from_canonical_direction(direction, k), k) == direction
+
+
+@pytest.mark.parametrize('k', range(TRANSFORMS))
+def test_transform_matches_list_transform(k):
+    rng = random.Random(k)
+    for _ in range(50):
+        state = random_state(rng)
+        assert unpack_board(transform(state, k)) == transform_board(unpack_board(state), k)
+
+
+@pytest.mark.parametrize('k', range(TRANSFORMS))
+def test_move_commutes_with_transform(k):
+    """移动变换后的棋盘 == 变换移动后的棋盘（方向按变换对应）"""
+    rng = random.Random(100 + k)
+    for _ in range(100):
+        state = random_state(rng)
+        for direction in range(4):
+            moved, gain = execute_move(state, direction)
+            image, image_gain = execute_move(transform(state, k), to_canonical_direction(direction, k))
+            assert image == transform(moved, k)
+            assert image_gain == gain
+
+
+@pytest.mark.parametrize('size', [2, 3, 5, 6])
+def test_move_commutes_with_transform_any_size(size):
+    rng = random.Random(size)
+    for _ in range(30):
+        board = random_board(rng, size)
+        for k in range(TRANSFORMS):
+            for direction in range(4):
+                moved, gain = slide(board, direction)
+                image, image_gain = slide(transform_board(board, k), to_canonical_direction(direction, k))
+                assert image == transform_board(moved, k)
+                assert image_gain == gain
+
+
+def test_canonical_is_shared_by_all_images():
+    rng = random.Random(1)
+    for _ in range(100):
+        state = random_state(rng)
+        key, k = canonical(state)
+        assert transform(state, k) == key == canonical_key(state)
+        for image in range(TRANSFORMS):
+            assert canonical_key(transform(state, image)) == key
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 4, 5])
+def test_canonical_board_is_shared_by_all_images(size):
+    rng = random.Random(size)
+    for _ in range(30):
+        board = random_board(rng, size)
+        key, k = canonical_board(board)
+        assert key[0] == size
+        images = [transform_board(board, image) for image in range(TRANSFORMS)]
+        assert all(canonical_board(image)[0] == key for image in images)
+        # 变换编号对应的变换结果就是规范形式
+        assert canonical_board(images[k]) == (key, 0)
+
+
+def test_dedupe_keeps_first_of_each_class():
+    rng = random.Random(2)
+    state = random_state(rng)
+    board = random_board(rng, 3)
+    items = [state, transform(state, 5), board, transform_board(board, 3), transform(state, 2), 0]
+    assert list(dedupe(items)) == [state, board, 0]
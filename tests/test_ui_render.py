@@ -0,0 +1,164 @@
+import random
+
+import pytest
+
+pytest.importorskip('kivy')
+
+from kivy.clock import Clock  # noqa: E402
+
+from game2048.colors import TILE_COLORS  # noqa: E402
+from game2048.ui import BoardWidget, Game2048, Tile, get_value_texture  # noqa: E402
+
+
+def random_board(rng, size):
+    return [[rng.choice((0, 0, 2, 4, 8, 128, 1024, 2048, 16384)) for _ in range(size)]
+            for _ in range(size)]
+
+
+def assert_same_state(widget, tiles, board):
+    """单画布棋盘与逐格 Tile 控件显示的内容相同：背景色、是否有文字、字号"""
+    size = len(board)
+    for i in range(size):
+        for j in range(size):
+            k = i * size + j
+            tile = tiles[i][j]
+            assert widget.values[i][j] == tile.value == board[i][j]
+            # 新方块淡入时单画布棋盘改透明度，Tile 改控件的 opacity，只在淡入期间两者不同
+            assert list(widget.bg_colors[k].rgb) == list(tile.rect_color.rgb)
+            if (i, j) not in widget._fades:
+                assert widget.bg_colors[k].a == tile.rect_color.a
+            texture = widget.cell_textures[k]
+            if board[i][j]:
+                assert tile.text == str(board[i][j])
+                assert texture is get_value_texture(board[i][j], widget.font_size_for(board[i][j]))
+                if size == 4:
+                    assert widget.font_size_for(board[i][j]) == int(tile.font_size)
+            else:
+                assert tile.text == ''
+                assert texture is None
+                assert tuple(widget.text_rects[k].size) == (0, 0)
+
+
+def test_board_widget_matches_tiles_full_redraw():
+    rng = random.Random(1)
+    widget = BoardWidget(board_size=4, size=(400, 400))
+    tiles = [[Tile(value=0) for _ in range(4)] for _ in range(4)]
+    for _ in range(30):
+        board = random_board(rng, 4)
+        widget.set_board(board)
+        for i in range(4):
+            for j in range(4):
+                tiles[i][j].value = board[i][j]
+        assert_same_state(widget, tiles, board)
+
+
+def test_partial_redraw_matches_full_redraw():
+    rng = random.Random(2)
+    partial = BoardWidget(board_size=5, size=(400, 400))
+    full = BoardWidget(board_size=5, size=(400, 400))
+    board = [[0] * 5 for _ in range(5)]
+    for _ in range(50):
+        cells = {(rng.randrange(5), rng.randrange(5)) for _ in range(4)}
+        for i, j in cells:
+            board[i][j] = rng.choice((0, 2, 4, 64))
+        partial.set_board(board, cells)
+        full.set_board(board)
+        assert partial.values == full.values
+        for a, b, c, d in zip(partial.bg_colors, full.bg_colors, partial.text_rects, full.text_rects):
+            assert list(a.rgba) == list(b.rgba)
+            assert c.texture is d.texture
+            assert tuple(c.size) == tuple(d.size) and tuple(c.pos) == tuple(d.pos)
+        assert partial.cell_textures == full.cell_textures
+
+
+def test_empty_cells_use_empty_color():
+    widget = BoardWidget(board_size=4)
+    widget.set_board([[2] * 4] * 4)
+    widget.set_board([[0] * 4] * 4)
+    assert all(list(color.rgba) == list(TILE_COLORS[0]) for color in widget.bg_colors)
+    # 清空的格子不能留下文字矩形（否则会画出默认的白色纹理）
+    assert all(tuple(rect.size) == (0, 0) for rect in widget.text_rects)
+
+
+@pytest.mark.parametrize('size', [3, 4, 6])
+def test_renderers_show_same_game(size):
+    """两种渲染方式下同一局游戏（同一随机种子、同样的移动）的显示状态相同"""
+    games = [Game2048(renderer=renderer, board_size=size) for renderer in ('board', 'tiles')]
+    try:
+        for game in games:
+            game.game_board.reset(seed=size)
+            game.update_board()
+        rng = random.Random(size)
+        for _ in range(60):
+            direction = rng.randrange(4)
+            for game in games:
+                game.move(direction)
+                game._render()
+                game.dismiss_popup()
+            board_game, tiles_game = games
+            assert board_game.game_board.board == tiles_game.game_board.board
+            assert_same_state(board_game.board_widget, tiles_game.tiles, tiles_game.game_board.board)
+            assert board_game.score_label.text == tiles_game.score_label.text
+    finally:
+        for game in games:
+            game.hints.shutdown()
+
+
+def moving_directions(game, count):
+    """依次找出 count 个有效方向并执行"""
+    moves = 0
+    while moves < count and game.game_board.legal_moves():
+        game.move(game.game_board.legal_moves()[0])
+        moves += 1
+    return moves
+
+
+@pytest.fixture
+def game():
+    game = Game2048(board_size=4)
+    game.game_board.reset(seed=7)
+    game.update_board()
+    Clock.tick()
+    renders = []
+    original = game.update_board
+
+    def update_board(new_tile_pos=None, diff=None, cells=None):
+        renders.append(cells)
+        original(new_tile_pos, diff, cells)
+    game.update_board = update_board
+    game.renders = renders
+    yield game
+    game.hints.shutdown()
+
+
+def test_moves_in_one_frame_render_once(game):
+    moves = moving_directions(game, 5)
+    assert moves > 1
+    # 移动立即作用于游戏板，但在下一帧之前不重画
+    assert game.renders == []
+    assert len(game._pending_inputs) == moves
+    assert game._render_trigger.is_triggered
+    cells = set(game._pending_cells)
+    board = [row[:] for row in game.game_board.board]
+    Clock.tick()
+    assert game.renders == [cells]
+    assert game._pending_inputs == [] and game._pending_cells == set()
+    assert len(game._painted_inputs) == moves
+    assert game.board_widget.values == board
+    Clock.tick()
+    assert len(game.renders) == 1
+
+
+@pytest.mark.parametrize('action', ['new_game', 'undo'])
+def test_full_refresh_discards_queued_moves(game, action):
+    assert moving_directions(game, 3) == 3
+    getattr(game, action)()
+    game.dismiss_popup()
+    # 整盘刷新一次，排队中的旧变化被丢弃，下一帧不再重画
+    assert game.renders == [None]
+    assert game._pending_inputs == [] and game._pending_cells == set()
+    assert game._pending_new_tile is None
+    assert not game._render_trigger.is_triggered
+    Clock.tick()
+    assert game.renders == [None]
+    assert game.board_widget.values == game.game_board.board